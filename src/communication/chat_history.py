@@ -1,49 +1,76 @@
+import atexit
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from langchain_core.chat_history import BaseChatMessageHistory
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from langchain_core.runnables import RunnableWithMessageHistory
-from src.data_manager.user import get_user
-from src.data_manager.message import get_user_messages
+from langchain_openai import ChatOpenAI
+
 from src.config.logging_config import Logger
+from src.constants import (CHAT_HISTORY_TOKEN_BUDGET, CHAT_MESSAGE_TOKEN_OVERHEAD, CHAT_SUMMARY_MAX_MESSAGES,
+                           CHAT_SUMMARY_MIN_NEW_MESSAGES, GPT_4_1_MINI)
+from src.data_manager.conversation_summary import get_conversation_summary, store_conversation_summary
+from src.data_manager.llm_usage import get_token_usage, record_llm_usage
+from src.data_manager.message import get_conversation_messages
+from src.prompts.prompts_templates import CONVERSATION_SUMMARY_CONTEXT, CONVERSATION_SUMMARY_PROMPT
+from src.utils.token_utils import count_tokens
 
 logger = Logger('chat_history').get_logger()
 
-class DBChatMessageHistory(BaseChatMessageHistory):
+
+def select_history_window(messages, token_budget):
     """
-    Structure class for the chat history to provide the LLM with
-    
+    Selects the most recent messages fitting in a token budget.
+
+    Args:
+        messages (list): The `MessageDTO` of the conversation, oldest first.
+        token_budget (int): Maximum number of tokens of the selected messages.
+
+    Returns:
+        list: The most recent messages fitting in the budget, oldest first.
     """
-    def __init__(self, phone_number):
-        self.user = get_user(phone_number)
-        logger.debug(f"✅ Found user {self.user.id} with phone number {phone_number}")
-        if not self.user:
-            logger.warning(f"🛑 No user found for phone number: {phone_number}")
+    window = []
+    for message in reversed(messages):
+        tokens = count_tokens(message.text) + CHAT_MESSAGE_TOKEN_OVERHEAD
+        if tokens > token_budget:
+            break
+        token_budget -= tokens
+        window.append(message)
+    window.reverse()
+    return window
 
-    @property
-    def messages(self):
-        if not self.user:
-            return []
 
-        db_messages = get_user_messages(self.user.id)
+class DBChatMessageHistory(BaseChatMessageHistory):
+    """
+    Structure class for the chat history to provide the LLM with: the latest system prompt, the summary
+    of the earlier conversation (if any), then the most recent messages fitting in the token budget.
+
+    The history is built once, from messages loaded by the caller (see `get_chat_history`).
+
+    Attributes:
+        window (list): The `MessageDTO` given verbatim to the LLM, oldest first.
+    """
+    def __init__(self, system_prompt, recent_messages, summary=None, token_budget=CHAT_HISTORY_TOKEN_BUDGET):
+        self.window = select_history_window(recent_messages, token_budget)
+
         chat_messages = []
+        if system_prompt:
+            chat_messages.append(SystemMessage(content=system_prompt))
+        if summary:
+            chat_messages.append(SystemMessage(content=CONVERSATION_SUMMARY_CONTEXT.format(summary=summary)))
 
-        most_recent_system = None
-        for msg in reversed(db_messages):
-            if msg.role == "system":
-                most_recent_system = msg.content
-                break
-        
-        if most_recent_system:
-            chat_messages.append(SystemMessage(content=most_recent_system))
-
-        for msg in db_messages:
-            role = msg.role
-            content = msg.content
-
-            if role == "user":
-                chat_messages.append(HumanMessage(content=content))
-            elif role == "assistant":
-                chat_messages.append(AIMessage(content=content))
-        return chat_messages
+        for msg in self.window:
+            if msg.role == "user":
+                chat_messages.append(HumanMessage(content=msg.text))
+            elif msg.role == "assistant":
+                chat_messages.append(AIMessage(content=msg.text))
+        self._messages = chat_messages
+
+    @property
+    def messages(self):
+        return self._messages
 
     def add_message(self, message):
         pass
@@ -52,3 +79,85 @@ class DBChatMessageHistory(BaseChatMessageHistory):
         pass
 
 
+class ConversationSummarizer:
+    """
+    Folds the messages left out of the chat history window into the rolling summary of the user's
+    conversation (`conversation_summaries` table). Summaries are written by a background thread, one
+    user at a time, so that chat completions never wait for them.
+
+    Attributes:
+        llm: The chat model writing the summaries (GPT-4.1 mini by default, created on first use).
+        min_new_messages (int): Number of messages left out of the summary from which it is refreshed.
+        max_messages (int): Maximum number of messages folded into the summary at once.
+    """
+
+    def __init__(self, llm=None, min_new_messages=CHAT_SUMMARY_MIN_NEW_MESSAGES,
+                 max_messages=CHAT_SUMMARY_MAX_MESSAGES):
+        self.llm = llm
+        self.min_new_messages = min_new_messages
+        self.max_messages = max_messages
+        self.stopped = False
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="conversation-summary")
+
+    def request_refresh(self, user_id, before_id):
+        """
+        Schedules a refresh of a user's summary, with the messages older than `before_id` (the oldest
+        message of the history window). Does nothing if a refresh of the user is already pending.
+
+        Returns:
+            bool: Whether a refresh was scheduled.
+        """
+        with self._lock:
+            if self.stopped or user_id in self._pending:
+                return False
+            self._pending.add(user_id)
+        self._executor.submit(self._run_refresh, user_id, before_id)
+        return True
+
+    def _run_refresh(self, user_id, before_id):
+        try:
+            self.refresh(user_id, before_id)
+        except Exception as e:
+            logger.error(f"🛑 Could not refresh the conversation summary of user {user_id}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(user_id)
+
+    def refresh(self, user_id, before_id):
+        """
+        Folds the messages older than `before_id`, and not summarized yet, into the user's summary,
+        if there are at least `min_new_messages` of them.
+
+        Returns:
+            bool: Whether the summary was updated.
+        """
+        summary, summarized_until_id, messages_count = get_conversation_summary(user_id)
+        messages = get_conversation_messages(user_id, summarized_until_id, before_id, self.max_messages)
+        if len(messages) < self.min_new_messages:
+            return False
+
+        if self.llm is None:
+            self.llm = ChatOpenAI(temperature=0, model=GPT_4_1_MINI, api_key=os.environ.get('OPENAI_API_KEY'))
+        conversation = "\n".join(f"{message.role}: {message.text}" for message in messages)
+        prompt = CONVERSATION_SUMMARY_PROMPT.format(previous_summary=summary or "", conversation=conversation)
+
+        start = time.perf_counter()
+        response = self.llm.invoke([HumanMessage(content=prompt)])
+        record_llm_usage(user_id, "chat_summary", getattr(self.llm, 'model_name', GPT_4_1_MINI),
+                         *get_token_usage(response), (time.perf_counter() - start) * 1000)
+
+        store_conversation_summary(user_id, response.content.strip(), messages[-1].id, messages_count + len(messages))
+        logger.info(f"Folded {len(messages)} messages into the conversation summary of user {user_id}")
+        return True
+
+    def stop(self, wait=True):
+        """Stops the background thread, once the pending refreshes are done (if `wait`)."""
+        with self._lock:
+            self.stopped = True
+        self._executor.shutdown(wait=wait)
+
+
+conversation_summarizer = ConversationSummarizer()
+atexit.register(conversation_summarizer.stop, wait=False)
@@ -3,18 +3,18 @@ from src.config.logging_config import Logger
 from ..constants import ASSISTANT_ROLE
 from ..data_manager.message import db_add_message_from_phone_number
 from ..data_manager.user import get_all_users
-from .messaging_service import SMSService
+from .messaging_service import create_sms_service
 from .twilio_tool import NewTwilioConversationManager
 
 logger = Logger('myfoodrepo.conversation_starter').get_logger()
 
 
-def start_conversations(service=SMSService()): 
+def start_conversations(service=None): 
     """
     Starting all conversations for users in the cohort
     """
     all_users = get_all_users()
-    manager = NewTwilioConversationManager(service)
+    manager = NewTwilioConversationManager(service or create_sms_service())
 
     logger.info("Starting a new conversation for all users in the system.")
     for user in all_users:
@@ -29,7 +29,7 @@ def start_conversations(service=SMSService()):
             logger.error(status_log)
 
 
-def start_specific_conversation(user,service=SMSService()): 
+def start_specific_conversation(user,service=None): 
     """
     Start the conversation for a specific user of the cohort.
 
@@ -37,7 +37,7 @@ def start_specific_conversation(user,service=SMSService()):
         -  user: The User object subject to conversation start
 
     """
-    manager = NewTwilioConversationManager(service)
+    manager = NewTwilioConversationManager(service or create_sms_service())
     logger.info(f"Starting a new conversation for user {user.id}")
 
     welcome_message = manager.send_welcome_message(user.phone_number)
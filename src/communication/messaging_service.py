@@ -1,10 +1,15 @@
+import itertools
 import os
 import sys
+import threading
+import time
 from abc import ABC, abstractmethod
+from types import SimpleNamespace
 
 from twilio.rest import Client
 
 from src.config.logging_config import Logger
+from src.constants import FAKE_TWILIO_ENV_KEY, FAKE_TWILIO_LATENCY_ENV_KEY
 from src.utils.message_utils import convert_to_whatsapp_number_format
 
 logger = Logger('myfoodrepo.messaging_service').get_logger()
@@ -61,4 +66,55 @@ class SMSService(MessagingService):
                                               to=to,
                                               risk_check="disable")
         logger.debug(f"SMS Message ID: {message.sid}, with status: {message.status}")
-        return message
\ No newline at end of file
+        return message
+
+
+class FakeSMSService(MessagingService):
+    """
+    In-memory stand-in for `SMSService`, used for load tests: messages are recorded instead of being sent.
+
+    Attributes:
+        sender_id (str): The sender ID the messages are attributed to (as for `SMSService`).
+        latency (float): Time, in seconds, each send takes (simulating the Twilio API call).
+        sent_messages (list): The messages "sent", as (timestamp, recipient, body) tuples.
+    """
+
+    _sids = itertools.count(1)
+
+    def __init__(self, sender_id=None, latency=None):
+        self.sender_id = sender_id or os.environ.get('TWILIO_SMS_SENDER_ID') or 'fake-sender'
+        if latency is None:
+            latency = float(os.environ.get(FAKE_TWILIO_LATENCY_ENV_KEY, 0)) / 1000
+        self.latency = latency
+        self.sent_messages = []
+        self._lock = threading.Lock()
+
+    def initialize_service(self):
+        pass
+
+    def send_message(self, to, body):
+        if self.latency:
+            time.sleep(self.latency)
+        message = SimpleNamespace(sid=f"SMfake{next(self._sids):026d}", body=body, to=to, status="queued")
+        with self._lock:
+            self.sent_messages.append((time.monotonic(), to, body))
+        logger.debug(f"Fake SMS Message ID: {message.sid}, to {to}")
+        return message
+
+
+_fake_sms_service = None
+_fake_sms_service_lock = threading.Lock()
+
+
+def create_sms_service():
+    """
+    Returns the SMS service to use: a (shared) fake one when the `FAKE_TWILIO` environment variable is
+    set to 1, so that all the messages of a load test are recorded in the same place.
+    """
+    global _fake_sms_service
+    if os.environ.get(FAKE_TWILIO_ENV_KEY) == "1":
+        with _fake_sms_service_lock:
+            if _fake_sms_service is None:
+                _fake_sms_service = FakeSMSService()
+            return _fake_sms_service
+    return SMSService()
@@ -0,0 +1,241 @@
+import atexit
+import heapq
+import itertools
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import IntEnum
+
+from src.config.logging_config import Logger
+from src.constants import (OUTBOUND_BURST_PER_SENDER, OUTBOUND_QUEUE_CAPACITY, OUTBOUND_RATE_PER_SENDER,
+                           OUTBOUND_SEND_WORKERS, OUTBOUND_THROTTLE_PAUSE, OUTBOUND_THROTTLE_RETRIES)
+from src.utils.rate_limiter import TokenBucket
+
+logger = Logger('myfoodrepo.outbound_queue').get_logger()
+
+
+class MessagePriority(IntEnum):
+    """Priority classes of outbound messages, the lowest value being sent first."""
+    CHAT = 0
+    REMINDER = 1
+    BROADCAST = 2
+
+
+def is_throttling_error(error):
+    """Whether a sending error is Twilio's 'Too Many Requests' (HTTP 429)."""
+    return getattr(error, 'status', None) == 429
+
+
+class _OutboundMessage:
+    __slots__ = ('service', 'to', 'body', 'priority', 'future', 'attempts')
+
+    def __init__(self, service, to, body, priority):
+        self.service = service
+        self.to = to
+        self.body = body
+        self.priority = priority
+        self.future = Future()
+        self.attempts = 0
+
+
+class _SenderLane:
+    """The queue, rate limiter and dispatching thread of one sender ID."""
+
+    def __init__(self, owner, sender_id):
+        self.owner = owner
+        self.sender_id = sender_id
+        self.rate_limiter = TokenBucket(owner.rate, owner.burst)
+        self.heap = []
+        self.bounded_count = 0
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name=f"outbound-{sender_id}", daemon=True)
+        self.thread.start()
+
+    def put(self, message, timeout=None):
+        with self.condition:
+            if message.priority != MessagePriority.CHAT:
+                if not self.condition.wait_for(lambda: self.bounded_count < self.owner.capacity or self.owner.stopped,
+                                               timeout):
+                    raise queue.Full(f"Outbound queue of sender {self.sender_id} is full")
+            if self.owner.stopped:
+                # E.g. a throttled message put back after the queue was stopped
+                message.future.set_exception(RuntimeError("The outbound message queue is stopped"))
+                return
+            if message.priority != MessagePriority.CHAT:
+                self.bounded_count += 1
+            heapq.heappush(self.heap, (message.priority, next(self.owner.sequence), message))
+            self.condition.notify_all()
+
+    def _pop(self):
+        """Returns the most urgent message, or None once the queue is stopped (the caller holds the condition)."""
+        if self.owner.stopped or not self.heap:
+            return None
+        _, _, message = heapq.heappop(self.heap)
+        if message.priority != MessagePriority.CHAT:
+            self.bounded_count -= 1
+        self.condition.notify_all()
+        return message
+
+    def fail_pending(self, error):
+        """Fails the futures of the messages left in the queue."""
+        with self.condition:
+            pending, self.heap, self.bounded_count = self.heap, [], 0
+            self.condition.notify_all()
+        for _, _, message in pending:
+            if not message.future.cancelled():
+                message.future.set_exception(error)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.heap or self.owner.stopped)
+                if self.owner.stopped:
+                    return
+            # The message is only picked once a token is available, so that a more urgent message
+            # queued in the meantime goes first
+            self.rate_limiter.acquire()
+            with self.condition:
+                message = self._pop()
+            if message is None:
+                continue
+            try:
+                self.owner.executor.submit(self.owner.deliver, self, message)
+            except RuntimeError as e:
+                # The executor was shut down by `stop` in the meantime
+                message.future.set_exception(e)
+
+
+class OutboundMessageQueue:
+    """
+    Paces the messages sent through Twilio, per sender ID, by priority.
+
+    Each sender ID has its own queue and token bucket (`rate` messages per second, bursts of `burst`).
+    Queued messages are sent in priority order (chat replies, then reminders, then broadcasts) and, within
+    a priority, in submission order. Producers of reminders and broadcasts wait when `capacity` of their
+    messages are already pending for the sender (backpressure); chat replies are never held back.
+    Messages rejected by Twilio with HTTP 429 are put back in the queue after a pause.
+
+    Attributes:
+        rate (float): Messages sent per second and per sender ID.
+        burst (int): Messages that can be sent at once, after an idle period.
+        capacity (int): Pending reminders / broadcasts per sender above which producers wait.
+    """
+
+    def __init__(self, rate=OUTBOUND_RATE_PER_SENDER, burst=OUTBOUND_BURST_PER_SENDER,
+                 capacity=OUTBOUND_QUEUE_CAPACITY, workers=OUTBOUND_SEND_WORKERS,
+                 throttle_retries=OUTBOUND_THROTTLE_RETRIES, throttle_pause=OUTBOUND_THROTTLE_PAUSE):
+        self.rate = rate
+        self.burst = burst
+        self.capacity = capacity
+        self.throttle_retries = throttle_retries
+        self.throttle_pause = throttle_pause
+        self.workers = workers
+        self.sequence = itertools.count()
+        self.stopped = False
+        self._executor = None
+        self._lanes = {}
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self.stopped:
+                raise RuntimeError("The outbound message queue is stopped")
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="outbound-send")
+            return self._executor
+
+    def _lane(self, sender_id):
+        with self._lock:
+            lane = self._lanes.get(sender_id)
+            if lane is None:
+                lane = self._lanes[sender_id] = _SenderLane(self, sender_id)
+            return lane
+
+    def submit(self, service, to, body, priority=MessagePriority.CHAT, timeout=None):
+        """
+        Queues a message.
+
+        Args:
+            service (MessagingService): The service sending the message (its `sender_id` selects the queue).
+            to (str): The recipient's phone number.
+            body (str): The content of the message.
+            priority (MessagePriority): The priority class of the message.
+            timeout (float, optional): Maximum time to wait for room in the queue. Waits indefinitely if None.
+
+        Returns:
+            Future: Resolved with the message returned by the service once sent.
+
+        Raises:
+            queue.Full: If the queue stayed full for `timeout` seconds.
+        """
+        if self.stopped:
+            raise RuntimeError("The outbound message queue is stopped")
+        message = _OutboundMessage(service, to, body, MessagePriority(priority))
+        self._lane(getattr(service, 'sender_id', type(service).__name__)).put(message, timeout)
+        return message.future
+
+    def send(self, service, to, body, priority=MessagePriority.CHAT, timeout=None):
+        """
+        Queues a message and waits until it is sent. Returns the message returned by the service.
+
+        A message still queued when the timeout expires is withdrawn, so that it is not sent after its sender
+        has given up on it.
+
+        Raises:
+            queue.Full: If the queue stayed full for `timeout` seconds.
+            concurrent.futures.TimeoutError: If the message was not sent within `timeout` seconds.
+        """
+        future = self.submit(service, to, body, priority, timeout)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def deliver(self, lane, message):
+        """Sends a message (called by the sending threads), putting it back in the queue when throttled."""
+        if message.attempts == 0 and not message.future.set_running_or_notify_cancel():
+            # Withdrawn by its sender after a timeout
+            return
+        message.attempts += 1
+        try:
+            message.future.set_result(message.service.send_message(message.to, message.body))
+        except Exception as e:
+            if is_throttling_error(e) and message.attempts <= self.throttle_retries and not self.stopped:
+                logger.warning(f"⚠️ Twilio throttled sender {lane.sender_id}, retrying a {message.priority.name} "
+                               f"message in {self.throttle_pause} s (attempt {message.attempts})")
+                threading.Timer(self.throttle_pause, lane.put, args=(message,)).start()
+                return
+            message.future.set_exception(e)
+
+    def pending(self):
+        """Returns the number of queued messages per sender ID."""
+        with self._lock:
+            lanes = list(self._lanes.values())
+        pending = {}
+        for lane in lanes:
+            with lane.condition:
+                pending[lane.sender_id] = len(lane.heap)
+        return pending
+
+    def stop(self, wait=True):
+        """
+        Stops the dispatching threads. The messages already handed over for sending are sent (and awaited
+        if `wait`), while the futures of the messages still queued fail with a RuntimeError.
+        """
+        self.stopped = True
+        with self._lock:
+            lanes = list(self._lanes.values())
+        for lane in lanes:
+            lane.fail_pending(RuntimeError("The outbound message queue is stopped"))
+        if wait:
+            for lane in lanes:
+                lane.thread.join(timeout=10)
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+
+
+outbound_queue = OutboundMessageQueue()
+atexit.register(outbound_queue.stop)
@@ -4,17 +4,20 @@ import os
 import random
 import pytz
 
-from src.communication.messaging_service import SMSService
+from src.communication.messaging_service import create_sms_service
+from src.communication.outbound_queue import MessagePriority
 from src.communication.twilio_tool import NewTwilioConversationManager
 from src.config.logging_config import Logger
 from src.constants import ASSISTANT_ROLE, GPT_4_O, SYSTEM_ROLE, GPT_4_1_MINI
-from src.data_manager.meal import get_recent_meals_string_for_user
-from src.data_manager.message import get_user_messages
+from src.data_manager.engagement import count_missed_reminder_slots, get_engagement_state, record_skipped_reminder
 from src.data_manager.models import User
-from src.data_manager.nutritional_profiling import retrieve_nutritional_information, calculate_eating_consistency
-from src.data_manager.reminder import get_previous_reminder_texts
+from src.data_manager.reminder import (get_previous_reminder_texts, pop_pregenerated_reminder,
+                                       store_pregenerated_reminder)
 from src.openai_client import OpenAIChatClient
 from src.prompts.prompts_templates import *
+from src.services.reminder_eligibility import draw_coinflips
+from src.services.user_context import get_user_context
+from src.utils import clock
 from src.utils.localization_utils import (
     get_localized_meal_type,
     get_localized_random_string,
@@ -23,53 +26,50 @@ from src.utils.localization_utils import (
 
 logger = Logger('myfoodrepo.reminder_manager').get_logger()
 timezone = pytz.timezone('Europe/Zurich')
-twilio_manager = NewTwilioConversationManager(SMSService())
+twilio_manager = NewTwilioConversationManager(create_sms_service())
 chat_client = OpenAIChatClient(os.environ.get('OPENAI_API_KEY'))
 
 def get_reminder_generators():
-    """Returns a dictionary mapping study group to reminder generation function."""
+    """
+    Returns a dictionary mapping study group to reminder generation function. The functions return the
+    reminder text along with the system prompt it was generated with (None for static reminders).
+    """
     return {
         3: generate_personalised_reminder,
         1: generate_generic_reminder
     }
 
-def get_time_since_last_log(user):
+def _utc_now(now=None):
+    """Returns `now` (the current time if None) as an aware UTC datetime"""
+    if now is None:
+        return clock.now(datetime.timezone.utc)
+    return now.astimezone(datetime.timezone.utc)
+
+
+def get_time_since_last_log(state, now=None):
     """Calculate time since user's last meal log"""
-    if user.last_meal_log is None:
+    if state.last_meal_log_at is None:
         return datetime.timedelta.max
     
-    now_utc = datetime.datetime.now(datetime.timezone.utc)
-    return now_utc - user.last_meal_log.astimezone(datetime.timezone.utc)
+    now_utc = _utc_now(now)
+    return now_utc - state.last_meal_log_at.astimezone(datetime.timezone.utc)
 
 
-def get_time_since_last_reminder(user):
+def get_time_since_last_reminder(state, now=None):
     """Calculate time since last reminder was sent to user"""
-    last_messages = get_user_messages(user.id)
-    last_reminder_time = max(
-        (msg.datetime for msg in last_messages if msg.reminder_id is not None),
-        default=None
-    )
-    
-    if not last_reminder_time:
+    if not state.last_reminder_at:
         return datetime.timedelta.max
         
-    now_utc = datetime.datetime.now(datetime.timezone.utc)
-    return now_utc - last_reminder_time.astimezone(datetime.timezone.utc)
+    now_utc = _utc_now(now)
+    return now_utc - state.last_reminder_at.astimezone(datetime.timezone.utc)
 
-def get_time_since_welcome_message(user):
+def get_time_since_welcome_message(state, now=None):
     """Calculate time since the user's earliest (welcome) message"""
-    all_messages = get_user_messages(user.id)
-    
-    first_message_time = min(
-        (msg.datetime for msg in all_messages),
-        default=None
-    )
-    
-    if not first_message_time:
+    if not state.welcome_at:
         return datetime.timedelta.max 
     
-    now_utc = datetime.datetime.now(datetime.timezone.utc)
-    return now_utc - first_message_time.astimezone(datetime.timezone.utc)
+    now_utc = _utc_now(now)
+    return now_utc - state.welcome_at.astimezone(datetime.timezone.utc)
 
 
 def format_timedelta(td):
@@ -95,30 +95,32 @@ def format_timedelta(td):
     return ", ".join(parts) or "less than a minute"
 
 
-def should_send_reminder(user: User) -> bool:
+def should_send_reminder(user: User, now=None, state=None) -> bool:
     """
     Determines whether a reminder should be sent based on user's activity.
     Reminder is automatically skipped if the user has more than 2 days inactivity.
 
     Args:
         user (User): The user to check.
+        now (datetime, optional): The time at which the reminder is sent (now by default).
+        state (EngagementStateDTO, optional): The user's engagement state, read if not given.
 
     Returns:
         bool: True if the reminder should be sent, False otherwise.
     """
     try:
+        state = state or get_engagement_state(user.id)
+        time_since_welcome_message = get_time_since_welcome_message(state, now)
 
-        time_since_welcome_message = get_time_since_welcome_message(user)
-
-        if user.last_meal_log is None and user.withdrawal == False and time_since_welcome_message < datetime.timedelta(days=4):
+        if state.last_meal_log_at is None and user.withdrawal == False and time_since_welcome_message < datetime.timedelta(days=4):
             logger.info(f"User {user.id} has never logged a meal. Proceeding with reminder.")
             return True
         
-        elif user.last_meal_log is None and user.withdrawal == False and time_since_welcome_message >= datetime.timedelta(days=4):
+        elif state.last_meal_log_at is None and user.withdrawal == False and time_since_welcome_message >= datetime.timedelta(days=4):
             logger.info(f"User {user.id} never participated. Skipping reminder.")
             return False
         
-        time_since_last_log = get_time_since_last_log(user)
+        time_since_last_log = get_time_since_last_log(state, now)
 
         if time_since_last_log > datetime.timedelta(days=2) or user.withdrawal == True:
             logger.info(f"User {user.id} hasn't logged meals in {time_since_last_log.days} days. Skipping reminder.")
@@ -131,65 +133,31 @@ def should_send_reminder(user: User) -> bool:
         return True  # still send reminder if in doubt
 
 
-def should_skip_reminder(user_id):
+def should_skip_reminder(user_id, now=None, state=None):
     """
     Performs a coinflip to know whether a user's reminder should be skipped.
-    Always send at least one reminder every two days (after 5 skips).
-    Uses database to track skipped reminders for persistence across restarts.
+    Always send at least one reminder every two days: the reminder is forced once 5 reminder occurrences
+    elapsed since the last sent reminder (the current one included), whatever the reason they were skipped.
+    Uses the last reminder time of the user's engagement state, for persistence across restarts. The coinflip
+    is drawn from the study's seeded generator (see `draw_coinflips`), as for a whole slot.
 
     Args:
         user_id: The user's ID for which we want to know whether we should skip reminders or not.
+        now (datetime, optional): The time at which the reminder is sent (now by default).
+        state (EngagementStateDTO, optional): The user's engagement state, read if not given.
     
     Returns:
         bool: True if reminder should be skipped, False otherwise.
     """
     try:
-        
-        recent_messages = get_user_messages(user_id) 
-        reminder_messages = [msg for msg in recent_messages if msg.reminder_id is not None]
-        
-        # simply count consecutive skipped reminders by looking at time gaps
-        now_utc = datetime.datetime.now(datetime.timezone.utc)
-        consecutive_skips = 0
-        
+        state = state or get_engagement_state(user_id)
 
-        zurich_tz = pytz.timezone('Europe/Zurich')
-        reminder_hours = [7, 12, 19]  # 7AM, 12PM, 7PM
-        
-        # Compute the number of consecutive occasions on which reminders have been skipped
-        if reminder_messages:
-            last_reminder_time = max(msg.datetime for msg in reminder_messages)
-            last_reminder_utc = last_reminder_time.astimezone(datetime.timezone.utc)
-            
-            # Count missed reminder opportunities since last sent reminder
-            current_time = now_utc.astimezone(zurich_tz)
-            last_reminder_zurich = last_reminder_utc.astimezone(zurich_tz)
-            
-            # Calculate days between last reminder and now
-            days_diff = (current_time.date() - last_reminder_zurich.date()).days
-            
-            if days_diff == 0:
-                # If it's the sameday, count missed opportunities today
-                current_hour = current_time.hour
-                last_reminder_hour = last_reminder_zurich.hour
-                
-                missed_today = len([h for h in reminder_hours if last_reminder_hour < h <= current_hour])
-                consecutive_skips = missed_today
-            else:
-                # If it's a different day, count all missed opportunities
-                # Remaining opportunities on the day of last reminder
-                last_day_remaining = len([h for h in reminder_hours if h > last_reminder_zurich.hour])
-                
-                full_days_missed = max(0, days_diff - 1) * 3
-                
-                current_hour = current_time.hour
-                today_passed = len([h for h in reminder_hours if h <= current_hour])
-                
-                consecutive_skips = last_day_remaining + full_days_missed + today_passed
-        else:
+        if state.last_reminder_at is None:
             # No reminders ever sent -> we send
             logger.info(f"User {user_id} has no previous reminders. Not skipping.")
             return False
+
+        consecutive_skips = count_missed_reminder_slots(state.last_reminder_at, _utc_now(now))
         
         # Force send if we've skipped 5 or more consecutive opportunities (approx 2 days)
         if consecutive_skips >= 5:
@@ -197,10 +165,10 @@ def should_skip_reminder(user_id):
             return False
         
         # Perform coinflip for skip decision
-        skip = random.randint(0, 1) == 0
+        skip = bool(draw_coinflips([user_id], now or clock.now(timezone))[0])
         
         if skip:
-            logger.info(f"User {user_id} reminder skipped by coinflip. Consecutive skips: {consecutive_skips + 1}")
+            logger.info(f"User {user_id} reminder skipped by coinflip. Consecutive skips: {consecutive_skips}")
         else:
             logger.info(f"User {user_id} reminder will be sent. Resetting skip count.")
             
@@ -211,7 +179,7 @@ def should_skip_reminder(user_id):
         return False
 
 
-def determine_warning(user):
+def determine_warning(user, now=None, state=None):
     """
     Decides if the reminder should include a gentle warning to encourage app usage.
     
@@ -223,6 +191,8 @@ def determine_warning(user):
 
     Args:
         user: User object for which the reminder is going to be sent.
+        now (datetime, optional): The time at which the reminder is sent (now by default).
+        state (EngagementStateDTO, optional): The user's engagement state, read if not given.
     
     Returns:
         tuple: (
@@ -232,13 +202,14 @@ def determine_warning(user):
             bool: True if user never logged a meal
         )
     """
+    time_since_last_log = datetime.timedelta.max
     try:
-
-        time_since_last_log = get_time_since_last_log(user)
-        time_since_last_reminder = get_time_since_last_reminder(user)
+        state = state or get_engagement_state(user.id)
+        time_since_last_log = get_time_since_last_log(state, now)
+        time_since_last_reminder = get_time_since_last_reminder(state, now)
 
         # Check if user has never logged
-        if user.last_meal_log is None:
+        if state.last_meal_log_at is None:
             logger.info(f"User {user.id} has not logged meals yet. Gentle incent needed.")
             return datetime.timedelta.max, True, time_since_last_reminder, True
         
@@ -257,19 +228,21 @@ def determine_warning(user):
 
 import random
 
-def select_personalization_prompt(user, last_used_prompt=None):
+def select_personalization_prompt(user, last_used_prompt=None, diet_info=None):
     """
     Selects an appropriate personalization prompt based on user's nutritional data.
 
     Args:
         user: User object with nutritional data
         last_used_prompt (str, optional): Identifier of the last used prompt to reduce repetition
+        diet_info (list, optional): The user's diet information, when already retrieved
 
     Returns:
         str: The selected personalization prompt
     """
     
-    diet_info = retrieve_nutritional_information(user)
+    if diet_info is None:
+        diet_info = get_user_context(user).diet_information
     diet_info = [str(info).lower() for info in diet_info if isinstance(info, str)]
 
     has_deficiency = any("low" in info for info in diet_info)
@@ -323,25 +296,32 @@ def generate_personalised_reminder(user, meal_type, warning, tlr, tll, never_log
         reminder_id (int, optional): Unique identifier for the reminder
     
     Returns:
-        str: The personalized reminder text
+        tuple: The personalized reminder text, and the system prompt it was generated with (only stored in
+               the user's history once the reminder is sent)
     """
-    recent_meals = get_recent_meals_string_for_user(user.myfoodrepo_key,meals_nb=10)
-    diet_information = retrieve_nutritional_information(user)
-    consistency_metrics = calculate_eating_consistency(user)
+    user_context = get_user_context(user)
+    recent_meals = user_context.recent_meals
+    diet_information = user_context.diet_information
+    consistency_metrics = user_context.consistency_metrics
     translated_meal_type = get_localized_meal_type(meal_type, user.language, app)
     formatted_user_language = prompt_language_formatting(user.language)
     previous_reminders = get_previous_reminder_texts(user) 
 
-    # Strucruting the final prompt used to generate the reminder
-    final_prompt= ""
+    # Strucruting the final prompt used to generate the reminder : the static instructions come first, so that
+    # they form a prefix shared by all users (cached by OpenAI), and the user's data last.
+    final_prompt = SYSTEM_PERSONA
+
+    if not (never_logged or warning):
+        final_prompt += COT_REASONING
+        final_prompt += FEW_SHOTS_PROMPTING
+
+    final_prompt += INFLEXIBLE_RULES
 
     if tll > datetime.timedelta(minutes=30) :
-        final_prompt = REMINDER_SYSTEM_ROLE_VANILLA.format(meal_type = translated_meal_type)
+        final_prompt += REMINDER_SYSTEM_ROLE_VANILLA.format(meal_type = translated_meal_type)
 
     else :
-        final_prompt = REMINDER_SYSTEM_ROLE_RECENT_LOG
-
-    final_prompt += SYSTEM_PERSONA
+        final_prompt += REMINDER_SYSTEM_ROLE_RECENT_LOG
 
     final_prompt += USER_PROFILE.format(
                                 age= user.age, gender = user.gender,
@@ -352,6 +332,7 @@ def generate_personalised_reminder(user, meal_type, warning, tlr, tll, never_log
                                 prefered_language = formatted_user_language
     )
     final_prompt += REMINDER_CONTEXT.format(
+                                        meal_type = translated_meal_type,
                                         tlr = format_timedelta(tlr) if tlr is not datetime.timedelta.max else "No reminder ever sent.",
                                         previous_reminders = previous_reminders
                                     )
@@ -362,8 +343,7 @@ def generate_personalised_reminder(user, meal_type, warning, tlr, tll, never_log
         final_prompt += WARNING_PROMPT
 
     else: 
-        additional_prompt = select_personalization_prompt(user)
-        potential = ""
+        additional_prompt = select_personalization_prompt(user, diet_info=diet_information)
         if additional_prompt: 
             safe_data = SafeDict({
                 'diet_information': diet_information,
@@ -371,28 +351,17 @@ def generate_personalised_reminder(user, meal_type, warning, tlr, tll, never_log
                 'recent_meals': recent_meals
             })
 
-            additional_guideline = additional_prompt.format_map(safe_data)
+            final_prompt += additional_prompt.format_map(safe_data)
 
             cot_template = add_cot(additional_prompt)
-            potential = cot_template.format_map(safe_data) if cot_template else ""
-
-            final_prompt += additional_guideline
-
-
-        final_prompt += COT_REASONING.format(prefered_language=formatted_user_language)
-        final_prompt += potential
-
-        final_prompt += FEW_SHOTS_PROMPTING.format(meal_type = translated_meal_type)
-
-
-    final_prompt += INFLEXIBLE_RULES.format(prefered_language = formatted_user_language)
+            final_prompt += cot_template.format_map(safe_data) if cot_template else ""
 
     logger.info("Preparing a PERSONALIZED reminder...")
-    chat_client.add_message_from_phone_number(user.phone_number, SYSTEM_ROLE, final_prompt, None, None)
-    openai_response = chat_client.create_chat_completion(GPT_4_O, user.phone_number, 1)
+    openai_response = chat_client.create_chat_completion(GPT_4_O, user.phone_number, 1, purpose="reminder",
+                                                         system_prompt=final_prompt)
     logger.debug(f"OpenAI response is: {openai_response}")
 
-    return openai_response
+    return openai_response, final_prompt
 
 
 def generate_generic_reminder(user, meal_type, warning, tlr, tll, never_logged, app, reminder_id):
@@ -409,66 +378,167 @@ def generate_generic_reminder(user, meal_type, warning, tlr, tll, never_logged,
         reminder_id (int): Unique identifier for the reminder
     
     Returns:
-        str: The selected static reminder text
+        tuple: The selected static reminder text, and None (no system prompt)
     """
     logger.info("Preparing a GENERIC reminder...")
     translated_meal_type = get_localized_meal_type(meal_type, user.language, app)
 
     if warning and not never_logged:
-        return get_localized_random_string('warning_reminder_static_messages', user.language, app).format(translated_meal_type)
+        text = get_localized_random_string('warning_reminder_static_messages', user.language, app)
     else:
-        return get_localized_random_string('reminder_static_messages', user.language, app).format(translated_meal_type)
+        text = get_localized_random_string('reminder_static_messages', user.language, app)
+    return text.format(translated_meal_type), None
+
+
+REMINDER_GENERATION_ERRORS = ["RateLimitError", "OpenAIError", "UnexpectedError"]
 
 
-def send_reminder(user: User, meal_type: str, app, reminder_id):
+def evaluate_reminder(user, now=None):
     """
-    Main function to send a reminder to a user for a specific meal type.
+    Decides whether a reminder should be sent to a user, and in which context.
+
+    Args:
+        user (User): User to send reminder to
+        now (datetime, optional): The time at which the reminder is sent (now by default).
+
+    Returns:
+        tuple: (
+            str: The reason for which the reminder is skipped, None if it should be sent,
+            tuple: (time since last log, warning, time since last reminder, never logged) as returned by `determine_warning`
+        )
+    """
+    state = get_engagement_state(user.id)
+
+    # Determine if warning should be included
+    tll, warning, tlr, never_logged = determine_warning(user, now, state)
+    context = (tll, warning, tlr, never_logged)
+
+    # Check if we should skip the reminder
+    if should_skip_reminder(user.id, now, state) and not warning:
+        logger.info(f"Reminder for user {user.id} has been skipped by coinflip.")
+        return "coinflip", context
+        
+    if not should_send_reminder(user, now, state):
+        logger.info(f"Reminder for user {user.id} skipped due to >2 days inactivity.")
+        return "inactivity", context
+
+    if warning is None:
+        logger.warning(f"No valid warning condition found for user {user.id}. Fix it!")
+        return "no warning condition", context
+
+    if user.study_group not in get_reminder_generators():
+        logger.warning(f"User {user.id} is not in a valid study group for reminders. Fix it!")
+        return "study group", context
+
+    return None, context
+
+
+def pregenerate_reminder(user, meal_type, app, reminder_id, slot_datetime, valid_until, decision=None):
+    """
+    Evaluates and generates a reminder ahead of its time slot, and stores the outcome for the send job.
+
+    The evaluation is made as of `slot_datetime`, so that the outcome is the one the send job would
+    have computed. Generation errors are not stored: the send job then falls back to live generation.
 
     Args:
         user (User): User to send reminder to
         meal_type (str): The type of meal (Breakfast, Lunch, Dinner)
         app: The current Flask application
         reminder_id (int): Unique identifier for the reminder
+        slot_datetime (datetime): The (aware) datetime at which the reminder will be sent.
+        valid_until (datetime): The datetime after which the prepared reminder is stale.
+        decision (tuple, optional): The outcome of `evaluate_reminder`, when the whole slot was evaluated at once.
+
+    Returns:
+        bool: True if an outcome (text or skip) was stored.
     """
     with app.app_context():
         try:
-            # Determine if warning should be included
-            tll, warning, tlr, never_logged = determine_warning(user)
+            skip_reason, (tll, warning, tlr, never_logged) = decision or evaluate_reminder(user, slot_datetime)
+            text, system_prompt = None, None
+            if skip_reason is None:
+                reminder_function = get_reminder_generators()[user.study_group]
+                text, system_prompt = reminder_function(user, meal_type, warning, tlr, tll, never_logged, app,
+                                                        reminder_id)
+                if text in REMINDER_GENERATION_ERRORS:
+                    logger.warning(f"Could not pre-generate reminder {reminder_id} for user {user.id}: {text}")
+                    return False
+
+            store_pregenerated_reminder(reminder_id, user.id, skip_reason is not None, text,
+                                        user.last_meal_log, valid_until, system_prompt)
+            return True
+        except Exception as e:
+            logger.error(f"An error occurred while pre-generating reminder {reminder_id} for user {user.id}\nError: {e}")
+            return False
 
-            # Check if we should skip the reminder
-            if should_skip_reminder(user.id) and not warning:
-                logger.info(f"Reminder for user {user.id} has been skipped by coinflip.")
-                return
-                
-            if not should_send_reminder(user):
-                logger.info(f"Reminder for user {user.id} skipped due to >2 days inactivity.")
-                return
-    
-            
-            if warning is None:
-                logger.warning(f"No valid warning condition found for user {user.id}. Fix it!")
-                return
-
-            # Get appropriate reminder generator for this user's study group
-            reminder_generators = get_reminder_generators()
-            if user.study_group not in reminder_generators:
-                logger.warning(f"User {user.id} is not in a valid study group for reminders. Fix it!")
-                return
-    
-            reminder_function = reminder_generators[user.study_group]
-            response = reminder_function(user, meal_type, warning, tlr, tll, never_logged, app, reminder_id)
+
+REMINDER_SENT = "sent"
+REMINDER_SKIPPED = "skipped"
+REMINDER_FAILED = "failed"
+
+
+def send_reminder(user: User, meal_type: str, app, reminder_id, decision=None):
+    """
+    Main function to send a reminder to a user for a specific meal type.
+
+    The reminder prepared ahead of the slot (see `pregenerate_reminder`) is used when available and
+    still valid; otherwise the reminder is evaluated and generated on the spot.
+
+    Args:
+        user (User): User to send reminder to
+        meal_type (str): The type of meal (Breakfast, Lunch, Dinner)
+        app: The current Flask application
+        reminder_id (int): Unique identifier for the reminder
+        decision (tuple, optional): The outcome of `evaluate_reminder`, when the whole slot was evaluated at once.
+
+    Returns:
+        str: `REMINDER_SENT`, `REMINDER_SKIPPED`, or `REMINDER_FAILED` when the reminder could not be
+             generated or sent (and may be retried).
+    """
+    with app.app_context():
+        try:
+            now = clock.now(timezone).replace(tzinfo=None)
+            prepared = pop_pregenerated_reminder(reminder_id, user.last_meal_log, now)
+
+            if prepared is not None:
+                skip, response, system_prompt = prepared
+                if skip:
+                    logger.info(f"Reminder for user {user.id} skipped (pre-evaluated).")
+                    record_skipped_reminder(user.id)
+                    return REMINDER_SKIPPED
+                logger.debug(f"Using the pre-generated reminder {reminder_id} for user {user.id}")
+            else:
+                skip_reason, (tll, warning, tlr, never_logged) = decision or evaluate_reminder(user)
+                if skip_reason is not None:
+                    record_skipped_reminder(user.id)
+                    return REMINDER_SKIPPED
+
+                # Get appropriate reminder generator for this user's study group
+                reminder_function = get_reminder_generators()[user.study_group]
+                response, system_prompt = reminder_function(user, meal_type, warning, tlr, tll, never_logged, app,
+                                                            reminder_id)
     
-            if response not in ["RateLimitError","OpenAIError","UnexpectedError"] :
-                try:
-                    message_sent = twilio_manager.send_message(user.phone_number, response)
-                    logger.debug(f"Reminder successfully sent to user {user.id}")
-                    chat_client.add_message(user.id, ASSISTANT_ROLE, message_sent.body, message_sent.sid, reminder_id)
-                except Exception as e:
-                    logger.error(f"Failed to send message for the user {user.id}: {e}")
-            else :
+            if response in REMINDER_GENERATION_ERRORS:
                 logger.debug(f"There was a {response} when trying to generate the user's reminder")
-                return
+                return REMINDER_FAILED
+
+            try:
+                message_sent = twilio_manager.send_message(user.phone_number, response, MessagePriority.REMINDER)
+            except Exception as e:
+                logger.error(f"Failed to send message for the user {user.id}: {e}")
+                return REMINDER_FAILED
+
+            logger.debug(f"Reminder successfully sent to user {user.id}")
+            try:
+                # The prompt only enters the history along with the reminder it produced
+                if system_prompt:
+                    chat_client.add_message(user.id, SYSTEM_ROLE, system_prompt, None, None)
+                chat_client.add_message(user.id, ASSISTANT_ROLE, message_sent.body, message_sent.sid, reminder_id)
+            except Exception as e:
+                # The reminder was sent: it must not be retried
+                logger.error(f"Failed to store the reminder sent to user {user.id}: {e}")
+            return REMINDER_SENT
                 
         except Exception as e:
             logger.error(f"An error occurred while sending a reminder to user: {user.id}\nError: {e}")
-            return
\ No newline at end of file
+            return REMINDER_FAILED
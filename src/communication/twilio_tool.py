@@ -1,13 +1,15 @@
 import json
 import os
+import queue
 import random
 
 from twilio.rest import Client
 
 from src.data_manager.meal import get_recent_meals_string_for_user
 from src.communication.messaging_service import MessagingService
+from src.communication.outbound_queue import MessagePriority, outbound_queue
 from src.config.logging_config import Logger
-from src.constants import (ANDROID_APP_LINK, FEEDBACK_SURVEY, IOS_APP_LINK, SMS_SENDER_ID,
+from src.constants import (ANDROID_APP_LINK, FEEDBACK_SURVEY, IOS_APP_LINK, OUTBOUND_SEND_TIMEOUT, SMS_SENDER_ID,
                            WHATSAPP_SENDER_ID)
 from src.data_manager.user import get_user
 from src.utils.localization_utils import (get_localized_random_string,
@@ -27,16 +29,20 @@ class NewTwilioConversationManager:
         self.messaging_service = messaging_service
         self.messaging_service.initialize_service()
 
-    def send_message(self, to, body):
+    def send_message(self, to, body, priority=MessagePriority.CHAT):
         """
-        Sends a message using the configured messaging service.
+        Sends a message using the configured messaging service, through the paced outbound queue.
 
         :param to: The recipient of the message.
         :param body: The content of the message.
+        :param priority: The priority class of the message (chat replies are sent first).
+        :raises TimeoutError: If the message could not be sent within OUTBOUND_SEND_TIMEOUT seconds.
         """
-        
-        message = self.messaging_service.send_message(to, body)
-        return message
+        try:
+            return outbound_queue.send(self.messaging_service, to, body, priority, timeout=OUTBOUND_SEND_TIMEOUT)
+        except (queue.Full, TimeoutError) as e:
+            logger.error(f"🛑 Message to {to} not sent within {OUTBOUND_SEND_TIMEOUT} s, giving up")
+            raise TimeoutError(f"Message to {to} not sent within {OUTBOUND_SEND_TIMEOUT} s") from e
 
     def send_welcome_message(self, to_number): 
         """
@@ -63,7 +69,7 @@ class NewTwilioConversationManager:
         welcome_message += f"\n\n{your_key_message} {user.myfoodrepo_key}"
         welcome_message += f"\n\n{final_note}"
 
-        welcome_message_sent = self.messaging_service.send_message(to_number, welcome_message)
+        welcome_message_sent = self.send_message(to_number, welcome_message, MessagePriority.BROADCAST)
 
         return welcome_message_sent
 
@@ -97,6 +103,6 @@ class NewTwilioConversationManager:
 
 
         goodbye_message += f"\n\n{get_localized_string('goodbye_final_note_message', language)}"
-        goodbye_message_sent = self.messaging_service.send_message(to_number, goodbye_message)
+        goodbye_message_sent = self.send_message(to_number, goodbye_message, MessagePriority.BROADCAST)
 
         return goodbye_message_sent
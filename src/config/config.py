@@ -5,11 +5,16 @@ from dotenv import load_dotenv
 from flask import Flask
 from flask_migrate import Migrate
 
-from src.constants import DATA_FOLDER_NAME, DATABASE_FILENAME
-from src.db_session import init_db
+from src.constants import (DATA_FOLDER_NAME, DATABASE_FILENAME, MESSAGE_DURABILITY_MODE,
+                           MESSAGE_DURABILITY_MODE_ENV_KEY)
+from src.db_session import init_db, remove_session
+from src.query_profiler import query_profiler
 
+from ..data_manager.engagement import backfill_engagement_states
+from ..data_manager.message import migrate_inline_system_prompts
 from ..data_manager.models import db
-from ..scheduler.scheduler import start_scheduler
+from ..data_manager.schema import upgrade_schema
+from ..scheduler.scheduler import get_job_store_url, get_scheduler_lock_path, start_scheduler_on_leader
 
 
 def load_localizations():
@@ -33,36 +38,47 @@ def load_localizations():
 
 def setup_scheduler(app):
     """
-    Initializes and starts the scheduler within the application.
+    Initializes the scheduler within the application. When several processes serve the application
+    (e.g. gunicorn workers), only the elected one runs it. The scheduler is not started under the
+    testing configuration.
     Args:
         app (Flask): The Flask application instance.
     """
-    with app.app_context():
-        start_scheduler(app)
+    app.config.setdefault('SCHEDULER_JOBSTORE_URL', get_job_store_url())
+    app.config.setdefault('SCHEDULER_LOCK_PATH', get_scheduler_lock_path())
+    if app.config.get('TESTING'):
+        return
+    start_scheduler_on_leader(app)
 
 
 def configure_db(app):
     """
-    Configures and initializes the SQLite Database for the Flask application
+    Configures and initializes the SQLite Database for the Flask application. The database of the `data`
+    folder is used, unless `SQLALCHEMY_DATABASE_URI` is already configured (e.g. by a test configuration).
     
     Args:
         app(Flask) The flask application instance for which a database needs to be configured.
     """
-    # Resolves the database directory and ensures it exists
-    base_directory = os.path.abspath(os.path.dirname(__file__))
-    project_directory = os.path.join(base_directory, '..', '..')
-    database_directory = os.path.join(project_directory, DATA_FOLDER_NAME)
-
-    database_directory = os.path.normpath(database_directory)
-    if not os.path.exists(database_directory):
-        os.makedirs(database_directory)
-
-    # Building the db URI + updating the Flask app config
-    database_path = os.path.join(database_directory, DATABASE_FILENAME)
-    db_uri = 'sqlite:///' + database_path
-    app.config['SQLALCHEMY_DATABASE_URI'] = db_uri
+    db_uri = app.config.get('SQLALCHEMY_DATABASE_URI')
+    if not db_uri:
+        # Resolves the database directory and ensures it exists
+        base_directory = os.path.abspath(os.path.dirname(__file__))
+        project_directory = os.path.join(base_directory, '..', '..')
+        database_directory = os.path.join(project_directory, DATA_FOLDER_NAME)
+
+        database_directory = os.path.normpath(database_directory)
+        if not os.path.exists(database_directory):
+            os.makedirs(database_directory)
+
+        # Building the db URI + updating the Flask app config
+        database_path = os.path.join(database_directory, DATABASE_FILENAME)
+        db_uri = 'sqlite:///' + database_path
+        app.config['SQLALCHEMY_DATABASE_URI'] = db_uri
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    # Recording the timing of every SQL statement, on all engines
+    query_profiler.install()
+
     # Initializing the SQLAlchemy extension with the app
     db.init_app(app)
 
@@ -71,12 +87,25 @@ def configure_db(app):
         print("Creating database tables")
         db.create_all()
         print("Tables created successfully")
+        # Adding the columns introduced since the database was created
+        upgrade_schema(db.engine)
     init_db(db_uri)
+    # Releasing the thread's session at the end of each request / scheduler job
+    app.teardown_appcontext(remove_session)
+
+    # Moving system prompts stored inline by previous versions to their own table
+    migrate_inline_system_prompts()
 
+    # Creating the engagement state of users whose history predates it
+    backfill_engagement_states()
 
-def create_app():
+
+def create_app(test_config=None):
     """
     Creates and configures the Flask application instance.
+
+    Args:
+        test_config (dict): Configuration overriding the default one (e.g. `{'TESTING': True}`).
     
     Returns:
         app(Flask) : The configured Flask application instance.
@@ -96,6 +125,10 @@ def create_app():
     # Loading localization data
     app.extensions['localizations'] = load_localizations()
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', os.urandom(24))
+    if test_config is not None:
+        app.config.from_mapping(test_config)
+    app.config.setdefault('MESSAGE_DURABILITY_MODE',
+                          os.environ.get(MESSAGE_DURABILITY_MODE_ENV_KEY, MESSAGE_DURABILITY_MODE))
 
     # Configuring the database for the app
     configure_db(app)
@@ -100,6 +100,8 @@ UPDATE_GOOGLE_FORM_CSV_FILENAME = "updating_google_form_users_data.csv"
 GOOGLE_FORM_CSV_FILENAME = "google_form_users_data.csv"
 DATA_FOLDER_NAME = "data"
 DATABASE_FILENAME = "mydatabase.db"
+DATABASE_BACKUP_FOLDER_NAME = "backups"
+SCHEDULER_JOBS_DATABASE_FILENAME = "scheduler_jobs.db"
 FOODS_CATEGORIES_FILENAME = "category_list.csv"
 FOODS_EXPORT_FILENAME = "foods-export-2025-04-10.csv"
 PRODUCTS_CATEGORIES_FILENAME = "products_category_list.csv"
@@ -130,3 +132,122 @@ SMS_SENDER_ID = "MGf890ba97706924a58df9ccb5329528bf"
 DB_UPDATE_TIME_INTERVAL = 1
 DB_UPDATE_DAYS_WINDOW = 3
 USERS_MESSAGES_LIMIT = 10
+MANAGEMENT_PAGE_SIZE = 100
+MANAGEMENT_MAX_PAGE_SIZE = 500
+HOME_STATISTICS_CACHE_TTL = 30
+
+# QUERY PROFILING
+SLOW_QUERY_THRESHOLD_MS = 250
+QUERY_STATS_MAX_FINGERPRINTS = 500
+QUERY_STATS_MAX_CALLERS = 10
+# Callers of fast statements are resolved (walking the stack) for one execution out of this many
+QUERY_STATS_CALLER_SAMPLING = 20
+
+# MESSAGE LOG
+# "immediate": each message is committed on its own. "batched": messages are buffered and committed
+# together at most MESSAGE_FLUSH_INTERVAL seconds later (pending messages are written before messages are
+# read, and are lost if the process crashes before). Overridden by the MESSAGE_DURABILITY_MODE setting of the
+# application, or by the environment variable of the same name.
+MESSAGE_DURABILITY_MODE = "immediate"
+MESSAGE_DURABILITY_MODE_ENV_KEY = "MESSAGE_DURABILITY_MODE"
+MESSAGE_FLUSH_INTERVAL = 0.5
+MESSAGE_FLUSH_MAX_BATCH = 200
+
+# DATABASE MAINTENANCE
+DB_MAINTENANCE_HOUR = 3
+DB_MAINTENANCE_MINUTE = 30
+DB_BACKUPS_KEPT = 7
+DB_BACKUP_PAGES_PER_STEP = 1024
+DB_BACKUP_STEP_SLEEP = 0.05
+
+# REMINDER DISPATCH
+REMINDER_STUDY_GROUPS = [1, 3]
+REMINDER_DISPATCH_WORKERS = 20
+REMINDER_DISPATCH_RATE = 5
+REMINDER_DISPATCH_BURST = 10
+
+# REMINDER PRE-GENERATION
+REMINDER_PREGENERATION_STUDY_GROUPS = [3]
+REMINDER_PREGENERATION_LEAD_MINUTES = 10
+REMINDER_PREGENERATION_VALIDITY_MINUTES = 30
+REMINDER_PREGENERATION_WORKERS = 10
+
+# USER CONTEXT SNAPSHOTS
+# Number of user contexts (recent meals, diet information, consistency metrics) kept in memory.
+USER_CONTEXT_CACHE_SIZE = 512
+# Seconds the meals version of a user read from the database is reused. Bumps made by this process are seen
+# at once, the ones made by other processes (e.g. the scheduler's data refresh) after at most this delay.
+SNAPSHOT_STATE_TTL = 30
+
+# REMINDER ELIGIBILITY
+# Seed of the reminder coinflips: each user's draw is derived from it, the slot and the user ID.
+REMINDER_COINFLIP_SEED = 20250401
+
+# OUTBOUND MESSAGES
+# Messages handed to Twilio per second (and burst) for each sender ID.
+OUTBOUND_RATE_PER_SENDER = 10
+OUTBOUND_BURST_PER_SENDER = 10
+# Pending reminders / broadcasts per sender above which producers wait (chat replies never wait).
+OUTBOUND_QUEUE_CAPACITY = 200
+OUTBOUND_SEND_WORKERS = 8
+OUTBOUND_THROTTLE_RETRIES = 3
+OUTBOUND_THROTTLE_PAUSE = 1.0
+# Seconds a sender waits for its message to be handed to Twilio before considering the sending failed
+OUTBOUND_SEND_TIMEOUT = 60
+# Set to "1" to send messages to an in-memory fake Twilio instead (load tests)
+FAKE_TWILIO_ENV_KEY = "FAKE_TWILIO"
+FAKE_TWILIO_LATENCY_ENV_KEY = "FAKE_TWILIO_LATENCY_MS"
+
+# REMINDER RETRIES
+# Failed reminders are retried by one-shot jobs, after a jittered exponential backoff, until the deadline.
+REMINDER_RETRY_ATTEMPTS = 3
+REMINDER_RETRY_BASE_DELAY = 30
+REMINDER_RETRY_MAX_DELAY = 300
+REMINDER_RETRY_DEADLINE_MINUTES = 45
+
+# OPENAI
+OPENAI_INVOKE_ATTEMPTS = 3
+OPENAI_INVOKE_MAX_WAIT = 10
+
+# SCHEDULER LEADER ELECTION
+# Only the process holding the lock file runs the scheduler; the others retry to acquire it periodically.
+SCHEDULER_LOCK_FILENAME = "scheduler.lock"
+SCHEDULER_LEADER_RETRY_SECONDS = 15
+# Interval at which the leader re-aligns the reminder slots (reminders may be edited by other processes).
+SCHEDULER_SLOT_RECONCILE_MINUTES = 5
+
+# SCHEDULER PRIORITIES
+# The meal syncs run one at a time, on their own worker, and pause between users while reminders are sent.
+SYNC_EXECUTOR_WORKERS = 1
+SYNC_MAX_PAUSE_SECONDS = 600
+# A full sync starting less than this before a reminder slot is deferred until after the slot.
+SYNC_SLOT_GUARD_MINUTES = 15
+SYNC_DEFER_AFTER_SLOT_MINUTES = 10
+
+# JOB EXECUTION HISTORY
+# Number of most recent job runs kept (in memory and in the `job_executions` table).
+JOB_HISTORY_MAX_RUNS = 5000
+JOB_HISTORY_FLUSH_INTERVAL = 2.0
+JOB_HISTORY_FLUSH_MAX_BATCH = 200
+
+# RECENT MEALS CONTEXT
+# The recent meals injected in the prompts fit in this number of tokens: the most recent days in detail,
+# then one line per older day (over at most RECENT_MEALS_SUMMARY_DAYS days).
+RECENT_MEALS_TOKEN_BUDGET = 1500
+RECENT_MEALS_DETAILED_MEALS = 20
+RECENT_MEALS_SUMMARY_DAYS = 14
+# Number of users whose recent meals texts are cached
+RECENT_MEALS_CACHE_SIZE = 512
+# Used to estimate the number of tokens of a text when no tokenizer is available.
+CHARS_PER_TOKEN_ESTIMATE = 4
+
+# CHAT HISTORY
+# The LLM is given the CHAT_HISTORY_MAX_MESSAGES most recent messages fitting in CHAT_HISTORY_TOKEN_BUDGET
+# tokens; the older ones are folded into a rolling summary, refreshed in the background once at least
+# CHAT_SUMMARY_MIN_NEW_MESSAGES messages are left out of it (at most CHAT_SUMMARY_MAX_MESSAGES at once).
+CHAT_HISTORY_MAX_MESSAGES = 20
+CHAT_HISTORY_TOKEN_BUDGET = 2000
+CHAT_SUMMARY_MIN_NEW_MESSAGES = 10
+CHAT_SUMMARY_MAX_MESSAGES = 200
+# Overhead, in tokens, of each message of the chat history (role and separators).
+CHAT_MESSAGE_TOKEN_OVERHEAD = 4
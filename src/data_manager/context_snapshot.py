@@ -0,0 +1,131 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from src.config.logging_config import Logger
+from src.constants import SNAPSHOT_STATE_TTL
+from src.db_session import session_scope
+from src.utils import clock
+
+from .models import UserContextSnapshot
+
+logger = Logger('myfoodrepo.models.context_snapshot').get_logger()
+
+# User ID -> (snapshot state, time it was read at)
+_state_cache = {}
+_state_lock = threading.Lock()
+
+
+def _forget_states(user_ids):
+    with _state_lock:
+        for user_id in user_ids:
+            _state_cache.pop(user_id, None)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _forget_bumped_states(session):
+    # A state read while the bump was pending may be the uncommitted one, or the one before it
+    bumped_user_ids = session.info.pop('bumped_meals_versions', None)
+    if bumped_user_ids:
+        _forget_states(bumped_user_ids)
+
+
+def clear_snapshot_state_cache():
+    """Empties the in-memory cache of the snapshot states."""
+    with _state_lock:
+        _state_cache.clear()
+
+
+def bump_meals_version(session, user_id):
+    """
+    Marks the context snapshot of a user as outdated, after one of their meals changed.
+
+    Args:
+        session: The session in which the meal is modified (so that both are committed together).
+        user_id (int): The ID of the user whose meals changed.
+    """
+    session.execute(
+        sqlite_insert(UserContextSnapshot)
+        .values(user_id=user_id, meals_version=1)
+        .on_conflict_do_update(index_elements=['user_id'],
+                               set_={'meals_version': UserContextSnapshot.meals_version + 1})
+    )
+    session.info.setdefault('bumped_meals_versions', set()).add(user_id)
+    _forget_states([user_id])
+
+
+def get_snapshot_state(user_id):
+    """
+    Retrieves the freshness information of a user's context snapshot. The state read is reused for
+    `SNAPSHOT_STATE_TTL` seconds, unless this process changes it in the meantime.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        tuple: (meals version, version the snapshot was computed for, date it was computed on),
+               or (0, None, None) if the user has no snapshot yet.
+    """
+    with _state_lock:
+        cached = _state_cache.get(user_id)
+    if cached is not None and time.monotonic() - cached[1] < SNAPSHOT_STATE_TTL:
+        return cached[0]
+
+    read_at = time.monotonic()
+    with session_scope() as session:
+        state = (
+            session.query(UserContextSnapshot.meals_version,
+                          UserContextSnapshot.snapshot_version,
+                          UserContextSnapshot.computed_on)
+            .filter(UserContextSnapshot.user_id == user_id)
+            .first()
+        )
+        state = tuple(state) if state else (0, None, None)
+    with _state_lock:
+        _state_cache[user_id] = (state, read_at)
+    return state
+
+
+def get_snapshot_content(user_id):
+    """
+    Retrieves the content of a user's context snapshot.
+
+    Returns:
+        tuple: (recent meals, diet information, consistency metrics), or None if there is no snapshot.
+    """
+    with session_scope() as session:
+        content = (
+            session.query(UserContextSnapshot.recent_meals,
+                          UserContextSnapshot.diet_information,
+                          UserContextSnapshot.consistency_metrics)
+            .filter(UserContextSnapshot.user_id == user_id, UserContextSnapshot.snapshot_version.isnot(None))
+            .first()
+        )
+        return tuple(content) if content else None
+
+
+def store_snapshot(user_id, meals_version, computed_on, recent_meals, diet_information, consistency_metrics):
+    """
+    Stores the context snapshot computed for a given meals version of a user.
+
+    If the meals changed while the snapshot was computed, the stored version stays behind the meals
+    version, so the snapshot is recomputed on next use.
+    """
+    values = {'snapshot_version': meals_version, 'computed_on': computed_on, 'recent_meals': recent_meals,
+              'diet_information': diet_information, 'consistency_metrics': consistency_metrics,
+              'updated_at': clock.now()}
+    with session_scope() as session:
+        session.execute(
+            sqlite_insert(UserContextSnapshot)
+            .values(user_id=user_id, meals_version=meals_version, **values)
+            .on_conflict_do_update(index_elements=['user_id'], set_=values)
+        )
+    with _state_lock:
+        cached = _state_cache.get(user_id)
+        # Unless the meals changed since the state was read (which dropped it)
+        if cached is not None and cached[0][0] == meals_version:
+            _state_cache[user_id] = ((meals_version, meals_version, computed_on), cached[1])
@@ -0,0 +1,51 @@
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from src.config.logging_config import Logger
+from src.db_session import session_scope
+
+from .models import ConversationSummary, get_swiss_time
+
+logger = Logger('myfoodrepo.models.conversation_summary').get_logger()
+
+
+def get_conversation_summary(user_id):
+    """
+    Retrieves the summary of the older part of a user's conversation.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        tuple: (summary, ID of the last message it covers, number of messages it covers),
+               or (None, 0, 0) if the conversation was never summarized.
+    """
+    with session_scope() as session:
+        row = (
+            session.query(ConversationSummary.summary,
+                          ConversationSummary.summarized_until_id,
+                          ConversationSummary.messages_count)
+            .filter(ConversationSummary.user_id == user_id)
+            .first()
+        )
+        return tuple(row) if row else (None, 0, 0)
+
+
+def store_conversation_summary(user_id, summary, summarized_until_id, messages_count):
+    """
+    Inserts or replaces the summary of a user's conversation.
+
+    Args:
+        user_id (int): The ID of the user.
+        summary (str): The summary.
+        summarized_until_id (int): The ID of the last message it covers.
+        messages_count (int): The number of messages it covers.
+    """
+    values = {'summary': summary, 'summarized_until_id': summarized_until_id, 'messages_count': messages_count,
+              'updated_at': get_swiss_time()}
+    with session_scope() as session:
+        session.execute(
+            sqlite_insert(ConversationSummary)
+            .values(user_id=user_id, **values)
+            .on_conflict_do_update(index_elements=['user_id'], set_=values)
+        )
+    logger.debug(f"Stored the conversation summary of user {user_id} (until message {summarized_until_id})")
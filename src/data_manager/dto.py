@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class UserDTO:
+    """
+    Read-only snapshot of a `User` row, safe to use once its session is closed.
+
+    Relationships (reminders, meals, messages) are intentionally left out: they must be
+    retrieved through their own data manager functions instead of being lazily loaded.
+    """
+    id: int
+    phone_number: str
+    myfoodrepo_key: Optional[str]
+    gender: Optional[str]
+    age: Optional[int]
+    language: Optional[str]
+    diet_preference: Optional[str]
+    diet_goal: Optional[str]
+    study_group: Optional[int]
+    last_meal_log: Optional[datetime]
+    withdrawal: Optional[bool]
+    study_ended: Optional[bool]
+
+    @classmethod
+    def from_model(cls, user):
+        return cls(
+            id=user.id,
+            phone_number=user.phone_number,
+            myfoodrepo_key=user.myfoodrepo_key,
+            gender=user.gender,
+            age=user.age,
+            language=user.language,
+            diet_preference=user.diet_preference,
+            diet_goal=user.diet_goal,
+            study_group=user.study_group,
+            last_meal_log=user.last_meal_log,
+            withdrawal=user.withdrawal,
+            study_ended=user.study_ended,
+        )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "phone_nb": self.phone_number
+        }
+
+
+@dataclass(frozen=True)
+class MealDTO:
+    """Read-only snapshot of a `Meal` row, safe to use once its session is closed."""
+    id: int
+    user_id: int
+    description: Optional[str]
+    nutrients: Optional[dict]
+    food_ids: Optional[list]
+    eaten_quantities: Optional[list]
+    datetime: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, meal):
+        return cls(
+            id=meal.id,
+            user_id=meal.user_id,
+            description=meal.description,
+            nutrients=meal.nutrients,
+            food_ids=meal.food_ids,
+            eaten_quantities=meal.eaten_quantities,
+            datetime=meal.datetime,
+        )
+
+
+@dataclass(frozen=True)
+class MessageDTO:
+    """
+    Read-only snapshot of a `Message` row, safe to use once its session is closed.
+
+    `text` holds the content of the message whatever its role, i.e the decompressed system
+    prompt for system messages when it was loaded along with the message.
+    """
+    id: int
+    user_id: int
+    role: str
+    content: Optional[str]
+    text: Optional[str]
+    datetime: Optional[datetime]
+    twilio_message_id: Optional[str]
+    reminder_id: Optional[int]
+    system_prompt_hash: Optional[str]
+
+    @classmethod
+    def from_model(cls, message):
+        return cls(
+            id=message.id,
+            user_id=message.user_id,
+            role=message.role,
+            content=message.content,
+            text=message.text,
+            datetime=message.datetime,
+            twilio_message_id=message.twilio_message_id,
+            reminder_id=message.reminder_id,
+            system_prompt_hash=message.system_prompt_hash,
+        )
+
+
+@dataclass(frozen=True)
+class EngagementStateDTO:
+    """Read-only snapshot of a `UserEngagementState` row (an empty state when the row does not exist)."""
+    user_id: int
+    welcome_at: Optional[datetime] = None
+    last_reminder_at: Optional[datetime] = None
+    consecutive_skips: int = 0
+    last_meal_log_at: Optional[datetime] = None
+
+    @classmethod
+    def from_model(cls, state):
+        return cls(
+            user_id=state.user_id,
+            welcome_at=state.welcome_at,
+            last_reminder_at=state.last_reminder_at,
+            consecutive_skips=state.consecutive_skips or 0,
+            last_meal_log_at=state.last_meal_log_at,
+        )
@@ -0,0 +1,203 @@
+import datetime
+
+import pytz
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from src.config.logging_config import Logger
+from src.constants import SYSTEM_ROLE
+from src.db_session import session_scope
+
+from .dto import EngagementStateDTO
+from .models import Message, User, UserEngagementState
+
+logger = Logger('myfoodrepo.models.engagement').get_logger()
+
+
+def _naive(value):
+    """Drops the timezone of a (Zurich) datetime, as stored by the `DateTime` columns."""
+    return value.replace(tzinfo=None) if value is not None and value.tzinfo is not None else value
+
+
+def record_message_engagement(session, user_id, role, reminder_id, message_datetime):
+    """
+    Updates the engagement state of a user for a message written in `session`.
+
+    The first non-system message sets the welcome time, and every reminder sets the last reminder time
+    and resets the number of consecutive skipped reminders.
+
+    Args:
+        session: The session in which the message is added.
+        user_id (int): The ID of the user.
+        role (str): The role of the message.
+        reminder_id (int): The reminder the message was sent for, if any.
+        message_datetime (datetime): The datetime of the message.
+    """
+    if role == SYSTEM_ROLE:
+        return
+
+    message_datetime = _naive(message_datetime)
+    is_reminder = reminder_id is not None
+    statement = sqlite_insert(UserEngagementState).values(
+        user_id=user_id,
+        welcome_at=message_datetime,
+        last_reminder_at=message_datetime if is_reminder else None,
+        consecutive_skips=0,
+    )
+    updated_columns = {'welcome_at': func.coalesce(UserEngagementState.welcome_at, statement.excluded.welcome_at)}
+    if is_reminder:
+        updated_columns.update(last_reminder_at=statement.excluded.last_reminder_at, consecutive_skips=0)
+    session.execute(statement.on_conflict_do_update(index_elements=['user_id'], set_=updated_columns))
+
+
+def record_meal_log(session, user_id, last_meal_log):
+    """
+    Updates the last meal log of a user's engagement state, in the session where the meals are written.
+
+    Args:
+        session: The session in which the meals are written.
+        user_id (int): The ID of the user.
+        last_meal_log (datetime): The datetime of the user's most recent meal.
+    """
+    last_meal_log = _naive(last_meal_log)
+    session.execute(
+        sqlite_insert(UserEngagementState)
+        .values(user_id=user_id, last_meal_log_at=last_meal_log, consecutive_skips=0)
+        .on_conflict_do_update(index_elements=['user_id'], set_={'last_meal_log_at': last_meal_log})
+    )
+
+
+def record_skipped_reminder(user_id):
+    """
+    Counts one more skipped reminder occurrence for a user.
+
+    Args:
+        user_id (int): The ID of the user whose reminder was not sent.
+    """
+    with session_scope() as session:
+        session.execute(
+            sqlite_insert(UserEngagementState)
+            .values(user_id=user_id, consecutive_skips=1)
+            .on_conflict_do_update(index_elements=['user_id'],
+                                   set_={'consecutive_skips': UserEngagementState.consecutive_skips + 1})
+        )
+
+
+def get_engagement_state(user_id):
+    """
+    Retrieves the engagement state of a user.
+
+    Pending (buffered) messages of the user are written first, so that the state accounts for them.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        EngagementStateDTO: The state of the user (an empty state if nothing was recorded yet).
+    """
+    return get_engagement_states([user_id])[user_id]
+
+
+def get_engagement_states(user_ids):
+    """
+    Retrieves the engagement states of several users in a single query.
+
+    Args:
+        user_ids (list): The IDs of the users.
+
+    Returns:
+        dict: The `EngagementStateDTO` of each user, by user ID.
+    """
+    from .message import flush_messages
+    flush_messages()
+
+    user_ids = list(user_ids)
+    with session_scope() as session:
+        states = {
+            state.user_id: EngagementStateDTO.from_model(state)
+            for state in session.query(UserEngagementState).filter(UserEngagementState.user_id.in_(user_ids))
+        }
+    return {user_id: states.get(user_id, EngagementStateDTO(user_id)) for user_id in user_ids}
+
+
+def count_missed_reminder_slots(last_reminder_at, now, reminder_hours=(7, 12, 19)):
+    """
+    Estimates the number of reminder occurrences missed since the last reminder, from the time elapsed.
+
+    Used to initialize the skip counter of users whose reminders were sent before it was recorded.
+
+    Args:
+        last_reminder_at (datetime): The (Zurich, naive) datetime of the last reminder.
+        now (datetime): The current (aware) datetime.
+        reminder_hours (tuple): The hours at which reminders are sent.
+
+    Returns:
+        int: The number of missed reminder occurrences.
+    """
+    zurich_tz = pytz.timezone('Europe/Zurich')
+    current_time = now.astimezone(zurich_tz)
+    last_reminder_zurich = last_reminder_at.astimezone(datetime.timezone.utc).astimezone(zurich_tz)
+    days_diff = (current_time.date() - last_reminder_zurich.date()).days
+
+    if days_diff == 0:
+        return len([h for h in reminder_hours if last_reminder_zurich.hour < h <= current_time.hour])
+
+    last_day_remaining = len([h for h in reminder_hours if h > last_reminder_zurich.hour])
+    full_days_missed = max(0, days_diff - 1) * len(reminder_hours)
+    today_passed = len([h for h in reminder_hours if h <= current_time.hour])
+    return last_day_remaining + full_days_missed + today_passed
+
+
+def backfill_engagement_states(now=None):
+    """
+    Creates the engagement state of the users who do not have one yet, from their message history.
+
+    The welcome and last reminder times are computed with aggregate queries; the skip counter is
+    estimated from the time elapsed since the last reminder.
+
+    Args:
+        now (datetime, optional): The current (aware) datetime.
+
+    Returns:
+        int: The number of created states.
+    """
+    from .message import flush_messages
+    flush_messages()
+
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    with session_scope() as session:
+        welcome_at = (
+            select(func.min(Message.datetime))
+            .where(Message.user_id == User.id, Message.role != SYSTEM_ROLE)
+            .scalar_subquery()
+        )
+        last_reminder_at = (
+            select(func.max(Message.datetime))
+            .where(Message.user_id == User.id, Message.role != SYSTEM_ROLE, Message.reminder_id.isnot(None))
+            .scalar_subquery()
+        )
+        rows = (
+            session.query(User.id, welcome_at, last_reminder_at, User.last_meal_log)
+            .outerjoin(UserEngagementState, UserEngagementState.user_id == User.id)
+            .filter(UserEngagementState.user_id.is_(None))
+            .all()
+        )
+        if not rows:
+            return 0
+
+        session.execute(
+            sqlite_insert(UserEngagementState).on_conflict_do_nothing(index_elements=['user_id']),
+            [
+                {
+                    'user_id': user_id,
+                    'welcome_at': first_message,
+                    'last_reminder_at': last_reminder,
+                    'consecutive_skips': count_missed_reminder_slots(last_reminder, now) if last_reminder else 0,
+                    'last_meal_log_at': last_meal_log,
+                }
+                for user_id, first_message, last_reminder, last_meal_log in rows
+            ],
+        )
+
+    logger.info(f"🟢 Created the engagement state of {len(rows)} users")
+    return len(rows)
@@ -422,7 +422,8 @@ def generate_text_summary(panel_results, phone_number, user_key, user_diet_goal,
         response = chat_client.create_chat_completion(
             GPT_4_O,
             phone_number,
-            temperature=1
+            temperature=1,
+            purpose="health_summary"
         )
         
         summaries[config['panel_key']] = response
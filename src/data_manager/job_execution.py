@@ -0,0 +1,52 @@
+from sqlalchemy import delete, func, insert, select
+
+from src.config.logging_config import Logger
+from src.db_session import session_scope
+
+from .models import JobExecution
+
+logger = Logger('myfoodrepo.models.job_execution').get_logger()
+
+JOB_EXECUTION_COLUMNS = ('job_id', 'job_type', 'slot', 'status', 'attempt', 'started_at', 'ended_at',
+                         'duration_ms', 'error')
+
+
+def store_job_executions(rows, max_rows):
+    """
+    Writes a batch of job runs in a single transaction, and deletes the oldest runs beyond `max_rows`.
+
+    Args:
+        rows (list): The runs to write, as dictionaries of their columns.
+        max_rows (int): Number of most recent runs kept in the table.
+    """
+    with session_scope() as session:
+        session.execute(insert(JobExecution), rows)
+        newest_id = session.execute(select(func.max(JobExecution.id))).scalar()
+        if newest_id is not None and newest_id > max_rows:
+            session.execute(delete(JobExecution).where(JobExecution.id <= newest_id - max_rows))
+    logger.debug(f"Stored {len(rows)} job runs")
+
+
+def get_recent_job_executions(limit):
+    """
+    Retrieves the most recent job runs, oldest first.
+
+    Args:
+        limit (int): Maximum number of runs to return.
+
+    Returns:
+        list: The runs, as dictionaries of their columns.
+    """
+    with session_scope() as session:
+        rows = session.execute(
+            select(*[getattr(JobExecution, column) for column in JOB_EXECUTION_COLUMNS])
+            .order_by(JobExecution.id.desc())
+            .limit(limit)
+        ).all()
+    return [dict(row._mapping) for row in reversed(rows)]
+
+
+def get_latest_job_execution_id():
+    """Returns the ID of the most recent job run stored (None if there is none), which changes with every write."""
+    with session_scope() as session:
+        return session.execute(select(func.max(JobExecution.id))).scalar()
@@ -0,0 +1,83 @@
+from sqlalchemy import func, select
+
+from src.config.logging_config import Logger
+from src.db_session import session_scope
+
+from .models import LlmUsage
+
+logger = Logger('myfoodrepo.models.llm_usage').get_logger()
+
+
+def get_token_usage(response):
+    """
+    Extracts the token usage reported with a chat model response.
+
+    Args:
+        response (AIMessage): The response of the chat model.
+
+    Returns:
+        tuple: The prompt, cached and completion tokens (0 when not reported, e.g by fake models).
+    """
+    usage = getattr(response, 'usage_metadata', None) or {}
+    cached_tokens = (usage.get('input_token_details') or {}).get('cache_read') or 0
+    return usage.get('input_tokens', 0), cached_tokens, usage.get('output_tokens', 0)
+
+
+def record_llm_usage(user_id, purpose, model, prompt_tokens, cached_tokens, completion_tokens, latency_ms):
+    """
+    Stores the token usage of an OpenAI call.
+
+    Args:
+        user_id (int): The user the call was made for (None if unknown).
+        purpose (str): What the call generated (reminder, chat, health_summary).
+        model (str): The model called.
+        prompt_tokens (int): Number of input tokens.
+        cached_tokens (int): Number of input tokens read from the prompt cache.
+        completion_tokens (int): Number of output tokens.
+        latency_ms (float): Duration of the call, in milliseconds.
+    """
+    with session_scope() as session:
+        session.add(LlmUsage(user_id=user_id, purpose=purpose, model=model, prompt_tokens=prompt_tokens,
+                             cached_tokens=cached_tokens, completion_tokens=completion_tokens,
+                             latency_ms=round(latency_ms, 1)))
+    logger.debug(f"Recorded {purpose} call for user {user_id}: {prompt_tokens} prompt tokens "
+                 f"({cached_tokens} cached), {completion_tokens} completion tokens")
+
+
+def get_llm_usage_summary(since=None):
+    """
+    Aggregates the token usage of the OpenAI calls, per purpose.
+
+    Args:
+        since (datetime, optional): Only the calls made from this datetime are counted.
+
+    Returns:
+        dict: Per purpose, the number of calls, the prompt, cached and completion tokens, the share of the
+              prompt tokens served from the cache, and the average latency (in milliseconds).
+    """
+    query = (
+        select(LlmUsage.purpose,
+               func.count(LlmUsage.id),
+               func.sum(LlmUsage.prompt_tokens),
+               func.sum(LlmUsage.cached_tokens),
+               func.sum(LlmUsage.completion_tokens),
+               func.avg(LlmUsage.latency_ms))
+        .group_by(LlmUsage.purpose)
+    )
+    if since is not None:
+        query = query.where(LlmUsage.created_at >= since)
+
+    with session_scope() as session:
+        rows = session.execute(query).all()
+
+    return {
+        purpose: {
+            'calls': calls,
+            'prompt_tokens': prompt_tokens or 0,
+            'cached_tokens': cached_tokens or 0,
+            'completion_tokens': completion_tokens or 0,
+            'cache_hit_rate': round(cached_tokens / prompt_tokens, 4) if prompt_tokens else None,
+            'avg_latency_ms': round(avg_latency, 1) if avg_latency is not None else None,
+        }
+        for purpose, calls, prompt_tokens, cached_tokens, completion_tokens, avg_latency in rows
+    }
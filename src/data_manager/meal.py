@@ -1,6 +1,7 @@
-from datetime import datetime, timedelta
-from collections import defaultdict
+from datetime import datetime, time, timedelta
+from collections import OrderedDict, defaultdict
 import random
+import threading
 import json
 from flask import session,request
 import pandas as pd
@@ -9,64 +10,97 @@ from sqlalchemy import func
 from sqlalchemy.exc import MultipleResultsFound
 
 from src.config.logging_config import Logger
+from src.constants import (MANAGEMENT_PAGE_SIZE, RECENT_MEALS_CACHE_SIZE, RECENT_MEALS_DETAILED_MEALS,
+                           RECENT_MEALS_SUMMARY_DAYS, RECENT_MEALS_TOKEN_BUDGET)
 from src.db_session import session_scope
+from src.utils.pagination_utils import keyset_paginate
+from src.utils.token_utils import count_tokens
 
+from .context_snapshot import bump_meals_version, clear_snapshot_state_cache, get_snapshot_state
+from .dto import MealDTO
 from .models import Meal, User
 
 logger = Logger('myfoodrepo.models.meal').get_logger()
 
+# Nutrients kept in the one-line summaries of the older days
+SUMMARIZED_NUTRIENTS = ("energy_kcal", "protein", "carbohydrates", "fat", "fiber", "sugar", "salt")
+
+# User ID -> (meals version, {(meals_nb, token_budget): text}), least recently used user first
+_recent_meals_cache = OrderedDict()
+_recent_meals_lock = threading.Lock()
+
 
 def get_meal_by_id(meal_id):
-    """Retrieves a Meal instance using an id"""
+    """Retrieves a read-only snapshot (`MealDTO`) of a meal using an id, or None if it does not exist."""
     with session_scope() as session:
         try:
             curr_meal = session.query(Meal).filter(Meal.id == meal_id).one_or_none()
-            return curr_meal
+            return MealDTO.from_model(curr_meal) if curr_meal else None
         except MultipleResultsFound:
             logger.error(f"Duplicate entries found for meal_id {meal_id}. Fix it !")
             return None
 
 def remove_user_meal(meal_id) :
     """Removes a Meal object from the DB using an id."""
-    with session_scope() as session:
-       try: 
-        curr_meal = get_meal_by_id(meal_id)
-        if curr_meal :
+    try:
+        with session_scope() as session:
+            curr_meal = session.get(Meal, meal_id)
+            if not curr_meal:
+                logger.warning(f"Meal with ID {meal_id} not found")
+                return "Meal not found", 400
+            bump_meals_version(session, curr_meal.user_id)
             session.delete(curr_meal)
-            logger.info(f"Removed meal with ID : {meal_id}")
-            return "Meal removed", 200
-        else:
-            logger.warning(f"Meal with ID {meal_id} not found")
-            return "Meal not found", 400
-       except Exception as e :
-           logger.error(f"Failed to remove meal {meal_id}.\nError: {e}")
-           return "Error", 404
-
-def edit_meal_characteristic(meal_id):
-        """Edit a Meal object's characteristics, using an id."""
-        meal=get_meal_by_id(meal_id)
-
-        if meal :
-            meal.description = request.form.get("description")
-            meal.user_id = request.form.get("user_id")
-            datetime_str = request.form.get("datetime")
-            if datetime_str:
-                from datetime import datetime
-                meal.datetime = datetime.strptime(datetime_str, '%Y-%m-%dT%H:%M')
-
-            # Nutrients (dictionary of name → value)
-            nutrients = request.form.getlist("nutrients")
-            for key, value in request.form.items():
-                if key.startswith("nutrients["):
-                    nutrient_name = key[10:-1]
-                    try:
-                        meal.nutrients[nutrient_name] = float(value)
-                    except ValueError:
-                        return "Error"
-                    
-            return "Information updated"
-        
-        return "No meal found"
+    except Exception as e:
+        logger.error(f"Failed to remove meal {meal_id}.\nError: {e}")
+        return "Error", 404
+
+    logger.info(f"Removed meal with ID : {meal_id}")
+    return "Meal removed", 200
+
+def edit_meal_characteristic(meal_id, form):
+    """
+    Edit a Meal object's characteristics, using an id.
+
+    The form is fully validated before the meal is loaded, so that the meal is updated in a single
+    transaction, or not at all.
+
+    Args:
+        meal_id (int): The ID of the meal to update.
+        form: The submitted edition form (e.g `request.form`).
+
+    Returns:
+        str: The outcome of the update.
+    """
+    updated_nutrients = {}
+    for key, value in form.items():
+        if key.startswith("nutrients["):
+            nutrient_name = key[10:-1]
+            try:
+                updated_nutrients[nutrient_name] = float(value)
+            except ValueError:
+                return "Error"
+
+    datetime_str = form.get("datetime")
+    meal_datetime = datetime.strptime(datetime_str, '%Y-%m-%dT%H:%M') if datetime_str else None
+
+    with session_scope() as session:
+        meal = session.get(Meal, meal_id)
+        if not meal:
+            return "No meal found"
+
+        previous_user_id = meal.user_id
+        meal.description = form.get("description")
+        meal.user_id = form.get("user_id")
+        if meal_datetime:
+            meal.datetime = meal_datetime
+        # Reassigning the dictionary so that the JSON column is flagged as modified
+        meal.nutrients = {**(meal.nutrients or {}), **updated_nutrients}
+
+        bump_meals_version(session, previous_user_id)
+        if meal.user_id is not None and str(meal.user_id) != str(previous_user_id):
+            bump_meals_version(session, int(meal.user_id))
+
+    return "Information updated"
 
          
 
@@ -106,87 +140,215 @@ def get_nutrient_unit(nutrient_key):
     return unit_mapping.get(nutrient_key, "")
 
 
-def get_recent_meals_string_for_user(participation_key, meals_nb=20):
-    with session_scope() as session:
-        recent_meals = (
-            session.query(Meal)
-            .join(User)
-            .filter(User.myfoodrepo_key == participation_key)
-            .order_by(Meal.datetime.desc())
-            #.limit(meals_nb)
-            .all()
-        )
+def _format_meal(idx, label, meal_datetime, description, nutrients):
+    nutrients_text = "\n".join(f"  - {key.capitalize()}: {value} {get_nutrient_unit(key)}"
+                               for key, value in nutrients.items())
+    return (
+        f"Meal #{idx} [{label}]:\n"
+        f"  Time: {meal_datetime.strftime('%Y-%m-%d %H:%M')}\n"
+        f"  Description: {description}\n"
+        f"  Nutrients:\n{nutrients_text}\n"
+    )
 
-        if not recent_meals:
-            return "No recent meals found for this user."
 
-        meals_by_date = defaultdict(list)
-        for i, meal in enumerate(recent_meals):
-            date_str = meal.datetime.strftime('%Y-%m-%d')
-            meals_by_date[date_str].append((i, meal))
+def _sum_nutrients(nutrients_list):
+    totals = defaultdict(float)
+    for nutrients in nutrients_list:
+        for nutrient, value in nutrients.items():
+            if isinstance(value, (int, float)):
+                totals[nutrient] += value
+    return totals
 
-        result_lines = []
-        
-        daily_totals = {}
-        
-        for date in sorted(meals_by_date.keys(), reverse=True):
+
+def _line_tokens(text):
+    """Tokens of a part of the recent meals text, including the line break joining it to the next part."""
+    return count_tokens(text) + 1
+
+
+def _format_day_summary(date, meals_count, totals):
+    values = ", ".join(f"{nutrient} {totals[nutrient]:.1f} {get_nutrient_unit(nutrient)}"
+                       for nutrient in SUMMARIZED_NUTRIENTS if nutrient in totals)
+    return f"{date}: {meals_count} meal(s) - {values}"
+
+
+def render_recent_meals(detailed_meals, older_meals, token_budget):
+    """
+    Renders the recent meals of a user for the prompts, within a token budget.
+
+    The most recent days are detailed (every meal with its nutrients, then the daily totals), as long as
+    they fit in the budget; the following days are summarized in one line each (number of meals and main
+    nutrient totals), as long as they fit. The most recent meal is always included. The averages over
+    all the days given close the text.
+
+    Args:
+        detailed_meals (list): (datetime, description, nutrients) of the meals which may be detailed,
+                               most recent first, covering full days.
+        older_meals (list): (datetime, nutrients) of the meals of the older days, which are only summarized.
+        token_budget (int): Maximum number of tokens of the text (see `count_tokens`).
+
+    Returns:
+        str: The recent meals.
+    """
+    if not detailed_meals and not older_meals:
+        return "No recent meals found for this user."
+
+    meals_by_date = defaultdict(list)
+    for i, (meal_datetime, description, nutrients) in enumerate(detailed_meals):
+        meals_by_date[meal_datetime.strftime('%Y-%m-%d')].append((i, meal_datetime, description, nutrients or {}))
+    older_by_date = defaultdict(list)
+    for meal_datetime, nutrients in older_meals:
+        older_by_date[meal_datetime.strftime('%Y-%m-%d')].append(nutrients or {})
+
+    daily_totals = {date: _sum_nutrients(nutrients for *_, nutrients in meals)
+                    for date, meals in meals_by_date.items()}
+    daily_totals.update({date: _sum_nutrients(meals) for date, meals in older_by_date.items()})
+
+    summary_lines = ["\n=== COMPUTATIONAL SUMMARY ===", f"Total tracking days: {len(daily_totals)}"]
+    avg_nutrients = _sum_nutrients(daily_totals.values())
+    summary_lines.append(f"Average daily intake over {len(daily_totals)} days:")
+    for nutrient, total in avg_nutrients.items():
+        summary_lines.append(f"  - {nutrient}: {total / len(daily_totals):.1f} {get_nutrient_unit(nutrient)}/day")
+    summary_lines.append("========================\n")
+    summary_text = "\n".join(summary_lines)
+
+    remaining = token_budget - _line_tokens(summary_text)
+    result_lines = []
+    summarized_dates = sorted(older_by_date, reverse=True)
+    detailed_dates = sorted(meals_by_date, reverse=True)
+
+    for position, date in enumerate(detailed_dates):
+        meal_blocks = [_format_meal(idx, "MOST RECENT" if i == 0 else f"PREVIOUS #{i}", meal_datetime,
+                                    description, nutrients)
+                       for idx, (i, meal_datetime, description, nutrients) in enumerate(meals_by_date[date], start=1)]
+        totals_lines = [f"DAILY TOTALS for {date}:"]
+        totals_lines += [f"  Total {nutrient}: {total:.1f} {get_nutrient_unit(nutrient)}"
+                         for nutrient, total in daily_totals[date].items()]
+        day_block = "\n".join([f"Date: {date}\n", *meal_blocks, *totals_lines, "---\n"])
+        day_tokens = _line_tokens(day_block)
+
+        if day_tokens <= remaining:
+            result_lines.append(day_block)
+            remaining -= day_tokens
+            continue
+
+        if position == 0:
+            # Not even the most recent day fits: its most recent meals only (its totals are summarized)
             result_lines.append(f"Date: {date}\n")
-            
-            date_totals = defaultdict(float)
-            
-            for idx, (i, meal) in enumerate(meals_by_date[date], start=1):
-                meal_label = "MOST RECENT" if i == 0 else f"PREVIOUS #{i}"
-                timestamp = meal.datetime.strftime('%Y-%m-%d %H:%M')
-                description = meal.description
-                nutrients = meal.nutrients
-
-                for nutrient, value in nutrients.items():
-                    if isinstance(value, (int, float)):
-                        date_totals[nutrient] += value
-
-                # Format nutrients
-                nutrients_lines = []
-                for key, value in nutrients.items():
-                    unit = get_nutrient_unit(key)
-                    nutrients_lines.append(f"  - {key.capitalize()}: {value} {unit}")
-
-                nutrients_text = "\n".join(nutrients_lines)
-
-                meal_text = (
-                    f"Meal #{idx} [{meal_label}]:\n"
-                    f"  Time: {timestamp}\n"
-                    f"  Description: {description}\n"
-                    f"  Nutrients:\n{nutrients_text}\n"
-                )
-                result_lines.append(meal_text)
-            
-            daily_totals[date] = dict(date_totals)
-            result_lines.append(f"DAILY TOTALS for {date}:")
-            for nutrient, total in date_totals.items():
-                unit = get_nutrient_unit(nutrient)
-                result_lines.append(f"  Total {nutrient}: {total:.1f} {unit}")
-            result_lines.append("---\n")
-
-        result_lines.append("\n=== COMPUTATIONAL SUMMARY ===")
-        result_lines.append(f"Total tracking days: {len(daily_totals)}")
-        
-        # weekly/period averages for common nutrients
-        if daily_totals:
-            avg_nutrients = defaultdict(float)
-            for date, totals in daily_totals.items():
-                for nutrient, value in totals.items():
-                    avg_nutrients[nutrient] += value
-            
-            num_days = len(daily_totals)
-            result_lines.append(f"Average daily intake over {num_days} days:")
-            for nutrient, total in avg_nutrients.items():
-                avg = total / num_days
-                unit = get_nutrient_unit(nutrient)
-                result_lines.append(f"  - {nutrient}: {avg:.1f} {unit}/day")
-        
-        result_lines.append("========================\n")
+            remaining -= _line_tokens(result_lines[-1])
+            for block in meal_blocks:
+                block_tokens = _line_tokens(block)
+                if len(result_lines) > 1 and block_tokens > remaining:
+                    break
+                result_lines.append(block)
+                remaining -= block_tokens
+        summarized_dates = detailed_dates[position:] + summarized_dates
+        break
+
+    if summarized_dates:
+        header = "Earlier days (daily totals):"
+        # Room for the header, and for the number of days omitted if not all of them fit
+        remaining -= _line_tokens(header) + _line_tokens(f"({len(summarized_dates)} earlier days omitted)")
+        day_lines = []
+        for date in summarized_dates:
+            meals_count = len(meals_by_date[date]) or len(older_by_date[date])
+            line = _format_day_summary(date, meals_count, daily_totals[date])
+            line_tokens = _line_tokens(line)
+            if line_tokens > remaining:
+                break
+            day_lines.append(line)
+            remaining -= line_tokens
+        if day_lines:
+            omitted = len(summarized_dates) - len(day_lines)
+            result_lines.append("\n".join([header, *day_lines]
+                                           + ([f"({omitted} earlier days omitted)"] if omitted else [])))
+
+    result_lines.append(summary_text)
+    return "\n".join(result_lines)
+
+
+def _get_cached_recent_meals(user_id, meals_version, variant):
+    with _recent_meals_lock:
+        entry = _recent_meals_cache.get(user_id)
+        if entry is None or entry[0] != meals_version:
+            return None
+        _recent_meals_cache.move_to_end(user_id)
+        return entry[1].get(variant)
+
+
+def _cache_recent_meals(user_id, meals_version, variant, text):
+    with _recent_meals_lock:
+        entry = _recent_meals_cache.get(user_id)
+        if entry is None or entry[0] != meals_version:
+            # Older versions of the user's meals can never be requested again
+            entry = _recent_meals_cache[user_id] = (meals_version, {})
+        entry[1][variant] = text
+        _recent_meals_cache.move_to_end(user_id)
+        while len(_recent_meals_cache) > RECENT_MEALS_CACHE_SIZE:
+            _recent_meals_cache.popitem(last=False)
+
+
+def get_recent_meals_string_for_user(participation_key, meals_nb=RECENT_MEALS_DETAILED_MEALS,
+                                     token_budget=RECENT_MEALS_TOKEN_BUDGET):
+    """
+    Retrieves the recent meals of a user, as injected in the prompts (see `render_recent_meals`).
+
+    Only the `meals_nb` most recent meals are loaded in detail, and the daily totals of the
+    `RECENT_MEALS_SUMMARY_DAYS` days before them. The text is cached until the user's meals change
+    (meals version).
+
+    Args:
+        participation_key (str): The MyFoodRepo participation key of the user.
+        meals_nb (int): Maximum number of meals detailed.
+        token_budget (int): Maximum number of tokens of the text.
 
-        return "\n".join(result_lines)
+    Returns:
+        str: The recent meals.
+    """
+    with session_scope() as session:
+        user_id = session.query(User.id).filter(User.myfoodrepo_key == participation_key).scalar()
+        if user_id is None:
+            return "No recent meals found for this user."
+
+        meals_version = get_snapshot_state(user_id)[0]
+        text = _get_cached_recent_meals(user_id, meals_version, (meals_nb, token_budget))
+        if text is not None:
+            return text
+
+        detailed_meals = (
+            session.query(Meal.datetime, Meal.description, Meal.nutrients)
+            .filter(Meal.user_id == user_id)
+            .order_by(Meal.datetime.desc())
+            .limit(meals_nb)
+            .all()
+        )
+
+        older_meals = []
+        if detailed_meals:
+            oldest_day = datetime.combine(detailed_meals[-1][0].date(), time.min)
+            if len(detailed_meals) == meals_nb and detailed_meals[0][0] >= oldest_day + timedelta(days=1):
+                # The oldest day may be cut by the limit: it is only summarized, from all its meals
+                detailed_meals = [meal for meal in detailed_meals if meal[0] >= oldest_day + timedelta(days=1)]
+                summary_end = oldest_day + timedelta(days=1)
+            else:
+                summary_end = oldest_day
+            older_meals = (
+                session.query(Meal.datetime, Meal.nutrients)
+                .filter(Meal.user_id == user_id,
+                        Meal.datetime >= summary_end - timedelta(days=RECENT_MEALS_SUMMARY_DAYS),
+                        Meal.datetime < summary_end)
+                .all()
+            )
+
+    text = render_recent_meals(detailed_meals, older_meals, token_budget)
+    _cache_recent_meals(user_id, meals_version, (meals_nb, token_budget), text)
+    return text
+
+
+def clear_recent_meals_cache():
+    """Empties the in-memory cache of the recent meals texts."""
+    with _recent_meals_lock:
+        _recent_meals_cache.clear()
+    clear_snapshot_state_cache()
 
     
 def get_df_meals_for_user(participation_key):
@@ -292,6 +454,22 @@ def get_all_meals(datetime_sort=False):
         elif datetime_sort is True :
             return session.query(Meal).order_by(Meal.datetime.desc()).all()
 
+def get_meals_page(after=None, before=None, per_page=MANAGEMENT_PAGE_SIZE):
+    """
+    Retrieves one page of meals, most recent first, using keyset pagination on (datetime, id).
+
+    Args:
+        after (str, optional): Cursor of the last meal of the previous page.
+        before (str, optional): Cursor of the first meal of the next page.
+        per_page (int): Number of meals per page.
+
+    Returns:
+        tuple: (list of `Meal` objects, next page cursor, previous page cursor)
+    """
+    with session_scope() as session:
+        return keyset_paginate(session.query(Meal), Meal.id, Meal.datetime,
+                               after=after, before=before, per_page=per_page)
+
 #def get_random_meal_datetime(date, meal_description):
 #
 #    """
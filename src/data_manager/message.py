@@ -1,30 +1,167 @@
+import atexit
 import datetime
+import hashlib
+import os
+import zlib
 from datetime import datetime, timedelta
 from collections import defaultdict
+from flask import current_app, has_app_context
 from sqlalchemy import func, case
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload
 
 from src.config.logging_config import Logger
+from src.constants import (MANAGEMENT_PAGE_SIZE, MESSAGE_DURABILITY_MODE, MESSAGE_DURABILITY_MODE_ENV_KEY,
+                           MESSAGE_FLUSH_INTERVAL, MESSAGE_FLUSH_MAX_BATCH, SYSTEM_ROLE)
 from src.data_manager.user import get_user
 from src.db_session import session_scope
+from src.utils.pagination_utils import keyset_paginate
+from src.utils.write_buffer import WriteBehindBuffer
 
-from .models import Message, User
+from .dto import MessageDTO
+from .engagement import record_message_engagement
+from .models import Message, SystemPrompt, User, get_swiss_time
+from .schema import has_column
 
 logger = Logger('myfoodrepo.models.message').get_logger()
 
 
-def get_user_messages(user_id):
+def get_user_messages(user_id, include_system_prompts=True):
     """
     Retrieves all messages associated with a specified `user_id`, ordered by date & time.
 
     Args:
         user_id (int): The ID of the user whose messages are being retrieved.
+        include_system_prompts (bool): If False, system prompts are left out of the history.
 
     Returns:
-        list: A list of `Message` objects associated with the specified user_id, ordered by date & time.
+        list: A list of `MessageDTO` associated with the specified user_id, ordered by date & time.
 
     """
+    flush_messages(user_id)
     with session_scope() as session:
-        return session.query(Message).filter_by(user_id=user_id).order_by(Message.datetime).all()
+        query = session.query(Message).filter_by(user_id=user_id)
+        if include_system_prompts:
+            query = query.options(joinedload(Message.system_prompt))
+        else:
+            query = query.filter(Message.role != SYSTEM_ROLE)
+        return [MessageDTO.from_model(message) for message in query.order_by(Message.datetime).all()]
+
+
+def get_latest_system_prompt(user_id):
+    """
+    Retrieves the text of the most recent system prompt used for a user.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        str: The decompressed system prompt, or None if no system prompt was ever stored for the user.
+    """
+    flush_messages(user_id)
+    with session_scope() as session:
+        prompt = (
+            session.query(SystemPrompt)
+            .join(Message, Message.system_prompt_hash == SystemPrompt.hash)
+            .filter(Message.user_id == user_id)
+            .order_by(Message.datetime.desc(), Message.id.desc())
+            .first()
+        )
+        if prompt is not None:
+            return prompt.text
+
+        # Fallback for system prompts stored inline, before the out-of-line storage.
+        legacy_prompt = (
+            session.query(Message.content)
+            .filter(Message.user_id == user_id, Message.role == SYSTEM_ROLE, Message.content.isnot(None))
+            .order_by(Message.datetime.desc(), Message.id.desc())
+            .first()
+        )
+        return legacy_prompt[0] if legacy_prompt else None
+
+
+def get_chat_history(user_id, max_messages):
+    """
+    Loads, in a single session, the history a chat completion needs.
+
+    Args:
+        user_id (int): The ID of the user.
+        max_messages (int): Maximum number of conversation messages (system prompts excluded) returned.
+
+    Returns:
+        tuple: The latest system prompt (None if there is none), the `max_messages` most recent
+               conversation messages (`MessageDTO`, oldest first), and the last message of any role
+               (the input of the completion, None if the user has no messages).
+    """
+    flush_messages(user_id)
+    with session_scope() as session:
+        last_message = (
+            session.query(Message)
+            .options(joinedload(Message.system_prompt))
+            .filter(Message.user_id == user_id)
+            .order_by(Message.datetime.desc(), Message.id.desc())
+            .first()
+        )
+        if last_message is None:
+            return None, [], None
+        last_message = MessageDTO.from_model(last_message)
+
+        recent_messages = (
+            session.query(Message)
+            .filter(Message.user_id == user_id, Message.role != SYSTEM_ROLE)
+            .order_by(Message.datetime.desc(), Message.id.desc())
+            .limit(max_messages)
+            .all()
+        )
+        recent_messages = [MessageDTO.from_model(message) for message in reversed(recent_messages)]
+
+        system_prompt = last_message.text if last_message.role == SYSTEM_ROLE else get_latest_system_prompt(user_id)
+    return system_prompt, recent_messages, last_message
+
+
+def get_conversation_messages(user_id, after_id, before_id, limit):
+    """
+    Retrieves the conversation messages (system prompts excluded) of a user between two message IDs.
+
+    Args:
+        user_id (int): The ID of the user.
+        after_id (int): Only the messages with a greater ID are returned.
+        before_id (int): Only the messages with a lower ID are returned (no upper bound if None).
+        limit (int): Maximum number of messages returned (the oldest ones).
+
+    Returns:
+        list: The `MessageDTO`, oldest first.
+    """
+    flush_messages(user_id)
+    with session_scope() as session:
+        query = session.query(Message).filter(Message.user_id == user_id, Message.role != SYSTEM_ROLE,
+                                              Message.id > after_id)
+        if before_id is not None:
+            query = query.filter(Message.id < before_id)
+        return [MessageDTO.from_model(message) for message in query.order_by(Message.id).limit(limit).all()]
+
+
+def store_system_prompt(session, content):
+    """
+    Stores a system prompt in the content-addressed `system_prompts` table, if not already present.
+
+    Args:
+        session: The current database session.
+        content (str): The text of the system prompt.
+
+    Returns:
+        str: The hash under which the prompt is stored.
+    """
+    prompt_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    session.execute(
+        sqlite_insert(SystemPrompt)
+        .values(hash=prompt_hash,
+                content=zlib.compress(content.encode('utf-8')),
+                size=len(content),
+                created_at=datetime.now())
+        .on_conflict_do_nothing(index_elements=['hash'])
+    )
+    return prompt_hash
 
         
 def get_study_group_messages(group):
@@ -35,17 +172,19 @@ def get_study_group_messages(group):
         group (`int`): The study group's number (0,1,2 or 3.)
 
     Returns:
-        list: A `list`, containing all `Message` objects for a specific study group.
+        list: A `list`, containing the `MessageDTO` of all messages for a specific study group.
     """  
 
+    flush_messages()
     with session_scope() as session:
-        return (
+        messages = (
             session.query(Message)
             .join(User, User.id == Message.user_id) 
             .filter(User.study_group == group)  
             .filter(Message.twilio_message_id.isnot(None))
             .all()
         )
+        return [MessageDTO.from_model(message) for message in messages]
     
 def get_user_messages_per_hour(): #TODO : Modify this function's name
 
@@ -60,6 +199,7 @@ def get_user_messages_per_hour(): #TODO : Modify this function's name
                     count of user messages for that hour.
     """
 
+    flush_messages()
     with session_scope() as session:
         results = session.query(
             func.extract('hour', Message.datetime).label('hour'),
@@ -87,6 +227,7 @@ def get_messages_count_per_day(): #TODO : Modify this function's name to get_dai
                     and the count of user messages for that day.
     """
 
+    flush_messages()
     with session_scope() as session:
         results = session.query(
             func.date(Message.datetime),
@@ -126,6 +267,7 @@ def get_messages_count_per_day_per_study_group(): #TODO : Use the get_messages_c
         dict: A dictionary where the key is the study group number, and the value is a list of dictionaries
               containing the date and user message count for that study group.
     """
+    flush_messages()
     with session_scope() as session:
 
         #We Query to count the number of messages per study group per day.
@@ -176,21 +318,45 @@ def get_all_messages(filter_twilio_message_id=None, filter_assistant_messages =
         filter_twilio_message_id (bool or None): If True, only retrieves messages where twilio_message_id is not None.
 
     Returns:
-        list: A list of `Message` objects from the database, optionally filtered by twilio_message_id.
+        list: A list of `MessageDTO` from the database, optionally filtered by twilio_message_id.
     """
+    flush_messages()
     with session_scope() as session:
-        
+        query = session.query(Message).options(joinedload(Message.system_prompt))
         if filter_twilio_message_id:
             logger.debug(f"🟢 Retrieving all messages having a Twilio Message ID")
-            return session.query(Message).filter(Message.twilio_message_id != None).all()
+            query = query.filter(Message.twilio_message_id != None)
         elif filter_assistant_messages:
             logger.debug(f"🟢 Retrieving all users & assitant messages")
-            return session.query(Message).filter(Message.role != "system").all()
+            query = query.filter(Message.role != "system")
         else:
             logger.debug(f"🟢 Retrieving all messages in the database")
-            return session.query(Message).all()
+        return [MessageDTO.from_model(message) for message in query.all()]
         
 
+def get_messages_page(after=None, before=None, per_page=MANAGEMENT_PAGE_SIZE, filter_assistant_messages=True):
+    """
+    Retrieves one page of messages, most recent first, using keyset pagination on (datetime, id).
+
+    Args:
+        after (str, optional): Cursor of the last message of the previous page.
+        before (str, optional): Cursor of the first message of the next page.
+        per_page (int): Number of messages per page.
+        filter_assistant_messages (bool): If True, only user & assistant messages are retrieved.
+
+    Returns:
+        tuple: (list of `MessageDTO`, next page cursor, previous page cursor)
+    """
+    flush_messages()
+    with session_scope() as session:
+        query = session.query(Message).options(joinedload(Message.system_prompt))
+        if filter_assistant_messages:
+            query = query.filter(Message.role != SYSTEM_ROLE)
+        messages, next_cursor, previous_cursor = keyset_paginate(query, Message.id, Message.datetime,
+                                                                 after=after, before=before, per_page=per_page)
+        return [MessageDTO.from_model(message) for message in messages], next_cursor, previous_cursor
+
+
 def get_study_start_date():
     """ 
     Retrieves the date at which the study officially started, using the first welcome message.
@@ -199,16 +365,14 @@ def get_study_start_date():
         datetime: The datetime object at which the study started.
     """
 
-    all_messages = get_all_messages(filter_twilio_message_id=True)
-    if not all_messages:
-        return None 
-
-    relevant_messages = [msg for msg in all_messages if "MyFoodRepo" in msg.content]
-    if not relevant_messages:
-        return None 
-
-    earliest_message = min(relevant_messages, key=lambda msg: msg.datetime)
-    return earliest_message.datetime
+    flush_messages()
+    with session_scope() as session:
+        return (
+            session.query(func.min(Message.datetime))
+            .filter(Message.twilio_message_id.isnot(None),
+                    Message.content.contains("MyFoodRepo"))
+            .scalar()
+        )
 
 
 
@@ -232,10 +396,92 @@ def db_add_message(user_id, role, content, twilio_message_id,reminder_id):
         logger.error("🛑 Attempted to insert a message with user_id=None!")
         return
 
+    row = {'user_id': user_id, 'role': role, 'content': content, 'twilio_message_id': twilio_message_id,
+           'reminder_id': reminder_id, 'datetime': get_swiss_time()}
+
+    if get_message_durability_mode() == "batched":
+        logger.info(f"Buffered message for user: {user_id}, with role: {role}\n")
+        message_buffer.add(user_id, row)
+        return
+
+    logger.info(f"Prepared to insert message for user: {user_id}, with role: {role}\n")
+    with session_scope() as session:
+        _add_message_row(session, row)
+
+
+def _add_message_row(session, row):
+    """
+    Adds a message, given as a dictionary of its columns, to the session (storing system prompts out-of-line),
+    and updates the engagement state of its user accordingly.
+    """
+    content = row['content']
+    system_prompt_hash = None
+    if row['role'] == SYSTEM_ROLE and content:
+        system_prompt_hash = store_system_prompt(session, content)
+        content = None
+    message = Message(user_id=row['user_id'], role=row['role'], content=content,
+                      twilio_message_id=row['twilio_message_id'], reminder_id=row['reminder_id'],
+                      system_prompt_hash=system_prompt_hash)
+    message.datetime = row['datetime']
+    session.add(message)
+    record_message_engagement(session, row['user_id'], row['role'], row['reminder_id'], row['datetime'])
+
+
+def get_message_durability_mode():
+    """
+    Returns the durability mode of the message log ("immediate" or "batched"): the MESSAGE_DURABILITY_MODE
+    setting of the current application if any, else the environment variable of the same name, else the
+    default of the constants.
+    """
+    if has_app_context() and current_app.config.get('MESSAGE_DURABILITY_MODE'):
+        return current_app.config['MESSAGE_DURABILITY_MODE']
+    return os.environ.get(MESSAGE_DURABILITY_MODE_ENV_KEY, MESSAGE_DURABILITY_MODE)
+
+
+def write_message_rows(rows):
+    """
+    Writes a batch of buffered messages in a single savepoint of the thread's session, committed when
+    the outermost scope ends. The flushing thread's connection is reused, so a flush triggered by a reader
+    called within a transaction does not wait for the lock that transaction holds on the database (the
+    flushed messages are then committed, or rolled back, with it).
+
+    If the batch fails (e.g. a duplicated Twilio message ID), the messages are written one by one so
+    that a single invalid message does not cause the others to be lost.
+
+    Args:
+        rows (list): The messages to write, as dictionaries of their columns.
+    """
     with session_scope() as session:
-        logger.info(f"Prepared to insert message for user: {user_id}, with role: {role}\n")
-        message = Message(user_id=user_id, role=role, content=content, twilio_message_id=twilio_message_id,reminder_id=reminder_id)
-        session.add(message)   
+        try:
+            with session.begin_nested():
+                for row in rows:
+                    _add_message_row(session, row)
+            logger.debug(f"✅ Wrote {len(rows)} buffered messages in one transaction")
+            return
+        except Exception as e:
+            logger.warning(f"Batched write of {len(rows)} messages failed ({e}), writing them one by one")
+
+        for row in rows:
+            try:
+                with session.begin_nested():
+                    _add_message_row(session, row)
+            except Exception as e:
+                logger.error(f"🛑 Failed to write message for user {row['user_id']} with role {row['role']}: {e}")
+
+
+def flush_messages(user_id=None):
+    """
+    Writes the buffered messages to the database.
+
+    Args:
+        user_id (int, optional): If given, only flushes when messages of this user are pending.
+    """
+    message_buffer.flush(user_id)
+
+
+message_buffer = WriteBehindBuffer(write_message_rows, flush_interval=MESSAGE_FLUSH_INTERVAL,
+                                   max_batch=MESSAGE_FLUSH_MAX_BATCH, name="message-write-buffer")
+atexit.register(message_buffer.stop)
 
 def db_add_message_from_phone_number(phone_number, role, content, twilio_message_id,reminder_id):
 
@@ -263,6 +509,45 @@ def db_add_message_from_phone_number(phone_number, role, content, twilio_message
     return "Message Sent with NO erros", 200
 
 
+def migrate_inline_system_prompts(batch_size=500):
+    """
+    Moves the system prompts still stored inline in the `messages` table to the `system_prompts` table.
+
+    Args:
+        batch_size (int): Number of messages migrated per transaction.
+
+    Returns:
+        int: The number of migrated messages.
+    """
+    with session_scope() as session:
+        if not has_column(session.connection(), 'messages', 'system_prompt_hash'):
+            logger.warning("⚠️ The messages table has no system_prompt_hash column (schema not upgraded), "
+                           "inline system prompts left in place")
+            return 0
+
+    migrated = 0
+    while True:
+        with session_scope() as session:
+            messages = (
+                session.query(Message)
+                .filter(Message.role == SYSTEM_ROLE,
+                        Message.system_prompt_hash.is_(None),
+                        Message.content.isnot(None))
+                .limit(batch_size)
+                .all()
+            )
+            if not messages:
+                break
+            for message in messages:
+                message.system_prompt_hash = store_system_prompt(session, message.content)
+                message.content = None
+            migrated += len(messages)
+
+    if migrated:
+        logger.info(f"🟢 Moved {migrated} inline system prompts to the system_prompts table")
+    return migrated
+
+
 def checking_message_sanity():
     """
     Performs several sanity checks on the Messages table.
@@ -273,6 +558,7 @@ def checking_message_sanity():
     """
     
     
+    flush_messages()
     with session_scope() as session:
         messages = session.query(Message).all()
 
@@ -286,7 +572,7 @@ def checking_message_sanity():
 
     for msg in messages:
         # Missing user_id, role or conten
-        if not msg.user_id or not msg.role or not msg.content:
+        if not msg.user_id or not msg.role or not (msg.content or msg.system_prompt_hash):
             missing_fields[msg.id] = msg.user_id
 
         # Assistant messages missing Twilio ID
@@ -1,8 +1,11 @@
 from datetime import datetime
 import pytz
+import zlib
 
 from flask_sqlalchemy import SQLAlchemy
 
+from src.utils import clock
+
 db = SQLAlchemy()
 
 class User(db.Model):
@@ -138,9 +141,42 @@ class Meal(db.Model):
 
 def get_swiss_time():
     tz = pytz.timezone('Europe/Zurich')
-    return datetime.now(tz)
+    return clock.now(tz)
+
+
+class SystemPrompt(db.Model):
+    """
+    Represents a system prompt, stored once and referenced by the messages using it.
+
+    This class defines the structure of the `system_prompts` table, a content-addressed store for the
+    (multi-kilobyte) system prompts used to generate reminders and chat answers. Prompts are keyed by
+    the SHA-256 hash of their text and stored zlib-compressed, so identical prompts are only kept once.
+
+    Attributes:
+        hash (str): The SHA-256 hex digest of the prompt text (Primary Key).
+        content (bytes): The zlib-compressed prompt text.
+        size (int): The length of the uncompressed prompt text, in characters.
+        created_at (datetime): The datetime at which the prompt was first stored.
+    """
+    __tablename__ = 'system_prompts'
+    hash = db.Column(db.String(64), primary_key=True)
+    content = db.Column(db.LargeBinary, nullable=False)
+    size = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=get_swiss_time)
+
+    @property
+    def text(self):
+        return zlib.decompress(self.content).decode('utf-8')
+
 
 class Message(db.Model):
+    """
+    Represents a message exchanged with a user (or a system prompt used to answer them).
+
+    System prompts are not stored inline: their `content` is left empty and `system_prompt_hash`
+    references the corresponding `SystemPrompt` row. Use the `text` property to get the content of
+    any message, whatever its role.
+    """
     __tablename__ = 'messages'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -149,11 +185,186 @@ class Message(db.Model):
     datetime = db.Column(db.DateTime, default=get_swiss_time)
     twilio_message_id = db.Column(db.String(255), unique=True, nullable=True)
     reminder_id = db.Column(db.Integer, db.ForeignKey('reminders.id'), nullable=True)  
-    
+    system_prompt_hash = db.Column(db.String(64), db.ForeignKey('system_prompts.hash'), nullable=True)
+    system_prompt = db.relationship('SystemPrompt', lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_messages_user_id_datetime', 'user_id', 'datetime'),
+    )
 
-    def __init__(self, user_id, role, content, twilio_message_id, reminder_id=None):
+    def __init__(self, user_id, role, content, twilio_message_id, reminder_id=None, system_prompt_hash=None):
         self.user_id = user_id
         self.role = role
         self.content = content
         self.twilio_message_id = twilio_message_id
         self.reminder_id = reminder_id
+        self.system_prompt_hash = system_prompt_hash
+
+    @property
+    def text(self):
+        if self.system_prompt_hash is not None and self.system_prompt is not None:
+            return self.system_prompt.text
+        return self.content
+
+
+class PregeneratedReminder(db.Model):
+    """
+    Represents the outcome of a reminder evaluated (and, if sent, generated) ahead of its time slot.
+
+    One row is kept per reminder, for its next occurrence. It is consumed by the send job, and only used
+    if it is still valid and the user did not log a meal since it was prepared.
+
+    Attributes:
+        reminder_id (int): The reminder the text was prepared for (Primary Key, references `reminders.id`).
+        user_id (int): The user the reminder is sent to (references `users.id`).
+        skip (bool): True if the reminder should not be sent at this occurrence.
+        text (str): The reminder text to send (None when skipped).
+        system_prompt_hash (str): The system prompt the text was generated with (references `system_prompts.hash`),
+                                  added to the user's history only once the reminder is sent.
+        last_meal_log (datetime): The user's last meal log when the reminder was prepared.
+        generated_at (datetime): The datetime at which the reminder was prepared.
+        valid_until (datetime): The datetime after which the prepared reminder is stale.
+    """
+    __tablename__ = 'pregenerated_reminders'
+    reminder_id = db.Column(db.Integer, db.ForeignKey('reminders.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    skip = db.Column(db.Boolean, default=False, nullable=False)
+    text = db.Column(db.Text)
+    system_prompt_hash = db.Column(db.String(64), db.ForeignKey('system_prompts.hash'), nullable=True)
+    last_meal_log = db.Column(db.DateTime)
+    generated_at = db.Column(db.DateTime, default=get_swiss_time)
+    valid_until = db.Column(db.DateTime, nullable=False)
+    system_prompt = db.relationship('SystemPrompt', lazy=True)
+
+
+class UserContextSnapshot(db.Model):
+    """
+    Represents the precomputed context of a user (recent meals, diet information, eating consistency),
+    shared by the reminder and the chat prompts.
+
+    `meals_version` is incremented every time one of the user's meals is added, updated or removed; the
+    snapshot is up to date when it was computed for the current version (`snapshot_version`) and today
+    (the consistency metrics depend on the current date).
+
+    Attributes:
+        user_id (int): The user the context belongs to (Primary Key, references `users.id`).
+        meals_version (int): The version of the user's meals.
+        snapshot_version (int): The meals version the snapshot was computed for.
+        computed_on (date): The date the snapshot was computed on.
+        recent_meals (str): The formatted recent meals of the user.
+        diet_information (list): The nutritional information about the user's diet.
+        consistency_metrics (dict): The user's logging consistency metrics.
+        updated_at (datetime): The datetime at which the snapshot was computed.
+    """
+    __tablename__ = 'user_context_snapshots'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    meals_version = db.Column(db.Integer, default=0, nullable=False)
+    snapshot_version = db.Column(db.Integer)
+    computed_on = db.Column(db.Date)
+    recent_meals = db.Column(db.Text)
+    diet_information = db.Column(db.JSON)
+    consistency_metrics = db.Column(db.JSON)
+    updated_at = db.Column(db.DateTime, default=get_swiss_time)
+
+
+class UserEngagementState(db.Model):
+    """
+    Represents the engagement state of a user, read to decide whether a reminder should be sent.
+
+    The row is updated in the same transaction as the messages (welcome and reminder times) and meals
+    (last meal log) it is derived from, so the reminder eligibility does not have to scan the history.
+
+    Attributes:
+        user_id (int): The user the state belongs to (Primary Key, references `users.id`).
+        welcome_at (datetime): The datetime of the user's first (welcome) message.
+        last_reminder_at (datetime): The datetime of the last reminder sent to the user.
+        consecutive_skips (int): Number of reminder occurrences skipped since the last sent reminder (informative:
+                                 the forced reminder counts the occurrences elapsed, see `should_skip_reminder`).
+        last_meal_log_at (datetime): The datetime of the user's most recent meal log.
+        updated_at (datetime): The datetime at which the state was last updated.
+    """
+    __tablename__ = 'user_engagement_states'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    welcome_at = db.Column(db.DateTime)
+    last_reminder_at = db.Column(db.DateTime)
+    consecutive_skips = db.Column(db.Integer, default=0, nullable=False)
+    last_meal_log_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=get_swiss_time, onupdate=get_swiss_time)
+
+
+class JobExecution(db.Model):
+    """
+    Represents one run of a scheduler job. Only the most recent runs are kept (ring buffer, see
+    `src.scheduler.job_history`).
+
+    Attributes:
+        id (int): Unique identifier of the run (Primary Key).
+        job_id (str): The ID of the job (e.g `reminder_slot_1900`, `reminder_12`).
+        job_type (str): The type of the job, i.e its ID without the slot or reminder suffix.
+        slot (str): The reminder slot (`HH:MM`) the run belongs to, if any.
+        status (str): The outcome of the run (completed, failed, retrying, stale, missed, deferred, ...).
+        attempt (int): The attempt number of the run.
+        started_at (datetime): The datetime at which the run started.
+        ended_at (datetime): The datetime at which the run ended.
+        duration_ms (float): The duration of the run, in milliseconds.
+        error (str): The error message of a failed run.
+    """
+    __tablename__ = 'job_executions'
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(64), nullable=False)
+    job_type = db.Column(db.String(32), nullable=False, index=True)
+    slot = db.Column(db.String(5))
+    status = db.Column(db.String(16), nullable=False)
+    attempt = db.Column(db.Integer, default=1, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False)
+    ended_at = db.Column(db.DateTime, nullable=False)
+    duration_ms = db.Column(db.Float, default=0.0, nullable=False)
+    error = db.Column(db.Text)
+
+
+class LlmUsage(db.Model):
+    """
+    Represents the token usage of one OpenAI call, to follow the share of the prompts served from
+    OpenAI's prompt cache.
+
+    Attributes:
+        id (int): Unique identifier of the call (Primary Key).
+        user_id (int): The user the call was made for.
+        purpose (str): What the call generated (reminder, chat, health_summary).
+        model (str): The model called.
+        prompt_tokens (int): Number of input tokens.
+        cached_tokens (int): Number of input tokens read from the prompt cache.
+        completion_tokens (int): Number of output tokens.
+        latency_ms (float): Duration of the call, in milliseconds.
+        created_at (datetime): The datetime of the call.
+    """
+    __tablename__ = 'llm_usage'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    purpose = db.Column(db.String(32), nullable=False)
+    model = db.Column(db.String(64))
+    prompt_tokens = db.Column(db.Integer, default=0, nullable=False)
+    cached_tokens = db.Column(db.Integer, default=0, nullable=False)
+    completion_tokens = db.Column(db.Integer, default=0, nullable=False)
+    latency_ms = db.Column(db.Float, default=0.0, nullable=False)
+    created_at = db.Column(db.DateTime, default=get_swiss_time, nullable=False, index=True)
+
+
+class ConversationSummary(db.Model):
+    """
+    Represents the rolling summary of the older part of a user's conversation, given to the LLM
+    instead of the messages it covers (see `src.communication.chat_history`).
+
+    Attributes:
+        user_id (int): The user the conversation is with (Primary Key).
+        summary (str): The summary of the conversation, up to `summarized_until_id`.
+        summarized_until_id (int): The ID of the last message covered by the summary.
+        messages_count (int): Number of messages covered by the summary.
+        updated_at (datetime): The datetime of the last refresh.
+    """
+    __tablename__ = 'conversation_summaries'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    summary = db.Column(db.Text, nullable=False)
+    summarized_until_id = db.Column(db.Integer, nullable=False, default=0)
+    messages_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=get_swiss_time, onupdate=get_swiss_time)
@@ -6,25 +6,33 @@ Responsibility: Ensures that the agent has access to the latest user data and th
 """
 import os
 import shutil
+import threading
 import pandas as pd
+from sqlalchemy import func
 
-from src.data_manager.meal import get_most_recent_meal_time, get_recent_meals_string_for_user
 from export_cohort_data import (ExportCohortAnnotationsService,
                                 MyFoodRepoService)
 from src.config.logging_config import Logger
 from src.constants import (COHORT_ANNOTATIONS_CSV_FILENAME, DATA_FOLDER_NAME,
                            MFR_COHORT_ID_KEY, MFR_ENV_KEY,DB_UPDATE_DAYS_WINDOW)
 from src.db_session import session_scope
+from src.services.user_context import refresh_user_context
 from src.services.meal_grouping import (aggregate_by_time_window,
                                         group_by_intakeid)
 from src.utils.csv_utils import read_csv_to_dataframe
 from src.utils.date_utils import convert_to_local_time
 from src.utils.pandas_utils import delete_empty_rows, get_json_from_df_row
 
+from .context_snapshot import bump_meals_version
+from .engagement import record_meal_log
+from .dto import UserDTO
 from .models import Meal, User
 
 logger = Logger('myfoodrepo.data_manager.myfoodrepo_data_manager').get_logger()
 
+# Single-flight lock: concurrent syncs would download the same export and write the same rows
+_sync_lock = threading.Lock()
+
 def insert_user_meal_data_to_db(df, participation_key):
     """
     Inserts meal data for a user into the database.
@@ -37,9 +45,13 @@ def insert_user_meal_data_to_db(df, participation_key):
         df (pd.DataFrame): The database `DataFrame`.
         participation_key (str): The MyFoodRepo participation key.
 
+    When meals were added or updated, the user's context snapshot (see `src.services.user_context`) is
+    refreshed once the meals are committed, so that the next reminder or chat answer does not have to.
+
     Returns:
         None.
     """
+    user_dto = None
     with session_scope() as session:
         try:
             user = session.query(User).filter(User.myfoodrepo_key == participation_key).first()
@@ -48,6 +60,7 @@ def insert_user_meal_data_to_db(df, participation_key):
                 return
 
             meals_added_count = 0
+            meals_updated_count = 0
             for _, row in df.iterrows():
                 meal_description = row['food_name']
                 meal_datetime = row['local_time']
@@ -74,6 +87,9 @@ def insert_user_meal_data_to_db(df, participation_key):
                     if existing_meal.food_ids != food_ids :
                         logger.info(f"Updating meal food ids for user {user.id} at {meal_datetime}")
                         existing_meal.food_ids = food_ids
+
+                    if session.is_modified(existing_meal):
+                        meals_updated_count += 1
                     continue  
 
                 meal = Meal(
@@ -94,14 +110,26 @@ def insert_user_meal_data_to_db(df, participation_key):
             else:
                 logger.info(f"No newly logged meals found for user {user.id}")
 
-            most_recent_datetime = get_most_recent_meal_time(get_recent_meals_string_for_user(participation_key))
+            most_recent_datetime = session.query(func.max(Meal.datetime)).filter(Meal.user_id == user.id).scalar()
             logger.info(f"The most recent log meal for user {user.id} is {str(most_recent_datetime)}")
             user.last_meal_log = most_recent_datetime
             session.add(user)
+            if most_recent_datetime is not None:
+                record_meal_log(session, user.id, most_recent_datetime)
+
+            if meals_added_count or meals_updated_count:
+                bump_meals_version(session, user.id)
+                user_dto = UserDTO.from_model(user)
 
         except Exception as e:
             logger.error(f"Failed to add meal data: {e}")
             raise e
+
+    if user_dto is not None:
+        try:
+            refresh_user_context(user_dto)
+        except Exception as e:
+            logger.error(f"Failed to refresh the context snapshot of user {user_dto.id}: {e}")
         
 
 def healthy_index_preprocessing(user):
@@ -319,14 +347,33 @@ def download_csv(full_sync = True):
         logger.error("One or both required environment variables for the MFR API are missing. Cannot Update.")
 
 
-def update_database(full_sync=False):
+def update_database(full_sync=False, pause_hook=None):
     """
     Updates the database with meal data from the latest cohort annotations CSV file.
     
     It handles downloading, processing, and updating the data into the SQLite database, using
-    the `download_csv`and `load_data_from_csv` functions (among others).
+    the `download_csv`and `load_data_from_csv` functions (among others). Only one update runs at
+    a time: an update requested while another one is running is skipped.
+
+    Args:
+        full_sync (bool): Whether to download the whole export, or only its last days.
+        pause_hook (callable, optional): Called before processing each user, e.g. to let the
+                                         reminders go first.
+
+    Returns:
+        bool: False if the update was skipped because another one was running.
     """
+    if not _sync_lock.acquire(blocking=False):
+        logger.warning("⚠️ Database Meals - An update is already running, this one is skipped")
+        return False
+    try:
+        _update_database(full_sync, pause_hook)
+    finally:
+        _sync_lock.release()
+    return True
+
 
+def _update_database(full_sync, pause_hook):
     if full_sync == True :
         logger.info("Database Meals - Complete update process started...")
         download_csv()
@@ -356,6 +403,8 @@ def update_database(full_sync=False):
     logger.info(f"Found {len(participation_keys)} unique participation keys")
 
     for key in participation_keys:
+        if pause_hook is not None:
+            pause_hook()
         process_user_data(df, key)
     logger.info("Database Meals update process finished.")
 
@@ -4,6 +4,8 @@ from src.data_manager.meal import *
 
 from collections import Counter
 
+from src.utils import clock
+
 
 def categorize_meal_type(row):
     """
@@ -107,7 +109,7 @@ def calculate_eating_consistency(user) :
                 current_temp_streak = 1
         max_streak = max(max_streak, current_temp_streak)
 
-        today = pd.to_datetime("today").date()
+        today = clock.today()
         most_recent_log = max(main_meal_dates_set)
 
         current_streak = 0
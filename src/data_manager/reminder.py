@@ -1,10 +1,15 @@
-from datetime import datetime
+from datetime import datetime, time
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from src.config.logging_config import Logger
 from src.db_session import session_scope
-from collections import defaultdict
+from src.utils import clock
+from collections import Counter, defaultdict
 
-from .models import Reminder, User, Message
+from .dto import UserDTO
+from .message import flush_messages, store_system_prompt
+from .models import PregeneratedReminder, Reminder, User, Message
 
 logger = Logger('myfoodrepo.models.reminder').get_logger()
 
@@ -34,6 +39,7 @@ def get_previous_reminder_texts(user, limit=10):
     Returns:
         str: A formatted string listing past reminder messages, ordered from newest to oldest.
     """
+    flush_messages(user.id)
     with session_scope() as session:
         logger.info(f"Retrieving the reminder messages for user {user.id}")
         
@@ -54,6 +60,104 @@ def get_previous_reminder_texts(user, limit=10):
         return "\n".join(reminders)
     
 
+def get_scheduled_reminder_times(study_groups):
+    """
+    Retrieves the time of every reminder sent to the given study groups.
+
+    Args:
+        study_groups (list): The study groups receiving reminders.
+
+    Returns:
+        list: A list of (reminder ID, hour, minute) tuples.
+    """
+    with session_scope() as session:
+        rows = (
+            session.query(Reminder.id, Reminder.time)
+            .join(User, User.id == Reminder.user_id)
+            .filter(User.study_group.in_(study_groups))
+            .all()
+        )
+        return [(reminder_id, reminder_time.hour, reminder_time.minute) for reminder_id, reminder_time in rows]
+
+
+def get_slot_reminders(hour, minute, study_groups):
+    """
+    Retrieves, in a single query, all the reminders of a time slot along with their users.
+
+    Args:
+        hour (int): The hour of the slot.
+        minute (int): The minute of the slot.
+        study_groups (list): The study groups receiving reminders.
+
+    Returns:
+        list: A list of (reminder ID, meal type, `UserDTO`) tuples, ordered by reminder ID.
+    """
+    with session_scope() as session:
+        rows = (
+            session.query(Reminder.id, Reminder.meal_type, User)
+            .join(User, User.id == Reminder.user_id)
+            .filter(User.study_group.in_(study_groups),
+                    Reminder.time >= time(hour, minute),
+                    Reminder.time <= time(hour, minute, 59, 999999))
+            .order_by(Reminder.id)
+            .all()
+        )
+        return [(reminder_id, meal_type, UserDTO.from_model(user)) for reminder_id, meal_type, user in rows]
+
+
+def store_pregenerated_reminder(reminder_id, user_id, skip, text, last_meal_log, valid_until, system_prompt=None):
+    """
+    Stores (or replaces) the reminder prepared ahead of the next occurrence of a reminder.
+
+    Args:
+        reminder_id (int): The ID of the reminder.
+        user_id (int): The ID of the user.
+        skip (bool): True if the reminder should not be sent at this occurrence.
+        text (str): The prepared reminder text (None when skipped).
+        last_meal_log (datetime): The user's last meal log used to prepare the reminder.
+        valid_until (datetime): The datetime after which the prepared reminder must not be used.
+        system_prompt (str, optional): The system prompt the text was generated with.
+    """
+    values = {'user_id': user_id, 'skip': skip, 'text': text, 'last_meal_log': last_meal_log,
+              'generated_at': clock.now(), 'valid_until': valid_until.replace(tzinfo=None)}
+    with session_scope() as session:
+        values['system_prompt_hash'] = store_system_prompt(session, system_prompt) if system_prompt else None
+        session.execute(
+            sqlite_insert(PregeneratedReminder)
+            .values(reminder_id=reminder_id, **values)
+            .on_conflict_do_update(index_elements=['reminder_id'], set_=values)
+        )
+
+
+def pop_pregenerated_reminder(reminder_id, last_meal_log, now):
+    """
+    Retrieves and removes the reminder prepared for a reminder occurrence.
+
+    Args:
+        reminder_id (int): The ID of the reminder.
+        last_meal_log (datetime): The user's current last meal log.
+        now (datetime): The current datetime (naive, in the same timezone as `valid_until`).
+
+    Returns:
+        tuple: (skip, text, system prompt) if a prepared reminder exists, is not stale, and the user did not
+               log a meal since it was prepared, otherwise None.
+    """
+    with session_scope() as session:
+        prepared = session.get(PregeneratedReminder, reminder_id)
+        if prepared is None:
+            return None
+        session.delete(prepared)
+
+        if prepared.valid_until < now:
+            logger.info(f"Pre-generated reminder {reminder_id} is stale, discarding it.")
+            return None
+        if prepared.last_meal_log != last_meal_log:
+            logger.info(f"User {prepared.user_id} logged a meal since reminder {reminder_id} was pre-generated.")
+            return None
+        system_prompt = prepared.system_prompt.text if prepared.system_prompt is not None else None
+        return prepared.skip, prepared.text, system_prompt
+
+
 def get_study_group_reminders(group):
     """
     Retrieves the reminders sent for the study group we're interested in.
@@ -161,6 +265,7 @@ def add_reminder_all_users():
     """
     logger.info("Adding reminders for all users in the system...")
     all_users = User.query.all()
+    users_with_reminders = {user_id for (user_id,) in Reminder.query.with_entities(Reminder.user_id).distinct().all()}
 
     for user in all_users:
         if user.study_group == 0 or user.study_group == 2:
@@ -169,8 +274,7 @@ def add_reminder_all_users():
         if user.study_ended:
             logger.debug(f"Skipping user {user.id}, as study has ended for them.")
             continue
-        existing_reminders_count = Reminder.query.filter_by(user_id=user.id).count()
-        if existing_reminders_count > 0:
+        if user.id in users_with_reminders:
             logger.debug(f"Skipping user: {user.id} reminders already added")
             continue
 
@@ -245,6 +349,9 @@ def checking_reminders_sanity():
 
     with session_scope() as session:
         reminders = session.query(Reminder).all()
+        reminder_occurrences = Counter(
+            (reminder.user_id, reminder.meal_type, reminder.time) for reminder in reminders
+        )
 
     missing_fields = {}
     duplicate_reminders = defaultdict(list)
@@ -273,11 +380,7 @@ def checking_reminders_sanity():
             invalid_times[reminder.id] = reminder.time
 
         #4. Check for any duplicate reminders (same user, same meal type, same time)
-        duplicate_count = session.query(Reminder).filter_by(
-            user_id=reminder.user_id,
-            meal_type=reminder.meal_type,
-            time=reminder.time
-        ).count()
+        duplicate_count = reminder_occurrences[(reminder.user_id, reminder.meal_type, reminder.time)]
 
         if duplicate_count > 1:
             duplicate_reminders[reminder.user_id].append({
@@ -0,0 +1,65 @@
+from sqlalchemy import inspect, text
+
+from src.config.logging_config import Logger
+
+from .models import SystemPrompt
+
+logger = Logger('myfoodrepo.models.schema').get_logger()
+
+# Columns added to tables that existing databases already have (`create_all` only creates missing tables)
+ADDED_COLUMNS = [
+    ('messages', 'system_prompt_hash', 'VARCHAR(64) REFERENCES system_prompts (hash)'),
+    ('pregenerated_reminders', 'system_prompt_hash', 'VARCHAR(64) REFERENCES system_prompts (hash)'),
+]
+
+# Indexes declared on tables that existing databases already have (`create_all` skips the existing tables)
+ADDED_INDEXES = [
+    ('messages', 'ix_messages_user_id_datetime', ('user_id', 'datetime')),
+]
+
+
+def has_column(engine, table_name, column_name):
+    """Whether the table of the database has the given column."""
+    inspector = inspect(engine)
+    if not inspector.has_table(table_name):
+        return False
+    return any(column['name'] == column_name for column in inspector.get_columns(table_name))
+
+
+def upgrade_schema(engine):
+    """
+    Brings a database created by a previous version of the application to the current schema: creates the
+    missing tables the new columns refer to, then adds the missing columns and indexes. Safe to run at every
+    startup.
+
+    Args:
+        engine: The engine of the database to upgrade.
+
+    Returns:
+        list: The `table.column` names of the added columns.
+    """
+    SystemPrompt.__table__.create(engine, checkfirst=True)
+
+    added = []
+    with engine.begin() as connection:
+        for table_name, column_name, column_type in ADDED_COLUMNS:
+            if not inspect(connection).has_table(table_name) or has_column(connection, table_name, column_name):
+                continue
+            connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
+            added.append(f"{table_name}.{column_name}")
+
+        added_indexes = []
+        for table_name, index_name, column_names in ADDED_INDEXES:
+            inspector = inspect(connection)
+            if not inspector.has_table(table_name) or any(index['name'] == index_name
+                                                          for index in inspector.get_indexes(table_name)):
+                continue
+            connection.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} "
+                                    f"ON {table_name} ({', '.join(column_names)})"))
+            added_indexes.append(index_name)
+
+    if added:
+        logger.info(f"🟢 Upgraded the database schema, added columns: {', '.join(added)}")
+    if added_indexes:
+        logger.info(f"🟢 Upgraded the database schema, added indexes: {', '.join(added_indexes)}")
+    return added
@@ -1,8 +1,13 @@
 from collections import Counter
 
+from sqlalchemy import case, func
+
 from src.config.logging_config import Logger
+from src.constants import MANAGEMENT_PAGE_SIZE
 from src.db_session import session_scope
+from src.utils.pagination_utils import keyset_paginate
 
+from .dto import UserDTO
 from .models import User
 
 logger = Logger('myfoodrepo.models.user').get_logger()
@@ -16,7 +21,7 @@ def get_user(phone_number):
         phone_number (str): The phone number of the user.
 
     Returns:
-        User: The User object if found, otherwise None.
+        UserDTO: A read-only snapshot of the user if found, otherwise None.
     
     """
     with session_scope() as session:
@@ -24,29 +29,60 @@ def get_user(phone_number):
         
         if user:
             logger.info(f"User found: {user}")
-        else:
-            logger.warning(f"User NOT found for phone number: {phone_number}")
-        
-        return user
+            return UserDTO.from_model(user)
+
+        logger.warning(f"User NOT found for phone number: {phone_number}")
+        return None
+
+def get_user_by_id(user_id):
+    """
+    Retrieves a user using their ID.
+
+    Args:
+        user_id (int): The ID of the user.
 
-def get_users_by_study_group(study_group, page=1, per_page=None):
+    Returns:
+        UserDTO: A read-only snapshot of the user if found, otherwise None.
+    """
+    with session_scope() as session:
+        user = session.get(User, user_id)
+        return UserDTO.from_model(user) if user else None
+
+def get_users_by_study_group(study_group, after=None, before=None, per_page=None):
     """
     Retrieves users belonging to a specific study group.
 
     Args:
         study_group (int): The study group to filter users by.
-        page (int): Page number for pagination.
+        after (str, optional): Cursor of the last user of the previous page.
+        before (str, optional): Cursor of the first user of the next page.
+        per_page (int, optional): Number of users per page. If None, all users of the group are retrieved.
+
+    Returns:
+        list: The list of `User` objects if `per_page` is None, otherwise a tuple
+              (list of `User` objects, next page cursor, previous page cursor).
+    """
+    with session_scope() as session:
+        query = session.query(User).filter_by(study_group=study_group)
+        if per_page is None:
+            return query.all()
+        return keyset_paginate(query, User.id, after=after, before=before, per_page=per_page)
+
+
+def get_users_page(after=None, before=None, per_page=MANAGEMENT_PAGE_SIZE):
+    """
+    Retrieves one page of users, most recently registered first, using keyset pagination on the ID.
+
+    Args:
+        after (str, optional): Cursor of the last user of the previous page.
+        before (str, optional): Cursor of the first user of the next page.
         per_page (int): Number of users per page.
 
     Returns:
-        Pagination object: Paginated users list.
+        tuple: (list of `User` objects, next page cursor, previous page cursor)
     """
     with session_scope() as session:
-        return(
-            session.query(User)
-            .filter_by(study_group=study_group)
-            .all()
-        )
+        return keyset_paginate(session.query(User), User.id, after=after, before=before, per_page=per_page)
     
 def get_age_distribution(study_group=None):
     """
@@ -91,14 +127,22 @@ def get_started_users_per_group():
         dict: A dictionary with the study group as the key, and a value pair of the number of "has used" and "never used".
     """
     study_groups = [0, 1, 2, 3]
-    active_inactive_dict = {}
-    for group in study_groups:
-        curr_group_users = get_users_by_study_group(group)
-        started = sum(1 for user in curr_group_users if user.last_meal_log is not None)
-        not_started = len(curr_group_users) - started
-        active_inactive_dict[group] = (started, not_started)
+    active_inactive_dict = {group: (0, 0) for group in study_groups}
+    with session_scope() as session:
+        results = (
+            session.query(
+                User.study_group,
+                func.count(case((User.last_meal_log.isnot(None), 1))).label("started"),
+                func.count(User.id).label("total")
+            )
+            .filter(User.study_group.in_(study_groups))
+            .group_by(User.study_group)
+            .all()
+        )
+
+    for group, started, total in results:
+        active_inactive_dict[group] = (started, total - started)
 
-        
     return active_inactive_dict
 
 
@@ -0,0 +1,180 @@
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from src import db_session
+from src.config.logging_config import Logger
+from src.constants import (DATABASE_BACKUP_FOLDER_NAME, DB_BACKUP_PAGES_PER_STEP, DB_BACKUP_STEP_SLEEP,
+                           DB_BACKUPS_KEPT)
+
+logger = Logger('myfoodrepo.db_maintenance').get_logger()
+
+BACKUP_PREFIX = "backup-"
+SQLITE_AUTO_VACUUM_INCREMENTAL = 2
+
+last_maintenance = {}
+
+
+def get_database_path():
+    """Returns the path of the SQLite database file used by the application."""
+    if db_session.engine is None:
+        raise RuntimeError("Database not initialized. Call init_db() before running maintenance tasks.")
+    return db_session.engine.url.database
+
+
+def get_backup_directory(database_path):
+    """Returns the directory in which the backups of `database_path` are stored."""
+    return os.path.join(os.path.dirname(os.path.abspath(database_path)), DATABASE_BACKUP_FOLDER_NAME)
+
+
+def backup_database(database_path=None, backup_directory=None, keep=DB_BACKUPS_KEPT):
+    """
+    Takes a consistent snapshot of the database using the SQLite online backup API.
+
+    The database is copied `DB_BACKUP_PAGES_PER_STEP` pages at a time, sleeping between steps, so that
+    writers are never blocked for long. The copy is written to a temporary file, renamed once complete,
+    and only the `keep` most recent backups are kept.
+
+    Args:
+        database_path (str, optional): The database to back up (the application's database by default).
+        backup_directory (str, optional): Where to store the backup (`data/backups` by default).
+        keep (int): Number of backups to keep.
+
+    Returns:
+        dict: The path, size and duration of the backup.
+    """
+    database_path = database_path or get_database_path()
+    backup_directory = backup_directory or get_backup_directory(database_path)
+    os.makedirs(backup_directory, exist_ok=True)
+
+    backup_path = os.path.join(backup_directory, f"{BACKUP_PREFIX}{datetime.now().strftime('%Y%m%d-%H%M%S')}.db")
+    temporary_path = backup_path + ".tmp"
+    start = time.perf_counter()
+
+    source = sqlite3.connect(database_path)
+    destination = sqlite3.connect(temporary_path)
+    try:
+        source.backup(destination, pages=DB_BACKUP_PAGES_PER_STEP, sleep=DB_BACKUP_STEP_SLEEP)
+    finally:
+        destination.close()
+        source.close()
+    os.replace(temporary_path, backup_path)
+
+    removed = prune_backups(backup_directory, keep)
+    result = {
+        'path': backup_path,
+        'size_bytes': os.path.getsize(backup_path),
+        'duration_s': round(time.perf_counter() - start, 3),
+        'removed_backups': removed,
+    }
+    logger.info(f"🟢 Database backed up to {backup_path} ({result['size_bytes']} bytes in {result['duration_s']} s)")
+    return result
+
+
+def prune_backups(backup_directory, keep=DB_BACKUPS_KEPT):
+    """
+    Removes the oldest backups of a directory, keeping the `keep` most recent ones.
+
+    Returns:
+        int: The number of removed backups.
+    """
+    backups = sorted(
+        filename for filename in os.listdir(backup_directory)
+        if filename.startswith(BACKUP_PREFIX) and filename.endswith(".db")
+    )
+    outdated = backups[:-keep] if keep > 0 else backups
+    for filename in outdated:
+        os.remove(os.path.join(backup_directory, filename))
+    return len(outdated)
+
+
+def optimize_database(database_path=None):
+    """
+    Refreshes the planner statistics and gives the free pages back to the file system.
+
+    The database is switched to incremental auto-vacuum the first time (this requires one full `VACUUM`),
+    then each run only releases the free pages with `PRAGMA incremental_vacuum`, which does not rewrite
+    the whole file.
+
+    Args:
+        database_path (str, optional): The database to optimize (the application's database by default).
+
+    Returns:
+        dict: The number of pages released and the duration of the optimization.
+    """
+    database_path = database_path or get_database_path()
+    start = time.perf_counter()
+
+    connection = sqlite3.connect(database_path, isolation_level=None)
+    try:
+        connection.execute("ANALYZE")
+        connection.execute("PRAGMA optimize")
+
+        full_vacuum = connection.execute("PRAGMA auto_vacuum").fetchone()[0] != SQLITE_AUTO_VACUUM_INCREMENTAL
+        if full_vacuum:
+            logger.info("Switching the database to incremental auto-vacuum (one-time full VACUUM)")
+            connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            connection.execute("VACUUM")
+
+        free_pages_before = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        connection.execute("PRAGMA incremental_vacuum").fetchall()
+        free_pages_after = connection.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        connection.close()
+
+    result = {
+        'full_vacuum': full_vacuum,
+        'released_pages': free_pages_before - free_pages_after,
+        'duration_s': round(time.perf_counter() - start, 3),
+    }
+    logger.info(f"🟢 Database optimized: {result['released_pages']} pages released in {result['duration_s']} s")
+    return result
+
+
+def get_database_stats(database_path=None):
+    """
+    Reports the size and fragmentation of the database file.
+
+    Args:
+        database_path (str, optional): The database to inspect (the application's database by default).
+
+    Returns:
+        dict: File size, page size and count, free pages, fragmentation ratio and the last maintenance run.
+    """
+    database_path = database_path or get_database_path()
+    connection = sqlite3.connect(database_path)
+    try:
+        page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+        page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        auto_vacuum = connection.execute("PRAGMA auto_vacuum").fetchone()[0]
+    finally:
+        connection.close()
+
+    return {
+        'file_size_bytes': os.path.getsize(database_path),
+        'page_size': page_size,
+        'page_count': page_count,
+        'freelist_count': freelist_count,
+        'fragmentation': round(freelist_count / page_count, 4) if page_count else 0.0,
+        'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}.get(auto_vacuum, auto_vacuum),
+        'last_maintenance': last_maintenance or None,
+    }
+
+
+def run_database_maintenance():
+    """Backs up then optimizes the application's database, recording the outcome in `last_maintenance`."""
+    started_at = datetime.now()
+    outcome = {'started_at': started_at.isoformat(timespec='seconds')}
+    try:
+        outcome['backup'] = backup_database()
+        outcome['optimize'] = optimize_database()
+        outcome['status'] = 'completed'
+    except Exception as e:
+        logger.error(f"🛑 Database maintenance failed: {e}")
+        outcome['status'] = 'failed'
+        outcome['error'] = str(e)
+    last_maintenance.clear()
+    last_maintenance.update(outcome)
+    return outcome
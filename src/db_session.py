@@ -1,3 +1,4 @@
+import threading
 from contextlib import contextmanager
 
 from sqlalchemy import create_engine
@@ -10,30 +11,60 @@ logger = Logger('myfoodrepo.db_session').get_logger()
 engine = None
 Session = None
 
+# Depth of the `session_scope` blocks currently open in each thread
+_scope_state = threading.local()
+
 
 def init_db(db_uri):
     global engine
     global Session
     engine = create_engine(db_uri)
-    Session = scoped_session(sessionmaker(bind=engine))
+    # Objects are not expired on commit: once their scope ends, they keep the values they were
+    # loaded with instead of silently re-querying the database when accessed.
+    Session = scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
 
 
 @contextmanager
 def session_scope():
-    """Provide a transactional scope around a series of operations."""
+    """
+    Provide a transactional scope around a series of operations.
+
+    Scopes can be nested (e.g. a data manager function calling another one): only the outermost
+    scope of a thread commits (or rolls back), then closes the thread's session so that its connection
+    goes back to the pool. Objects returned from a scope are detached: only their loaded attributes are usable.
+    """
     global Session
     if Session is None:
         raise RuntimeError("Session not initialized. Call init_db() before using session_scope.")
+    depth = getattr(_scope_state, 'depth', 0)
+    _scope_state.depth = depth + 1
     session = Session()
     logger.debug("Session started")
     try:
         yield session
-        session.commit()
-        logger.debug("✅ Session committed")
+        if depth == 0:
+            session.commit()
+            logger.debug("✅ Session committed")
     except Exception as e:
-        session.rollback()
-        logger.error("🛑 Session rollback due to exception: %s", e)
+        # Only the outermost scope rolls back: an inner scope leaves the decision to its caller, which
+        # may handle the error and keep its own pending changes
+        if depth == 0:
+            session.rollback()
+            logger.error("🛑 Session rollback due to exception: %s", e)
         raise
-    # finally:
-        # session.expunge_all()
-        # logger.debug("Session closed")
+    finally:
+        _scope_state.depth = depth
+        if depth == 0:
+            Session.remove()
+            logger.debug("Session closed")
+
+
+def remove_session(exception=None):
+    """
+    Closes the session of the current thread, returning its connection to the pool.
+
+    Registered as a teardown of every Flask application context, so that each request and each
+    scheduler job (which run in their own app context) release their session when they end.
+    """
+    if Session is not None and getattr(_scope_state, 'depth', 0) == 0:
+        Session.remove()
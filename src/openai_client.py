@@ -1,7 +1,10 @@
+import time
+
 from langchain_openai import ChatOpenAI
 import openai
 from tenacity import (
     retry,
+    retry_if_exception_type,
     stop_after_attempt,
     wait_random_exponential,
 )
@@ -9,35 +12,55 @@ from tenacity import (
 from langchain.chains import ConversationChain
 from langchain.memory import ConversationBufferMemory
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables import RunnableWithMessageHistory
 from langchain.memory import ConversationBufferMemory
 from langchain_core.messages import HumanMessage
 from langchain.llms import OpenAI
 from langchain.prompts import PromptTemplate
 from langchain_community.chat_message_histories import ChatMessageHistory
 
-from src.communication.chat_history import DBChatMessageHistory
+from src.communication.chat_history import DBChatMessageHistory, conversation_summarizer
 
 from src.prompts.prompts_templates import DEFAULT_SYSTEM_PROMPT
 
 from src.config.logging_config import Logger
-from src.constants import SYSTEM_ROLE,GPT_4_O, GPT_4_1_MINI
+from src.constants import (SYSTEM_ROLE,GPT_4_O, GPT_4_1_MINI, CHAT_HISTORY_MAX_MESSAGES, OPENAI_INVOKE_ATTEMPTS,
+                           OPENAI_INVOKE_MAX_WAIT)
+from src.data_manager.llm_usage import get_token_usage, record_llm_usage
+from src.data_manager.conversation_summary import get_conversation_summary
 from src.data_manager.message import (db_add_message,
                                       db_add_message_from_phone_number,
+                                      get_chat_history,
                                       get_user_messages)
 from src.data_manager.user import get_user
 
 logger = Logger('openai_client').get_logger()
 
+TRANSIENT_OPENAI_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError,
+                           openai.InternalServerError)
+
+
+def _log_invoke_retry(retry_state):
+    logger.warning(f"⚠️ OpenAI call failed (attempt {retry_state.attempt_number}/{OPENAI_INVOKE_ATTEMPTS}): "
+                   f"{retry_state.outcome.exception()}")
+
+
 @retry(
-    wait=wait_random_exponential(min=1, max=300), 
-    stop=stop_after_attempt(10))
+    retry=retry_if_exception_type(TRANSIENT_OPENAI_ERRORS),
+    wait=wait_random_exponential(min=1, max=OPENAI_INVOKE_MAX_WAIT),
+    stop=stop_after_attempt(OPENAI_INVOKE_ATTEMPTS),
+    before_sleep=_log_invoke_retry,
+    reraise=True)
 def safe_invoke_chain(chain, input_data, config):
-    try:
-        return chain.invoke(input_data, config=config)
-    except Exception as e:
-        logger.error(f"Error in safe_invoke_chain: {e}")
-        
+    """
+    Invokes a chain, retrying a few times on transient OpenAI errors (rate limit, timeout, connection,
+    server error) only.
+
+    The waits are kept short on purpose: longer outages are handled by the callers (e.g. reminders are
+    retried later by the scheduler), instead of blocking the calling thread. The last error is re-raised.
+    """
+    return chain.invoke(input_data, config=config)
+
+
 
 class OpenAIChatClient:
     """
@@ -51,35 +74,26 @@ class OpenAIChatClient:
     """
 
 
-    def __init__(self, api_key):
+    def __init__(self, api_key, llm=None):
         """
         Initializes the OpenAIChatClient object.
 
         Args:
             api_key (str): The API key for accessing OpenAI services.
+            llm (optional): The chat model to use instead of OpenAI's (e.g. a fake one for simulations).
         """
         self.api_key = api_key
         openai.api_key = self.api_key
 
-        self.llm = ChatOpenAI(temperature=1,model=GPT_4_O, api_key=self.api_key)
+        self.llm = llm if llm is not None else ChatOpenAI(temperature=1,model=GPT_4_O, api_key=self.api_key)
 
         self.prompt = ChatPromptTemplate.from_messages([
             MessagesPlaceholder(variable_name="chat_history"),
             ("human", "{input}")
         ])
 
-        self.chain_with_history = RunnableWithMessageHistory(
-            self.prompt | self.llm,
-            get_session_history=self.get_history,
-            input_messages_key="input",
-            history_messages_key="chat_history",
-        )
-
-    def get_history(self,session_id):
-        logger.debug(f"Fetching history for session_id: {session_id}")
-        history = DBChatMessageHistory(session_id)
-        #logger.debug(f"Retrieved history: {history}")
-        return history
+        # The history is loaded by `create_chat_completion` and passed along with the input
+        self.chain = self.prompt | self.llm
 
     def initialize_conversation(self, phone_number):
         """
@@ -138,36 +152,66 @@ class OpenAIChatClient:
             list: A list of dictionaries containing the role and content of each message.
         """
         messages = get_user_messages(user_id)
-        return [{"role": message.role, "content": message.content, "timestamp": message.datetime} for message in messages]
+        return [{"role": message.role, "content": message.text, "timestamp": message.datetime} for message in messages]
     
 
-    def create_chat_completion(self, model, phone_number, temperature):
+    def record_usage(self, user_id, purpose, model, response, latency_ms):
+        """
+        Stores the token usage of a call (prompt, cached and completion tokens), as reported by OpenAI.
+        A failure to store it never fails the call.
+        """
+        try:
+            record_llm_usage(user_id, purpose, getattr(self.llm, 'model_name', model), *get_token_usage(response),
+                             latency_ms)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not record the OpenAI usage of user {user_id}: {e}")
+
+    def create_chat_completion(self, model, phone_number, temperature, purpose="chat", system_prompt=None):
+        """
+        Answers the last message of the user's history.
+
+        When `system_prompt` is given (e.g. a reminder prompt), it is used, for this completion only, as both
+        the system prompt and the input, without being stored in the history.
+        """
         try:
             user = get_user(phone_number)
             if not user:
                 logger.error("User NOT FOUND")
                 return "User not found."
 
-            messages = self.get_user_messages(user.id)
-            if not messages:
-                self.initialize_conversation(phone_number)
-                messages = self.get_user_messages(user.id)
-
-            last_input = messages[-1]["content"]
-
-            message_history = DBChatMessageHistory(phone_number)
+            # The history is loaded once per completion: the latest system prompt, the most recent
+            # messages (within CHAT_HISTORY_TOKEN_BUDGET tokens), and the summary of the older ones
+            one_off_prompt = system_prompt is not None
+            if one_off_prompt:
+                _, recent_messages, last_message = get_chat_history(user.id, CHAT_HISTORY_MAX_MESSAGES)
+                last_input = system_prompt
+            else:
+                system_prompt, recent_messages, last_message = get_chat_history(user.id, CHAT_HISTORY_MAX_MESSAGES)
+                if last_message is None:
+                    self.initialize_conversation(phone_number)
+                    system_prompt, recent_messages, last_message = get_chat_history(user.id,
+                                                                                    CHAT_HISTORY_MAX_MESSAGES)
+                last_input = last_message.text
+
+            older_messages_left_out = len(recent_messages) == CHAT_HISTORY_MAX_MESSAGES
+            if not one_off_prompt and recent_messages and recent_messages[-1].id == last_message.id:
+                # The input is not repeated at the end of the history
+                recent_messages = recent_messages[:-1]
+
+            summary = get_conversation_summary(user.id)[0]
+            message_history = DBChatMessageHistory(system_prompt, recent_messages, summary)
+            if older_messages_left_out or len(message_history.window) < len(recent_messages):
+                window_start = message_history.window[0].id if message_history.window else last_message.id
+                conversation_summarizer.request_refresh(user.id, window_start)
 
             logger.debug("Trying to formulate a response...")
+            start = time.perf_counter()
             response = safe_invoke_chain(
-                        self.chain_with_history,
-                        {"input": last_input},
-                        {
-                            "configurable": {
-                                "session_id": phone_number,
-                                "message_history": message_history,
-                            }
-                        }
+                        self.chain,
+                        {"input": last_input, "chat_history": message_history.messages},
+                        None
                     )
+            self.record_usage(user.id, purpose, model, response, (time.perf_counter() - start) * 1000)
 
             #logger.debug(f"Model response: {response.content}")
             return response.content
@@ -143,6 +143,28 @@ RULES:
 - Do not use emojis, special characters, or emoticons.
 """
 
+CONVERSATION_SUMMARY_PROMPT = """
+Your task is to maintain a summary of the conversation between a user of a food-tracking application and
+their food diary assistant, so that the assistant can keep answering consistently without the full history.
+
+Keep what the assistant may need later: the user's questions and concerns, goals, preferences and
+constraints (diet, allergies, tastes), the advice and facts given, and what the user said they would do.
+Leave out greetings and small talk. Write in English, in at most 150 words.
+
+Current summary (empty if none):
+{previous_summary}
+
+New messages to fold into the summary:
+{conversation}
+
+Answer with the updated summary only.
+"""
+
+CONVERSATION_SUMMARY_CONTEXT = """
+Summary of the earlier part of your conversation with the user:
+{summary}
+"""
+
 REMINDER_SYSTEM_ROLE_VANILLA = """
 Your task is to generate a short, friendly reminder to encourage the user to log their {meal_type} meal. 
 """
@@ -178,13 +200,13 @@ FEW_SHOTS_PROMPTING = """
 Here are examples of contexts and corresponding reminders, in english, corresponding to the expected quality (personalised, diverse, and engaging):
 
   Context 1 : User is a 49 old english-speaking man with a rather low fiber intake and a high-protein goal. Reminder was crafted by a friendly coach, offering a light challenge.
-  Reminder 1 : Time to log your {meal_type} before you take a bite ! You've got a 6-day streak, and adding some beans could really up your fiber game : it has been a bit low these days.
+  Reminder 1 : Time to log your lunch before you take a bite ! You've got a 6-day streak, and adding some beans could really up your fiber game : it has been a bit low these days.
 
   Context 2 : User is a 24 english-speaking man, with a high salt intake. Reminder was crafted by a supportive teammate who roots quietly from the sidelines.
-  Reminder 2 : Hi there! It's time to log your {meal_type} and keep your 8-day streak thriving. Your salt intake is a bit high — try incorporating some fresh greens or crunchy bell peppers for a delicious, low-sodium boost.
+  Reminder 2 : Hi there! It's time to log your dinner and keep your 8-day streak thriving. Your salt intake is a bit high — try incorporating some fresh greens or crunchy bell peppers for a delicious, low-sodium boost.
 
   Context 3 : User is a 36 english-speaking man without any excesses or drops in intake. Reminder was crafted by a reflective, calm and mindful author.
-  Reminder 3 : {meal_type} time beckons! Logging now will keep your 6-day streak alive! Your doing a great job of keeping a healthy diet these days - keep going !
+  Reminder 3 : Breakfast time beckons! Logging now will keep your 6-day streak alive! Your doing a great job of keeping a healthy diet these days - keep going !
  
  """
 
@@ -203,6 +225,7 @@ User Profile:
 
 REMINDER_CONTEXT= """
 Current Reminder's context:
+- Meal Type: {meal_type}
 - Time Since Last Reminder: {tlr}
 - Previous Reminders, under the form a list of reminders strings : ({previous_reminders})
 
@@ -233,7 +256,7 @@ Reasoning Steps :
   2. Read and internalize the context of previous reminders.
   3. List all different constraints and requirements you have been asked to follow.
   4. Craft the user's reminders using all previous information have read and listed in your reasoning steps.
-    4.1 Write the reminder in the user's preferred language, which is: {prefered_language}. 
+    4.1 Write the reminder in the user's preferred language, given in the user profile. 
           - Write the reminder in the user's preferred language. 
           - Use native phrasing and cultural norms. Ensure the tone is idiomatic and appropriate in that language. 
           - YOU MUST ensure opening sentence offers some variety compared to the last previous reminders.
@@ -241,7 +264,7 @@ Reasoning Steps :
     4.2 Ensure tone and food suggestions differ from previous reminders. Rotate between encouraging, reflective, and light-hearted tones.
     4.3 Consider the time of day and specific meal type to make the reminder contextually relevant (e.g., breakfast reminders might mention energy for the day ahead)
     4.4 Reference specific foods or nutrients that align with the user's goals.
-    4.5 Compare the reminder you wrote in {prefered_language} to the few previous ones (e.g opening sentence, words usage, advice given...). If it is too close to the previous one, re-think it and improve it.
+    4.5 Compare the reminder you wrote to the few previous ones (e.g opening sentence, words usage, advice given...). If it is too close to the previous one, re-think it and improve it.
     4.6 Repeat these steps until you manage to craft an engaging, non-repetitive and personalised reminder.
   5. Check the length of your reminder when ready. When over 150 characters, YOU MUST remove any ending sentence.
 
@@ -249,7 +272,7 @@ Reasoning Steps :
 
 INFLEXIBLE_RULES = """
 Hard constraints (must ALWAYS be followed) : 
-  - Write directly in {prefered_language} using natural expressions and you MUST formal pronouns, if applicable.
+  - Write directly in the user's preferred language using natural expressions and you MUST formal pronouns, if applicable.
   - Use 2-3 short sentences with varied rhythm and length - MAXIMUM 250 characters total
   - No emojis or special characters besides line breaks: you must make your message readable for the user.
   - Never mention you are an AI, only an assistant.
@@ -0,0 +1,212 @@
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.config.logging_config import Logger
+from src.constants import (QUERY_STATS_CALLER_SAMPLING, QUERY_STATS_MAX_CALLERS, QUERY_STATS_MAX_FINGERPRINTS,
+                           SLOW_QUERY_THRESHOLD_MS)
+
+logger = Logger('myfoodrepo.query_profiler').get_logger()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint_statement(statement):
+    """
+    Normalizes a SQL statement so that statements only differing by their literal values are grouped.
+
+    Args:
+        statement (str): The SQL statement, as sent to the database.
+
+    Returns:
+        str: The normalized statement.
+    """
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (?...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def _project_frames():
+    """Returns the stack frames belonging to the project's code, innermost last."""
+    frames = []
+    for frame in traceback.extract_stack()[:-1]:
+        filename = os.path.abspath(frame.filename)
+        if (filename.startswith(PROJECT_ROOT)
+                and os.sep + 'site-packages' + os.sep not in filename
+                and filename != os.path.abspath(__file__)):
+            frames.append(frame)
+    return frames
+
+
+def _calling_function():
+    """Returns `module:function:line` for the innermost project function issuing the current statement."""
+    frame = sys._getframe(2)
+    this_file = os.path.abspath(__file__)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if (filename.startswith(PROJECT_ROOT)
+                and os.sep + 'site-packages' + os.sep not in filename
+                and filename != this_file):
+            relative_path = os.path.relpath(filename, PROJECT_ROOT)
+            return f"{relative_path}:{frame.f_code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    return "<unknown>"
+
+
+class QueryProfiler:
+    """
+    Collects per-statement timing of every SQL statement issued through SQLAlchemy.
+
+    Statements are grouped by fingerprint (see `fingerprint_statement`) and aggregated in memory:
+    number of calls, total / max duration, affected rows and the functions issuing them. The number of
+    fingerprints (and callers per fingerprint) kept is bounded; when full, the fingerprint with the
+    lowest total time is evicted. Statements slower than the threshold are logged with their stack.
+    The calling function of the other statements is only resolved for a sample of them.
+
+    Attributes:
+        slow_threshold_ms (float): Duration above which a statement is logged as slow.
+        max_fingerprints (int): Maximum number of distinct fingerprints kept.
+        max_callers (int): Maximum number of distinct callers kept per fingerprint.
+        caller_sampling (int): The caller of one fast statement out of `caller_sampling` is recorded.
+    """
+
+    def __init__(self, slow_threshold_ms=SLOW_QUERY_THRESHOLD_MS,
+                 max_fingerprints=QUERY_STATS_MAX_FINGERPRINTS, max_callers=QUERY_STATS_MAX_CALLERS,
+                 caller_sampling=QUERY_STATS_CALLER_SAMPLING):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.max_fingerprints = max_fingerprints
+        self.max_callers = max_callers
+        self.caller_sampling = max(1, caller_sampling)
+        self._executions = itertools.count()
+        self.installed = False
+        self._target = None
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._since = time.time()
+
+    def install(self, target=Engine):
+        """Registers the profiler on `target` (all engines by default)."""
+        if self.installed:
+            return
+        event.listen(target, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(target, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(target, "handle_error", self._handle_error)
+        self._target = target
+        self.installed = True
+        logger.info(f"Query profiler installed (slow query threshold: {self.slow_threshold_ms} ms)")
+
+    def uninstall(self):
+        """Removes the profiler's event hooks."""
+        if not self.installed:
+            return
+        event.remove(self._target, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(self._target, "after_cursor_execute", self._after_cursor_execute)
+        event.remove(self._target, "handle_error", self._handle_error)
+        self.installed = False
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_times', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get('query_start_times')
+        if not start_times:
+            return
+        duration_ms = (time.perf_counter() - start_times.pop()) * 1000
+        rowcount = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else 0
+        slow = duration_ms >= self.slow_threshold_ms
+        caller = None
+        if slow or next(self._executions) % self.caller_sampling == 0:
+            caller = _calling_function()
+        self.record(statement, duration_ms, rowcount, caller)
+
+        if slow:
+            stack = "".join(traceback.format_list(_project_frames()[-8:]))
+            logger.warning(f"🐢 Slow query ({duration_ms:.1f} ms, {rowcount} rows) from {caller}:\n"
+                           f"{statement}\nStack:\n{stack}")
+
+    def _handle_error(self, context):
+        # The failed statement never reaches `after_cursor_execute`: its start time must not be left
+        # behind for the next statement of the connection
+        connection = context.connection
+        if connection is not None and context.execution_context is not None:
+            start_times = connection.info.get('query_start_times')
+            if start_times:
+                start_times.pop()
+
+    def record(self, statement, duration_ms, rowcount, caller):
+        """Adds one execution of `statement` to the aggregated statistics (`caller` is None when not sampled)."""
+        fingerprint = fingerprint_statement(statement)
+        with self._lock:
+            entry = self._stats.get(fingerprint)
+            if entry is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    cheapest = min(self._stats, key=lambda key: self._stats[key]['total_ms'])
+                    del self._stats[cheapest]
+                entry = {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'callers': Counter()}
+                self._stats[fingerprint] = entry
+
+            entry['calls'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['rows'] += rowcount
+            if caller is not None and (caller in entry['callers'] or len(entry['callers']) < self.max_callers):
+                entry['callers'][caller] += 1
+
+    def top(self, limit=20, sort_by='total_ms'):
+        """
+        Retrieves the most expensive statements.
+
+        Args:
+            limit (int): Number of statements to return.
+            sort_by (str): One of `total_ms`, `max_ms`, `avg_ms`, `calls` or `rows`.
+
+        Returns:
+            dict: The collection period and the top statements with their aggregated statistics.
+        """
+        with self._lock:
+            statements = [
+                {
+                    'fingerprint': fingerprint,
+                    'calls': entry['calls'],
+                    'total_ms': round(entry['total_ms'], 3),
+                    'avg_ms': round(entry['total_ms'] / entry['calls'], 3),
+                    'max_ms': round(entry['max_ms'], 3),
+                    'rows': entry['rows'],
+                    'callers': dict(entry['callers'].most_common(5)),
+                }
+                for fingerprint, entry in self._stats.items()
+            ]
+            since = self._since
+
+        if sort_by not in ('total_ms', 'max_ms', 'avg_ms', 'calls', 'rows'):
+            sort_by = 'total_ms'
+        statements.sort(key=lambda statement: statement[sort_by], reverse=True)
+        return {
+            'since': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(since)),
+            'fingerprints': len(statements),
+            'total_ms': round(sum(statement['total_ms'] for statement in statements), 3),
+            'statements': statements[:limit],
+        }
+
+    def reset(self):
+        """Clears all collected statistics."""
+        with self._lock:
+            self._stats.clear()
+            self._since = time.time()
+
+
+query_profiler = QueryProfiler()
@@ -4,8 +4,7 @@ import os
 from twilio.twiml.messaging_response import MessagingResponse
 
 from src.data_manager.message import get_user_messages
-from src.data_manager.nutritional_profiling import retrieve_nutritional_information, calculate_eating_consistency
-from src.communication.messaging_service import SMSService, WhatsAppService
+from src.communication.messaging_service import WhatsAppService, create_sms_service
 from src.communication.twilio_tool import NewTwilioConversationManager
 from src.config.logging_config import Logger
 from src.utils.localization_utils import prompt_language_formatting
@@ -13,9 +12,9 @@ from src.prompts.prompts_templates import CONVERSATION_PERSONA, CONVERSATION_PRO
                                           CONVERSATION_FEW_SHOTS, CONVERSATION_COT, CONVERSATION_RULES
 from src.constants import (ASSISTANT_ROLE, GPT_4_O, SYSTEM_ROLE,
                            USER_ROLE, USERS_MESSAGES_LIMIT)
-from src.data_manager.meal import get_recent_meals_string_for_user
 from src.data_manager.user import get_user
 from src.openai_client import OpenAIChatClient
+from src.services.user_context import get_user_context
 
 
 logger = Logger('myfoodrepo.response_manager').get_logger()
@@ -32,7 +31,7 @@ def exceeds_message_limit(user_id) :
         Tuple[bool, int]: (Whether limit is exceeded, number of messages today)
     """
 
-    todays_messages  = get_user_messages(user_id)
+    todays_messages  = get_user_messages(user_id, include_system_prompts=False)
     midnight_today = datetime.combine(datetime.today(), time.min)
     todays_messages  = [
     message for message in todays_messages 
@@ -50,7 +49,7 @@ def generate_response(from_number, body, system_prompt,twilio_message_id) -> str
 
         chat_client.add_message_from_phone_number(from_number, USER_ROLE, body,twilio_message_id,None)
 
-        openai_response = chat_client.create_chat_completion(GPT_4_O, from_number, 1)
+        openai_response = chat_client.create_chat_completion(GPT_4_O, from_number, 1, purpose="chat")
 
         logger.debug("OpenAI Correctly Formulated a Response")
         resp = openai_response
@@ -70,15 +69,19 @@ def process_openai_response(app, from_number, body, response_data, timer, twilio
             logger.info(f"User {user.id} has exceeded the number of messages for today. Not sending a response.")
         
         else :
-            recent_meals = get_recent_meals_string_for_user(user.myfoodrepo_key)
-            nutritional_information = retrieve_nutritional_information(user)
-            consistency_metrics = calculate_eating_consistency(user)
+            user_context = get_user_context(user)
+            recent_meals = user_context.recent_meals
+            nutritional_information = user_context.diet_information
+            consistency_metrics = user_context.consistency_metrics
             user_language = prompt_language_formatting(user.language)
             current_datetime = datetime.now()
 
-            base_prompt = CONVERSATION_ROLE.format(current_datetime = current_datetime)
+            # The instructions common to all conversations lead the prompt (prompt caching), the user's data follows
+            meal_info_prompt = CONVERSATION_PERSONA + CONVERSATION_FEW_SHOTS + CONVERSATION_COT + CONVERSATION_RULES
 
-            base_prompt += USER_PROFILE.format(
+            meal_info_prompt += CONVERSATION_ROLE.format(current_datetime = current_datetime)
+
+            meal_info_prompt += USER_PROFILE.format(
                 age = user.age,
                 gender = user.gender,
                 diet_goal = user.diet_goal,
@@ -86,8 +89,6 @@ def process_openai_response(app, from_number, body, response_data, timer, twilio
                 recent_meals = recent_meals,
                 current_logging_streak = consistency_metrics['current_streak'],
                 prefered_language = user_language)
-            
-            meal_info_prompt = base_prompt + CONVERSATION_PERSONA + CONVERSATION_FEW_SHOTS + CONVERSATION_COT + CONVERSATION_RULES
 
 
             if msg_nb_today == USERS_MESSAGES_LIMIT - 1 :
@@ -106,7 +107,7 @@ def process_openai_response(app, from_number, body, response_data, timer, twilio
             if msg_type == 'WhatsApp':
                 manager = NewTwilioConversationManager(WhatsAppService())
             else:
-                manager = NewTwilioConversationManager(SMSService())
+                manager = NewTwilioConversationManager(create_sms_service())
             open_ai_response = manager.send_message(from_number, response_text)
             chat_client.add_message(user.id,ASSISTANT_ROLE,open_ai_response.body,open_ai_response.sid,None)
 
@@ -1,15 +1,17 @@
 import os
-from flask import Blueprint, render_template, session, redirect, url_for, request, flash
+from datetime import timedelta
+
+from flask import Blueprint, jsonify, render_template, session, redirect, url_for, request, flash
 
 from src.scheduler.scheduler import get_job_execution_report
 from src.communication.conversation_ender import end_conversations
 from src.communication.conversation_starter import start_conversations
+from src.data_manager.llm_usage import get_llm_usage_summary
+from src.data_manager.models import get_swiss_time
 from src.data_manager.form_data_manager import generate_participation_keys, update_cohort_participants_info
-from src.data_manager.meal import get_all_meals
-from src.data_manager.message import get_all_messages, get_study_start_date
-from src.data_manager.reminder import get_all_reminders
-from src.data_manager.user import get_all_users
 from src.init_experiment import fill_db_from_google_form_data
+from src.query_profiler import query_profiler
+from src.services.statistics import get_home_statistics, invalidate_home_statistics
 from src.utils.auth_utils import login_required
 
 main_bp = Blueprint('main', __name__)
@@ -36,11 +38,12 @@ def login():
 @login_required
 def home():
     """Dashboard overview with counts for various entities."""
-    users_count = len(get_all_users())
-    messages_count = len(get_all_messages(filter_twilio_message_id=True))
-    reminders_count = len(get_all_reminders())
-    meals_count = len(get_all_meals())
-    study_start_date_raw = get_study_start_date()
+    statistics = get_home_statistics()
+    users_count = statistics['users_count']
+    messages_count = statistics['messages_count']
+    reminders_count = statistics['reminders_count']
+    meals_count = statistics['meals_count']
+    study_start_date_raw = statistics['study_start_date']
 
     study_start_date_formatted = None
     if study_start_date_raw:
@@ -80,6 +83,7 @@ def process_google_form():
 def init_data_from_google_form():
     """Populate DB from Google Form responses."""
     fill_db_from_google_form_data()
+    invalidate_home_statistics()
     flash(f"✅ Database initialized with participants data.", "success")
     return redirect(url_for('main.home'))
 
@@ -88,6 +92,7 @@ def init_data_from_google_form():
 def update_cohort():
     """Update the csv file with new data from a CSV file."""
     update_cohort_participants_info()
+    invalidate_home_statistics()
     flash(f"✅ Database updated with the newest participants data.", "success")
     return redirect(url_for('main.home'))
 
@@ -96,6 +101,30 @@ def update_cohort():
 def job_report():
     return get_job_execution_report()
 
+@main_bp.route('/query-stats', methods=['GET'])
+@login_required
+def query_stats():
+    """Most expensive SQL statements since startup (or the last reset)."""
+    limit = max(1, request.args.get('limit', 20, type=int))
+    sort_by = request.args.get('sort', 'total_ms')
+    return jsonify(query_profiler.top(limit=limit, sort_by=sort_by))
+
+@main_bp.route('/query-stats/reset', methods=['POST'])
+@login_required
+def reset_query_stats():
+    """Clears the collected SQL statistics."""
+    query_profiler.reset()
+    return jsonify({'status': 'reset'})
+
+
+@main_bp.route('/llm-usage', methods=['GET'])
+@login_required
+def llm_usage():
+    """OpenAI token usage per purpose, with the share of prompt tokens served from the prompt cache."""
+    days = request.args.get('days', type=int)
+    since = get_swiss_time().replace(tzinfo=None) - timedelta(days=days) if days else None
+    return jsonify(get_llm_usage_summary(since))
+
 
 # ========== Conversation Management Routes ==========
 
@@ -104,6 +133,7 @@ def job_report():
 def convs_start():
     """Start all conversations and scheduling."""
     start_conversations()
+    invalidate_home_statistics()
     flash(f"✅ Conversations have been started with all users in the database.", "success")
     return redirect(url_for('main.home'))
 
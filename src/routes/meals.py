@@ -3,11 +3,13 @@ from flask import Blueprint, render_template, jsonify, url_for, flash, redirect,
 from io import StringIO
 from flask import make_response
 import pandas as pd
-from src.data_manager.meal import edit_meal_characteristic, get_all_meals, get_meal_by_id, get_recent_meals_string_for_user, get_cohort_retention, get_meal_logging_frequency, get_meals_per_study_group, get_meals_per_day_per_study_group, get_meal_by_id, remove_user_meal, checking_meals_sanity, get_meal_logging_by_hour
+from src.data_manager.meal import edit_meal_characteristic, get_all_meals, get_meals_page, get_meal_by_id, get_recent_meals_string_for_user, get_cohort_retention, get_meal_logging_frequency, get_meals_per_study_group, get_meals_per_day_per_study_group, get_meal_by_id, remove_user_meal, checking_meals_sanity, get_meal_logging_by_hour
 from src.data_manager.myfoodrepo_data_manager import update_database
 from src.utils.auth_utils import login_required
 from src.config.logging_config import Logger
+from src.constants import MANAGEMENT_MAX_PAGE_SIZE, MANAGEMENT_PAGE_SIZE
 from src.utils.csv_utils import meals_to_dataframe
+from src.utils.pagination_utils import get_pagination_args
 
 meals_bp = Blueprint('meals', __name__)
 logger = Logger('meals_routes').get_logger()
@@ -38,8 +40,10 @@ def recent_meals():
 def sync_meals_data():
     full_sync = request.args.get('full_sync', 'false').lower() == 'true'
     logger.info(f"Manual syncing of the Meals data - Full sync: {full_sync}")
-    update_database(full_sync=full_sync)
-    flash("✅ Meals correctly updated.", "success")
+    if update_database(full_sync=full_sync):
+        flash("✅ Meals correctly updated.", "success")
+    else:
+        flash("⚠️ A meals sync is already running, please try again later.", "warning")
     return redirect(url_for('meals.home'))
 
 
@@ -48,8 +52,7 @@ def sync_meals_data():
 @meals_bp.route("/remove_meal/<int:meal_id>", methods=['POST'])
 def remove_meal(meal_id):
     msg, status = remove_user_meal(meal_id)
-    all_meals = get_all_meals()
-    return render_template("meals/manage_meals.html", all_meals=all_meals)
+    return redirect(url_for("meals.manage_meals"))
 
 @meals_bp.app_context_processor
 def meal_utility_processor():
@@ -65,7 +68,7 @@ def edit_meal(meal_id):
 
 @meals_bp.route("/update_meal/<int:meal_id>", methods=["POST"])
 def update_meal(meal_id):
-    msg = edit_meal_characteristic(meal_id)
+    msg = edit_meal_characteristic(meal_id, request.form)
     
     if msg == "Information updated" : 
         flash("Meal updated successfully", "success")
@@ -77,8 +80,13 @@ def update_meal(meal_id):
 
 @meals_bp.route("/manage_meals", methods=["GET","POST"])
 def manage_meals():
-    all_meals = get_all_meals()
-    return(render_template("meals/manage_meals.html", all_meals = all_meals))
+    pagination_args = get_pagination_args(request.args, MANAGEMENT_PAGE_SIZE, MANAGEMENT_MAX_PAGE_SIZE)
+    meals, next_cursor, previous_cursor = get_meals_page(**pagination_args)
+    return(render_template("meals/manage_meals.html",
+                           all_meals = meals,
+                           next_cursor = next_cursor,
+                           previous_cursor = previous_cursor,
+                           per_page = pagination_args['per_page']))
 
 @meals_bp.route("/download-meals", methods=["GET"])
 @login_required
@@ -4,14 +4,16 @@ import threading
 import pandas as pd
 from io import StringIO
 from flask import make_response
-from src.data_manager.message import get_messages_count_per_day_per_study_group, get_study_group_messages, get_messages_count_per_day ,get_user_messages_per_hour, get_all_messages, checking_message_sanity
+from src.data_manager.message import get_messages_count_per_day_per_study_group, get_study_group_messages, get_messages_count_per_day ,get_user_messages_per_hour, get_all_messages, get_messages_page, checking_message_sanity
 from src.utils.message_utils import convert_from_whatsapp_number_format
 from src.response.response_manager import process_openai_response, send_interim_response
 from src.communication.twilio_tool import NewTwilioConversationManager
-from src.communication.messaging_service import SMSService
+from src.communication.messaging_service import create_sms_service
 from src.data_manager.user import detect_user_participation_change, is_user_registered, is_user_allowed_to_chat, update_user_participation
 from src.config.logging_config import Logger
+from src.constants import MANAGEMENT_MAX_PAGE_SIZE, MANAGEMENT_PAGE_SIZE
 from src.utils.csv_utils import messages_to_dataframe
+from src.utils.pagination_utils import get_pagination_args
 
 from src.utils.auth_utils import login_required
 
@@ -38,8 +40,13 @@ def messages_home():
 
 @messages_bp.route("/manage_messages", methods=["GET","POST"])
 def manage_messages():
-    all_messages = get_all_messages(filter_assistant_messages=True)
-    return(render_template("messages/manage_messages.html", all_messages = all_messages))
+    pagination_args = get_pagination_args(request.args, MANAGEMENT_PAGE_SIZE, MANAGEMENT_MAX_PAGE_SIZE)
+    messages, next_cursor, previous_cursor = get_messages_page(filter_assistant_messages=True, **pagination_args)
+    return(render_template("messages/manage_messages.html",
+                           all_messages = messages,
+                           next_cursor = next_cursor,
+                           previous_cursor = previous_cursor,
+                           per_page = pagination_args['per_page']))
 
 
 # ========== Graph & Data Related Endpoints ==========
@@ -124,7 +131,7 @@ def send_sms():
         flash("Phone number and message are required!", "error")
         return redirect(url_for('sms.send_sms'))
 
-    manager = NewTwilioConversationManager(SMSService())
+    manager = NewTwilioConversationManager(create_sms_service())
 
     try:
         manager.send_message(phone_number, message)
@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash,current_app
 from src.data_manager.reminder import add_reminder, add_reminder_all_users, get_all_reminders, get_study_group_reminders, reminders_check, remove_reminder, checking_reminders_sanity
-from src.scheduler.scheduler import get_all_running_jobs, unschedule_job, schedule_reminder, schedule_reminders
+from src.scheduler.scheduler import get_all_running_jobs, unschedule_job, unschedule_reminder, schedule_reminder, schedule_reminders
 from src.config.logging_config import Logger
 
 
@@ -38,12 +38,18 @@ def add_user_reminder() :
     user_id = request.form.get("user_id")
     time = request.form.get("time")
     meal_type = request.form.get("meal_type")
-    return add_reminder(user_id,time,meal_type)
+    msg, status = add_reminder(user_id,time,meal_type)
+    if status == 200:
+        schedule_reminder(user_id, None, meal_type, current_app)
+    return msg, status
     
 
 @reminders_bp.route("/remove_reminder/<int:reminder_id>", methods=["POST"])
 def remove_user_reminder(reminder_id) :
-    return remove_reminder(reminder_id)
+    msg, status = remove_reminder(reminder_id)
+    if status == 200:
+        unschedule_reminder(reminder_id)
+    return msg, status
 
 @reminders_bp.route("/add_all", methods=['GET','POST'])
 def add_all_reminders():
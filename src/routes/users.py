@@ -3,12 +3,14 @@ from io import StringIO
 from flask import make_response
 import pandas as pd
 from src.data_manager.myfoodrepo_data_manager import healthy_index_preprocessing
-from src.data_manager.user import get_all_users, get_users_by_study_group, get_age_distribution, get_gender_distribution, get_language_distribution, get_user,checking_users_sanity, update_user_participation, get_started_users_per_group, update_user_study_end
+from src.data_manager.user import get_all_users, get_users_by_study_group, get_users_page, get_age_distribution, get_gender_distribution, get_language_distribution, get_user,checking_users_sanity, update_user_participation, get_started_users_per_group, update_user_study_end
 from src.data_manager.health_summary.health_summary import generate_health_summary
 from src.communication.conversation_starter import start_specific_conversation
 from src.communication.conversation_ender import end_specific_conversation
 from src.config.logging_config import Logger
+from src.constants import MANAGEMENT_MAX_PAGE_SIZE, MANAGEMENT_PAGE_SIZE
 from src.utils.csv_utils import users_to_dataframe
+from src.utils.pagination_utils import get_pagination_args
 from typing import Union
 import json
 
@@ -26,9 +28,9 @@ def users():
     gender = request.args.get('gender', '')
     language = request.args.get('language', '')
     page = request.args.get('page', 1, type=int)
-    users_per_group = [get_users_by_study_group(i) for i in range(4)]
-
     users_data = get_all_users()
+    users_per_group = [[user for user in users_data if user.study_group == i] for i in range(4)]
+
     sanity_check_results = checking_users_sanity()
 
     group_data = {
@@ -161,8 +163,13 @@ def download_users_csv():
 
 @users_bp.route("/manage_users", methods=['GET','POST'])
 def manage_users():
-    all_users = get_all_users()
-    return(render_template("users/manage_users.html", all_users = all_users))
+    pagination_args = get_pagination_args(request.args, MANAGEMENT_PAGE_SIZE, MANAGEMENT_MAX_PAGE_SIZE)
+    users, next_cursor, previous_cursor = get_users_page(**pagination_args)
+    return(render_template("users/manage_users.html",
+                           all_users = users,
+                           next_cursor = next_cursor,
+                           previous_cursor = previous_cursor,
+                           per_page = pagination_args['per_page']))
 
 @users_bp.route("start_conv/<int:user_id>", methods = ['POST']) 
 def start_specific_conv(user_id):
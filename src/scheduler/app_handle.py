@@ -0,0 +1,80 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from ..config.logging_config import Logger
+
+logger = Logger('myfoodrepo.scheduler.app_handle').get_logger()
+
+
+class SchedulerAppHandle:
+    """
+    The Flask application used by the scheduler jobs, bound once when the scheduler starts.
+
+    Each job runs within a fresh application context, pushed when the job starts and popped (calling the
+    teardown functions, e.g. releasing the database session) when it ends, so that nothing attached to
+    the context outlives the job. The time spent setting up and tearing down the context is recorded per job.
+    """
+
+    def __init__(self):
+        self._app = None
+        self._stats_lock = threading.Lock()
+        self._stats = {'jobs': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+
+    def bind(self, app):
+        """Binds the application the jobs run with."""
+        self._app = app
+
+    @property
+    def app(self):
+        """The bound application (None if the scheduler was not started)."""
+        return self._app
+
+    @contextmanager
+    def job_context(self):
+        """
+        Runs the enclosed job code within an application context of its own.
+
+        Yields:
+            Flask: The bound application.
+
+        Raises:
+            RuntimeError: If no application was bound.
+        """
+        app = self._app
+        if app is None:
+            raise RuntimeError("No application bound to the scheduler (start_scheduler was not called)")
+
+        start = time.perf_counter()
+        context = app.app_context()
+        context.push()
+        overhead = time.perf_counter() - start
+
+        error = None
+        try:
+            yield app
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            start = time.perf_counter()
+            try:
+                context.pop(error)
+            except Exception as e:
+                logger.error(f"Error tearing down the scheduler job context: {e}")
+            self._record((overhead + time.perf_counter() - start) * 1000)
+
+    def _record(self, overhead_ms):
+        with self._stats_lock:
+            self._stats['jobs'] += 1
+            self._stats['total_ms'] += overhead_ms
+            self._stats['max_ms'] = max(self._stats['max_ms'], overhead_ms)
+
+    def overhead_stats(self):
+        """Returns the number of jobs run and the context overhead per job (ms)."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['avg_ms'] = round(stats['total_ms'] / stats['jobs'], 4) if stats['jobs'] else 0.0
+        stats['total_ms'] = round(stats['total_ms'], 3)
+        stats['max_ms'] = round(stats['max_ms'], 3)
+        return stats
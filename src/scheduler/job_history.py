@@ -0,0 +1,261 @@
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict, deque
+
+import numpy as np
+import pytz
+
+from ..config.logging_config import Logger
+from ..data_manager.job_execution import (get_latest_job_execution_id, get_recent_job_executions,
+                                          store_job_executions)
+from ..utils import clock
+from ..utils.write_buffer import WriteBehindBuffer
+
+logger = Logger('myfoodrepo.scheduler.job_history').get_logger()
+
+_SLOT_SUFFIX = re.compile(r"_(\d{2})(\d{2})$")
+_ID_SUFFIX = re.compile(r"_\d+$")
+
+ZURICH = pytz.timezone('Europe/Zurich')
+FINAL_STATUSES = ('completed', 'failed', 'stale', 'missed')
+FAILED_STATUSES = ('failed', 'stale', 'missed')
+
+
+def _now():
+    """Current (naive) Zurich time, as stored by the `DateTime` columns."""
+    return clock.now(ZURICH).replace(tzinfo=None)
+
+
+def get_job_type(job_id):
+    """
+    Returns the type of a job, i.e its ID without the slot or reminder suffix
+    (e.g `reminder_slot_1900` -> `reminder_slot`, `reminder_12` -> `reminder`).
+    """
+    return _ID_SUFFIX.sub("", job_id)
+
+
+def get_job_slot(job_id):
+    """Returns the slot (`HH:MM`) of a slot job (e.g `reminder_slot_1900` -> `19:00`), None otherwise."""
+    if not job_id.startswith(('reminder_slot_', 'reminder_pregen_')):
+        return None
+    match = _SLOT_SUFFIX.search(job_id)
+    return f"{match.group(1)}:{match.group(2)}" if match else None
+
+
+class JobRun:
+    """A job run in progress, returned by `JobHistory.start`. Its duration is measured on the monotonic clock."""
+
+    def __init__(self, job_id, attempt, slot):
+        self.job_id = job_id
+        self.attempt = attempt
+        self.slot = slot
+        self.started_at = _now()
+        self.start_counter = time.perf_counter()
+
+
+class JobHistory:
+    """
+    Bounded history of the scheduler job runs, with their aggregated statistics.
+
+    The `max_runs` most recent runs are kept in memory (ring buffer) and persisted in the
+    `job_executions` table through a write-behind buffer, so that the history survives restarts
+    (see `load`). The statistics (p50/p95 duration and failures per job type, outcomes per reminder
+    slot, daily trends) are computed from the runs kept and cached until the next run is recorded.
+
+    Attributes:
+        max_runs (int): Number of most recent runs kept.
+    """
+
+    def __init__(self, max_runs, flush_interval, max_batch):
+        self.max_runs = max_runs
+        self._runs = deque(maxlen=max_runs)
+        self._latest = OrderedDict()
+        self._lock = threading.Lock()
+        self._summary = None
+        self._loaded_id = None
+        self._buffer = WriteBehindBuffer(self._write_runs, flush_interval=flush_interval, max_batch=max_batch,
+                                         name="job-history-buffer")
+
+    def start(self, job_id, attempt=1, slot=None):
+        """
+        Marks the start of a job run.
+
+        Returns:
+            JobRun: The run, to pass to `finish`.
+        """
+        run = JobRun(job_id, attempt, slot or get_job_slot(job_id))
+        with self._lock:
+            self._set_latest(job_id, {'timestamp': run.started_at, 'status': 'started', 'error': None})
+        return run
+
+    def finish(self, run, status, error=None):
+        """Records the outcome of a run started with `start`."""
+        self._record(run.job_id, status, error, run.attempt, run.slot, run.started_at, _now(),
+                     (time.perf_counter() - run.start_counter) * 1000)
+
+    def record(self, job_id, status, error=None, attempt=1, slot=None):
+        """Records an event which did not run the job (e.g a missed, deferred or stale run)."""
+        now = _now()
+        self._record(job_id, status, error, attempt, slot or get_job_slot(job_id), now, now, 0.0)
+
+    def latest(self, job_id):
+        """Returns the last status of a job (timestamp, status and error), None if it never ran."""
+        with self._lock:
+            return self._latest.get(job_id)
+
+    def latest_statuses(self):
+        """Returns the last status of every job, by job ID."""
+        with self._lock:
+            return dict(self._latest)
+
+    def load(self):
+        """
+        Loads the most recent runs persisted (e.g by the previous processes) into the history, replacing
+        the runs and the last statuses kept in memory.
+        """
+        try:
+            self._buffer.flush()
+            loaded_id = get_latest_job_execution_id()
+            rows = get_recent_job_executions(self.max_runs)
+        except Exception as e:
+            logger.error(f"🛑 Could not load the job execution history: {e}")
+            return 0
+        with self._lock:
+            self._runs.clear()
+            self._runs.extend(rows)
+            self._latest.clear()
+            for row in rows:
+                self._set_latest(row['job_id'], {'timestamp': row['ended_at'], 'status': row['status'],
+                                                 'error': row['error']})
+            self._summary = None
+            self._loaded_id = loaded_id
+        logger.info(f"Loaded {len(rows)} job runs from the execution history")
+        return len(rows)
+
+    def refresh(self):
+        """
+        Reloads the persisted runs if new ones were written since the last load (e.g by the leader process,
+        when this process is a follower), keeping the cached statistics otherwise.
+
+        Returns:
+            bool: Whether the history was reloaded.
+        """
+        try:
+            latest_id = get_latest_job_execution_id()
+        except Exception as e:
+            logger.error(f"🛑 Could not check the job execution history: {e}")
+            return False
+        if self._loaded_id is not None and latest_id == self._loaded_id:
+            return False
+        self.load()
+        return True
+
+    def flush(self):
+        """Writes the pending runs to the database."""
+        self._buffer.flush()
+
+    def stop(self):
+        """Stops the write-behind buffer, after writing the pending runs."""
+        self._buffer.stop()
+
+    def reset(self):
+        """Forgets the runs kept in memory (the persisted ones are left untouched)."""
+        with self._lock:
+            self._runs.clear()
+            self._latest.clear()
+            self._summary = None
+            self._loaded_id = None
+
+    def summary(self):
+        """
+        Returns the aggregated statistics of the runs kept, computed once per new run.
+
+        Returns:
+            dict: The statistics per job type (runs, outcomes, failure rate, p50/p95/max duration
+                  and daily trend) and per reminder slot (runs, outcomes, failure rate).
+        """
+        with self._lock:
+            if self._summary is None:
+                self._summary = self._compute_summary(list(self._runs))
+            return self._summary
+
+    def _record(self, job_id, status, error, attempt, slot, started_at, ended_at, duration_ms):
+        row = {
+            'job_id': job_id,
+            'job_type': get_job_type(job_id),
+            'slot': slot,
+            'status': status,
+            'attempt': attempt,
+            'started_at': started_at,
+            'ended_at': ended_at,
+            'duration_ms': round(duration_ms, 3),
+            'error': error,
+        }
+        with self._lock:
+            self._runs.append(row)
+            self._set_latest(job_id, {'timestamp': ended_at, 'status': status, 'error': error})
+            self._summary = None
+        self._buffer.add(job_id, row)
+
+    def _set_latest(self, job_id, entry):
+        self._latest[job_id] = entry
+        self._latest.move_to_end(job_id)
+        while len(self._latest) > self.max_runs:
+            self._latest.popitem(last=False)
+
+    def _write_runs(self, rows):
+        store_job_executions(rows, self.max_runs)
+
+    @staticmethod
+    def _compute_summary(runs):
+        by_type = defaultdict(list)
+        by_slot = defaultdict(Counter)
+        for run in runs:
+            by_type[run['job_type']].append(run)
+            if run['slot']:
+                by_slot[run['slot']][run['status']] += 1
+
+        job_types = {}
+        for job_type, type_runs in by_type.items():
+            outcomes = Counter(run['status'] for run in type_runs)
+            timed_runs = [run for run in type_runs if run['status'] in FINAL_STATUSES and run['duration_ms'] > 0]
+            durations = np.array([run['duration_ms'] for run in timed_runs])
+            daily = defaultdict(list)
+            for run in type_runs:
+                daily[run['started_at'].date().isoformat()].append(run)
+            daily_durations = defaultdict(list)
+            for run in timed_runs:
+                daily_durations[run['started_at'].date().isoformat()].append(run['duration_ms'])
+            job_types[job_type] = {
+                'runs': len(type_runs),
+                'outcomes': dict(outcomes),
+                'failure_rate': _failure_rate(outcomes),
+                'p50_ms': round(float(np.percentile(durations, 50)), 1) if durations.size else None,
+                'p95_ms': round(float(np.percentile(durations, 95)), 1) if durations.size else None,
+                'max_ms': round(float(durations.max()), 1) if durations.size else None,
+                'daily': {
+                    day: {
+                        'runs': len(day_runs),
+                        'p50_ms': (round(float(np.median(daily_durations[day])), 1)
+                                   if daily_durations[day] else None),
+                        'failure_rate': _failure_rate(Counter(run['status'] for run in day_runs)),
+                    }
+                    for day, day_runs in sorted(daily.items())
+                },
+            }
+
+        slots = {slot: {'runs': sum(outcomes.values()), 'outcomes': dict(outcomes),
+                        'failure_rate': _failure_rate(outcomes)}
+                 for slot, outcomes in sorted(by_slot.items())}
+        return {
+            'runs': len(runs),
+            'since': runs[0]['started_at'].isoformat() if runs else None,
+            'job_types': job_types,
+            'slots': slots,
+        }
+
+
+def _failure_rate(outcomes):
+    final = sum(outcomes[status] for status in FINAL_STATUSES)
+    return round(sum(outcomes[status] for status in FAILED_STATUSES) / final, 4) if final else None
@@ -0,0 +1,72 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ReminderActivity:
+    """
+    Tracks the reminder work in progress (slot preparation, dispatch and retries), so that the background
+    jobs (the meal syncs) can yield to it: reminder jobs mark themselves as running, and the background
+    jobs wait for the reminder work to be over at their safe points (e.g. between two users).
+    """
+
+    def __init__(self):
+        self._active = 0
+        self._condition = threading.Condition()
+        self._stats = {'pauses': 0, 'paused_s': 0.0, 'timeouts': 0}
+
+    @property
+    def is_active(self):
+        """Whether reminder work is in progress."""
+        with self._condition:
+            return self._active > 0
+
+    @contextmanager
+    def running(self):
+        """Marks the enclosed code as reminder work (calls can be nested)."""
+        with self._condition:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                if self._active == 0:
+                    self._condition.notify_all()
+
+    def track(self, func):
+        """Decorator marking every call of `func` as reminder work."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.running():
+                return func(*args, **kwargs)
+        return wrapper
+
+    def wait_until_idle(self, timeout):
+        """
+        Blocks while reminder work is in progress.
+
+        Args:
+            timeout (float): Maximum time to wait, in seconds.
+
+        Returns:
+            bool: True if no reminder work is in progress, False if the timeout expired.
+        """
+        with self._condition:
+            if self._active == 0:
+                return True
+            start = time.perf_counter()
+            idle = self._condition.wait_for(lambda: self._active == 0, timeout)
+            self._stats['pauses'] += 1
+            self._stats['paused_s'] += time.perf_counter() - start
+            self._stats['timeouts'] += int(not idle)
+            return idle
+
+    def stats(self):
+        """Returns the number of pauses of the background jobs and the time they spent paused."""
+        with self._condition:
+            stats = dict(self._stats)
+            stats['active'] = self._active
+        stats['paused_s'] = round(stats['paused_s'], 3)
+        return stats
@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single process is assumed
+    fcntl = None
+
+from ..config.logging_config import Logger
+
+logger = Logger('myfoodrepo.scheduler.leader_election').get_logger()
+
+
+class SchedulerLeaderElection:
+    """
+    Elects the single process running the scheduler among the processes serving the application
+    (e.g. the gunicorn workers), through an exclusive lock on a file shared by all of them.
+
+    The process holding the lock is the leader: it runs `on_elected` once and writes a heartbeat
+    (PID, host and timestamp) into the lock file. If `on_elected` raises, the lock is released at once. The others are followers and retry to acquire the
+    lock periodically. The lock is released by the operating system when the leader exits or dies,
+    so one of the followers takes over within `retry_interval` seconds.
+
+    Note that the lock is not inherited by forked processes: with gunicorn's `--preload`, the master
+    process (which does not serve requests) becomes the leader.
+
+    Attributes:
+        lock_path (str): Path of the lock file.
+        on_elected (callable): Called (without arguments) when the process becomes the leader.
+        retry_interval (float): Seconds between two attempts of a follower, and between two heartbeats.
+    """
+
+    def __init__(self, lock_path, on_elected, retry_interval):
+        self.lock_path = lock_path
+        self.on_elected = on_elected
+        self.retry_interval = retry_interval
+        self._file = None
+        self._is_leader = False
+        self._elected_at = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def is_leader(self):
+        """Whether this process currently runs the scheduler."""
+        return self._is_leader
+
+    def start(self):
+        """
+        Tries to become the leader and starts the background thread (heartbeat or follower retries).
+
+        Returns:
+            bool: Whether this process was elected.
+        """
+        elected = self._try_acquire()
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="scheduler-leader-election", daemon=True)
+            self._thread.start()
+        return elected
+
+    def stop(self):
+        """Stops the background thread and gives up the leadership."""
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=max(self.retry_interval * 2, 5))
+        self._thread = None
+        self.release()
+
+    def release(self):
+        """Releases the lock (if held), letting a follower take over."""
+        with self._lock:
+            if self._file is not None:
+                try:
+                    if fcntl is not None:
+                        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+                finally:
+                    self._file.close()
+                    self._file = None
+            if self._is_leader:
+                logger.info(f"Process {os.getpid()} gave up the scheduler leadership")
+            self._is_leader = False
+            self._elected_at = None
+
+    def status(self):
+        """Returns whether this process is the leader, along with the last heartbeat of the leader."""
+        return {
+            'pid': os.getpid(),
+            'is_leader': self._is_leader,
+            'elected_at': self._elected_at.isoformat() if self._elected_at else None,
+            'leader': self.read_heartbeat(),
+        }
+
+    def read_heartbeat(self):
+        """Returns the heartbeat written by the leader (None if unavailable)."""
+        try:
+            with open(self.lock_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            return json.loads(content) if content else None
+        except (OSError, ValueError):
+            return None
+
+    def _try_acquire(self):
+        with self._lock:
+            if self._is_leader:
+                return True
+
+            os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+            lock_file = open(self.lock_path, 'a+', encoding='utf-8')
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    lock_file.close()
+                    return False
+
+            self._file = lock_file
+            self._is_leader = True
+            self._elected_at = _now()
+            self._write_heartbeat()
+
+        logger.info(f"🟢 Process {os.getpid()} elected as the scheduler leader")
+        try:
+            self.on_elected()
+        except Exception as e:
+            # Giving up the leadership, so that another process (or this one, later) starts the scheduler
+            logger.error(f"🛑 Error starting the scheduler on the elected process: {e}")
+            self.release()
+            return False
+        return True
+
+    def _write_heartbeat(self):
+        heartbeat = {
+            'pid': os.getpid(),
+            'host': os.uname().nodename if hasattr(os, 'uname') else None,
+            'elected_at': self._elected_at.isoformat(),
+            'heartbeat_at': _now().isoformat(),
+        }
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(json.dumps(heartbeat))
+        self._file.flush()
+
+    def _run(self):
+        while not self._stopped.wait(self.retry_interval):
+            if self._is_leader:
+                with self._lock:
+                    if self._file is None:
+                        continue
+                    try:
+                        self._write_heartbeat()
+                    except OSError as e:
+                        logger.warning(f"⚠️ Could not write the scheduler leader heartbeat: {e}")
+            else:
+                try:
+                    self._try_acquire()
+                except OSError as e:
+                    logger.warning(f"⚠️ Could not try to acquire the scheduler leadership: {e}")
+
+
+def _now():
+    return datetime.now().replace(microsecond=0)
@@ -1,22 +1,53 @@
 import atexit
 import os
+import random
+import threading
 import pytz
 import time
-import sys
-from apscheduler.schedulers.background import BackgroundScheduler
+from collections import Counter
+from apscheduler.events import EVENT_JOB_MISSED
 from apscheduler.executors.pool import ThreadPoolExecutor
-from datetime import datetime, timedelta
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from concurrent.futures import ThreadPoolExecutor as DispatchPool
+from datetime import datetime, timedelta, time as time_of_day
 
-from ..communication.reminder_manager import send_reminder
+from ..communication.reminder_manager import (REMINDER_FAILED, get_reminder_generators, pregenerate_reminder,
+                                              send_reminder)
 from ..config.logging_config import Logger
-from ..constants import DB_UPDATE_TIME_INTERVAL
-from ..data_manager.models import User, db
+from ..constants import (DATA_FOLDER_NAME, DB_MAINTENANCE_HOUR, DB_MAINTENANCE_MINUTE, DB_UPDATE_TIME_INTERVAL,
+                         SCHEDULER_JOBS_DATABASE_FILENAME,
+                         REMINDER_DISPATCH_BURST, REMINDER_DISPATCH_RATE, REMINDER_DISPATCH_WORKERS,
+                         REMINDER_PREGENERATION_LEAD_MINUTES, REMINDER_PREGENERATION_STUDY_GROUPS,
+                         REMINDER_PREGENERATION_VALIDITY_MINUTES, REMINDER_PREGENERATION_WORKERS,
+                         REMINDER_RETRY_ATTEMPTS, REMINDER_RETRY_BASE_DELAY, REMINDER_RETRY_DEADLINE_MINUTES,
+                         JOB_HISTORY_FLUSH_INTERVAL, JOB_HISTORY_FLUSH_MAX_BATCH, JOB_HISTORY_MAX_RUNS,
+                         REMINDER_RETRY_MAX_DELAY, REMINDER_STUDY_GROUPS, SCHEDULER_LEADER_RETRY_SECONDS,
+                         SCHEDULER_LOCK_FILENAME, SCHEDULER_SLOT_RECONCILE_MINUTES, SYNC_DEFER_AFTER_SLOT_MINUTES,
+                         SYNC_EXECUTOR_WORKERS, SYNC_MAX_PAUSE_SECONDS, SYNC_SLOT_GUARD_MINUTES)
+from ..data_manager.models import Reminder, User
+from ..data_manager.reminder import get_scheduled_reminder_times, get_slot_reminders
+from ..data_manager.user import get_user_by_id
 from ..data_manager.myfoodrepo_data_manager import update_database
+from ..db_maintenance import get_database_stats, run_database_maintenance
+from ..services.reminder_eligibility import evaluate_slot, get_slot_decisions
+from ..utils import clock
+from ..utils.rate_limiter import TokenBucket
+from .app_handle import SchedulerAppHandle
+from .job_history import JobHistory
+from .job_priority import ReminderActivity
+from .leader_election import SchedulerLeaderElection
+from .slot_index import SlotOccupancyIndex
 
 logger = Logger('myfoodrepo.scheduler').get_logger()
 
+# Reminder jobs run on the default executor; the meal syncs have their own, so that they never hold
+# the workers needed by the reminders
 executors = {
-    'default': ThreadPoolExecutor(50),  
+    'default': ThreadPoolExecutor(50),
+    'sync': ThreadPoolExecutor(SYNC_EXECUTOR_WORKERS),
 }
 job_defaults = {
     'coalesce': False, 
@@ -25,199 +56,457 @@ job_defaults = {
 }
 
 scheduler = BackgroundScheduler(executors=executors, job_defaults=job_defaults)
-
-scheduler = BackgroundScheduler()
 timezone = pytz.timezone('Europe/Zurich')
-job_execution_log = {}
-
-class FlaskAppProxy:
-    def __init__(self, app_import_path):
-        self.app_import_path = app_import_path
-        
-    def get_app(self):
-        """
-        Dynamically imports and creates a Flask app on demand
-        This ensures we always have a valid app context
-        """
-        try:
-            
-            project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
-            if project_root not in sys.path:
-                sys.path.insert(0, project_root)
-                
-            
-            if '.' in self.app_import_path:
-                module_path, app_name = self.app_import_path.rsplit('.', 1)
-                module = __import__(module_path, fromlist=[app_name])
-                app = getattr(module, app_name)
-            else:
-                
-                module = __import__(self.app_import_path)
-                app = getattr(module, 'app') 
-                
-            return app
-        except Exception as e:
-            logger.error(f"Error importing app: {str(e)}")
-            return None
+job_history = JobHistory(JOB_HISTORY_MAX_RUNS, JOB_HISTORY_FLUSH_INTERVAL, JOB_HISTORY_FLUSH_MAX_BATCH)
 
+REMINDER_JOB_PREFIX = 'reminder_'
+slot_index = SlotOccupancyIndex()
 
-app_proxy = FlaskAppProxy('web_app') 
+app_handle = SchedulerAppHandle()
+reminder_activity = ReminderActivity()
+leader_election = None
 
 
-def log_job_execution(job_id, status, error_msg=None):
-    """Track job execution status"""
-    timestamp = datetime.now(timezone)
-    job_execution_log[job_id] = {
-        'timestamp': timestamp,
-        'status': status, 
-        'error': error_msg
-    }
-    logger.info(f"Job {job_id} - Status: {status} at {timestamp}")
+def start_job_run(job_id, attempt=1, slot=None):
+    """Records the start of a job run in the execution history"""
+    logger.info(f"Job {job_id} - Status: started")
+    return job_history.start(job_id, attempt, slot)
+
+
+def finish_job_run(run, status, error_msg=None):
+    """Records the outcome of a job run in the execution history"""
+    logger.info(f"Job {run.job_id} - Status: {status}")
+    job_history.finish(run, status, error_msg)
+
+
+def log_job_event(job_id, status, error_msg=None, attempt=1, slot=None):
+    """Records a job event without a run (missed, deferred or stale run) in the execution history"""
+    logger.info(f"Job {job_id} - Status: {status}")
+    job_history.record(job_id, status, error_msg, attempt, slot)
+
+
+def pause_sync_for_reminders():
+    """Pause hook of the meal syncs: waits (up to `SYNC_MAX_PAUSE_SECONDS`) while reminders are being sent"""
+    if not reminder_activity.wait_until_idle(SYNC_MAX_PAUSE_SECONDS):
+        logger.warning("⚠️ Meal sync resumed while reminders are still being sent")
+
+
+def get_minutes_to_next_slot(now=None):
+    """Returns the number of minutes before the next reminder slot (None if no slot is scheduled)."""
+    now = now or clock.now(timezone)
+    slots = slot_index.slots()
+    if not slots:
+        return None
+    return min((get_next_slot_datetime(hour, minute, now) - now).total_seconds() / 60 for hour, minute in slots)
+
+
+def defer_full_sync(now=None):
+    """
+    Defers a full sync that would overlap a reminder slot (or reminders being sent) until after the slot.
+
+    Returns:
+        bool: True if the sync was deferred.
+    """
+    now = now or clock.now(timezone)
+    minutes_to_slot = get_minutes_to_next_slot(now)
+    near_slot = minutes_to_slot is not None and minutes_to_slot < SYNC_SLOT_GUARD_MINUTES
+    if not near_slot and not reminder_activity.is_active:
+        return False
+
+    run_date = now + timedelta(minutes=(minutes_to_slot if near_slot else 0) + SYNC_DEFER_AFTER_SLOT_MINUTES)
+    scheduler.add_job(fetch_meal_data, 'date', run_date=run_date, id='fetch_meal_data_deferred',
+                      executor='sync', replace_existing=True)
+    logger.info(f"Full meal sync deferred to {run_date:%H:%M}, after the reminder slot")
+    return True
 
 
 def fetch_meal_data():
     """Function to update database with latest meal data"""
+    job_id = 'fetch_meal_data'
     try:
-        app = app_proxy.get_app()
-        if app:
-            with app.app_context():
-                update_database()
+        if defer_full_sync():
+            log_job_event(job_id, 'deferred')
+            return
+    except Exception as e:
+        logger.error(f"Could not defer fetch_meal_data, running it now: {str(e)}")
+
+    run = start_job_run(job_id)
+    try:
+        with app_handle.job_context():
+            if update_database(pause_hook=pause_sync_for_reminders):
                 logger.info("Successfully updated database")
-        else:
-            logger.error("Could not get app reference for fetch_meal_data")
+                finish_job_run(run, 'completed')
+            else:
+                finish_job_run(run, 'skipped')
     except Exception as e:
         logger.error(f"Error in fetch_meal_data: {str(e)}")
+        finish_job_run(run, 'failed', str(e))
 
 def fetch_meal_data_recent():
     """Function to update database with only partial sync (full_sync=False)"""
+    run = start_job_run('partial_sync')
     try:
-        app = app_proxy.get_app()
-        if app:
-            with app.app_context():
-                update_database(full_sync=False)
+        with app_handle.job_context():
+            if update_database(full_sync=False, pause_hook=pause_sync_for_reminders):
                 logger.info("Successfully updated database with full_sync=False")
-        else:
-            logger.error("Could not get app reference for fetch_meal_data_recent")
+                finish_job_run(run, 'completed')
+            else:
+                finish_job_run(run, 'skipped')
     except Exception as e:
         logger.error(f"Error in fetch_meal_data_recent: {str(e)}")
+        finish_job_run(run, 'failed', str(e))
 
 
-def schedule_recent_sync_jobs():
-    """Schedule three jobs for partial database sync at 6:59, 11:59, and 18:59"""
-    scheduler.add_job(
-        fetch_meal_data_recent,
-        trigger='cron',
-        hour=6,
-        minute=57,
-        id='partial_sync_0659',
-        timezone=timezone,
-        replace_existing=True
-    )
-    scheduler.add_job(
-        fetch_meal_data_recent,
-        trigger='cron',
-        hour=11,
-        minute=57,
-        id='partial_sync_1159',
-        timezone=timezone,
-        replace_existing=True
-    )
-    scheduler.add_job(
-        fetch_meal_data_recent,
-        trigger='cron',
-        hour=18,
-        minute=57,
-        id='partial_sync_1859',
-        timezone=timezone,
-        replace_existing=True
-    )
+def add_or_keep_job(func, trigger, job_id, args=None, executor='default'):
+    """
+    Adds a job, unless an identical one (same function, arguments and trigger) is already persisted.
 
+    Keeping the persisted job preserves its next run time, so that runs missed while the application
+    was down are detected (and run, within the misfire grace time) once the scheduler resumes.
+
+    Returns:
+        bool: True if the job was added or replaced, False if the persisted job was kept.
+    """
+    args = list(args or [])
+    existing = scheduler.get_job(job_id)
+    if (existing is not None and existing.func is func and list(existing.args) == args
+            and str(existing.trigger) == str(trigger) and existing.executor == executor):
+        return False
+
+    scheduler.add_job(func, trigger=trigger, args=args, id=job_id, executor=executor, replace_existing=True)
+    return True
+
+
+def schedule_recent_sync_jobs():
+    """Schedule three jobs for partial database sync at 6:57, 11:57, and 18:57"""
+    for hour in (6, 11, 18):
+        add_or_keep_job(fetch_meal_data_recent, CronTrigger(hour=hour, minute=57, timezone=timezone),
+                        f'partial_sync_{hour:02d}59', executor='sync')
 
 
 def schedule_fetch_meal_data():
     """Schedule periodic database updates"""
-    scheduler.add_job(
-        fetch_meal_data,
-        'interval',
-        hours=DB_UPDATE_TIME_INTERVAL,
-        id='fetch_meal_data',
-        replace_existing=True
-    )
+    add_or_keep_job(fetch_meal_data, IntervalTrigger(hours=DB_UPDATE_TIME_INTERVAL), 'fetch_meal_data',
+                    executor='sync')
+
+
+def database_maintenance():
+    """Backs up, analyzes and vacuums the database (off-peak job)"""
+    job_id = 'database_maintenance'
+    run = start_job_run(job_id)
+    with app_handle.job_context():
+        outcome = run_database_maintenance()
+    finish_job_run(run, outcome['status'], outcome.get('error'))
+
+
+def schedule_database_maintenance():
+    """Schedule the nightly database maintenance, outside of the reminders & sync hours"""
+    add_or_keep_job(database_maintenance,
+                    CronTrigger(hour=DB_MAINTENANCE_HOUR, minute=DB_MAINTENANCE_MINUTE, timezone=timezone),
+                    'database_maintenance')
+
+
+def slot_job_id(hour, minute):
+    """Returns the ID of the job dispatching the reminders of a time slot."""
+    return f'{REMINDER_JOB_PREFIX}slot_{hour:02d}{minute:02d}'
 
 
-def execute_reminder(user_id, meal_type, reminder_id):
+def pregen_job_id(hour, minute):
+    """Returns the ID of the job preparing the reminders of a time slot."""
+    return f'{REMINDER_JOB_PREFIX}pregen_{hour:02d}{minute:02d}'
+
+
+def get_next_slot_datetime(hour, minute, now=None):
+    """Returns the (aware) datetime of the next occurrence of a time slot."""
+    now = now or clock.now(timezone)
+    slot_datetime = timezone.localize(datetime.combine(now.date(), time_of_day(hour, minute)))
+    if slot_datetime <= now:
+        slot_datetime = timezone.localize(datetime.combine(now.date() + timedelta(days=1), time_of_day(hour, minute)))
+    return slot_datetime
+
+
+def get_current_slot_datetime(hour, minute, now=None):
+    """Returns the (aware) datetime of today's occurrence of a time slot."""
+    now = now or clock.now(timezone)
+    return timezone.localize(datetime.combine(now.date(), time_of_day(hour, minute)))
+
+
+def evaluate_slot_decisions(slot_reminders, slot_datetime):
     """
-    Execute a reminder job. This function will be called by the scheduler.
+    Evaluates the eligibility of all the users of a slot at once.
+
+    Args:
+        slot_reminders (list): The (reminder ID, meal type, `UserDTO`) tuples of the slot.
+        slot_datetime (datetime): The datetime of the slot occurrence.
+
+    Returns:
+        dict: The decision (as returned by `evaluate_reminder`) of each user, by user ID (empty if the
+              evaluation failed).
     """
-    job_id = f'reminder_{reminder_id}'
-    log_job_execution(job_id, 'started')
+    users = [user for _, _, user in slot_reminders]
+    if not users:
+        return {}
+    try:
+        return get_slot_decisions(evaluate_slot(users, slot_datetime, get_reminder_generators().keys()))
+    except Exception as e:
+        # The reminders are then evaluated one by one
+        logger.error(f"Error evaluating the reminder slot {slot_datetime:%H:%M}: {str(e)}")
+        return {}
 
-    max_retries = 3
-    retry_delay = 5
 
-    for attempt in range(max_retries):
+def get_retry_delay(attempt):
+    """
+    Returns the delay, in seconds, before retrying a reminder for the `attempt`-th time: an exponential
+    backoff with random jitter, so that the reminders failing together are not retried together.
+    """
+    backoff = min(REMINDER_RETRY_MAX_DELAY, REMINDER_RETRY_BASE_DELAY * 2 ** (attempt - 2))
+    return random.uniform(backoff / 2, backoff)
 
-        try:
-            app = app_proxy.get_app()
-            if not app:
-                logger.error("Could not get app reference for execute_reminder")
+
+def retry_job_id(reminder_id):
+    """Returns the ID of the one-shot job retrying a reminder."""
+    return f'retry_{REMINDER_JOB_PREFIX}{reminder_id}'
+
+
+def schedule_reminder_retry(user_id, meal_type, reminder_id, decision, attempt, deadline, slot=None):
+    """
+    Schedules a one-shot job retrying a failed reminder, unless the retry would run past its deadline.
+
+    Returns:
+        bool: True if the retry was scheduled.
+    """
+    run_date = clock.now(timezone) + timedelta(seconds=get_retry_delay(attempt))
+    if attempt > REMINDER_RETRY_ATTEMPTS or run_date > deadline:
+        return False
+    scheduler.add_job(execute_reminder, 'date', run_date=run_date, id=retry_job_id(reminder_id),
+                      args=[user_id, meal_type, reminder_id, None, decision, attempt, deadline],
+                      kwargs={'slot': slot}, replace_existing=True)
+    logger.info(f"Retrying reminder {reminder_id} (attempt {attempt}/{REMINDER_RETRY_ATTEMPTS}) at {run_date:%H:%M:%S}")
+    return True
+
+
+@reminder_activity.track
+def execute_reminder(user_id, meal_type, reminder_id, user=None, decision=None, attempt=1, deadline=None,
+                     slot=None):
+    """
+    Execute a single reminder. This function is called by the slot dispatcher for each due reminder,
+    and by the one-shot jobs retrying failed reminders.
+
+    A failed reminder is never retried in the calling thread: a retry job is scheduled instead (see
+    `schedule_reminder_retry`), and the reminder is dropped once its deadline is passed.
+
+    Args:
+        user_id (int): The ID of the user to remind.
+        meal_type (str): The meal type of the reminder.
+        reminder_id (int): The ID of the reminder.
+        user (UserDTO, optional): The user, when already loaded by the caller.
+        decision (tuple, optional): The user's eligibility, when evaluated with the whole slot.
+        attempt (int): The number of the attempt.
+        deadline (datetime, optional): The datetime after which the reminder is stale (by default,
+                                       `REMINDER_RETRY_DEADLINE_MINUTES` after the first attempt).
+        slot (str, optional): The slot (`HH:MM`) the reminder was dispatched in, for the execution history.
+    """
+    job_id = f'reminder_{reminder_id}'
+    now = clock.now(timezone)
+    deadline = deadline or now + timedelta(minutes=REMINDER_RETRY_DEADLINE_MINUTES)
+    if now > deadline:
+        logger.warning(f"⚠️ Reminder {reminder_id} for user {user_id} is stale (deadline {deadline:%H:%M}), dropping it")
+        log_job_event(job_id, 'stale', attempt=attempt, slot=slot)
+        return
+    run = start_job_run(job_id, attempt, slot)
+
+    try:
+        with app_handle.job_context() as app:
+            if user is None:
+                user = get_user_by_id(user_id)
+            if user is None:
+                logger.error(f"User {user_id} of reminder {reminder_id} not found")
+                finish_job_run(run, 'failed', f"User {user_id} not found")
                 return
+            status = send_reminder(user, meal_type, app, reminder_id, decision)
+            error_msg = None if status != REMINDER_FAILED else "The reminder could not be generated or sent"
+    except Exception as e:
+        status, error_msg = REMINDER_FAILED, str(e)
 
-            with app.app_context():
-                user = User.query.get(user_id)
-                if user:
-                    send_reminder(user, meal_type, app, reminder_id)
-                    logger.info(f"Reminder {reminder_id} sent to user {user_id}")
-                    log_job_execution(job_id, 'completed')
-                    return
-                else:
-                    raise Exception(f"Problem with the reminder job")
-        except Exception as e:
-            
-            error_msg = f"Attempt {attempt + 1}/{max_retries} failed: {str(e)}"
-            logger.error(f"Error in execute_reminder for user {user_id}, reminder {reminder_id}: {error_msg}")
-            
-            if attempt < max_retries - 1: 
-                logger.info(f"Retrying reminder {reminder_id} in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-            else: 
-                log_job_execution(job_id, 'failed', str(e))
+    if status != REMINDER_FAILED:
+        logger.info(f"Reminder {reminder_id} for user {user_id}: {status}")
+        finish_job_run(run, 'completed')
+        return
+
+    logger.error(f"Error in execute_reminder for user {user_id}, reminder {reminder_id} "
+                 f"(attempt {attempt}/{REMINDER_RETRY_ATTEMPTS}): {error_msg}")
+    if schedule_reminder_retry(user_id, meal_type, reminder_id, decision, attempt + 1, deadline, slot):
+        finish_job_run(run, 'retrying', error_msg)
+    else:
+        finish_job_run(run, 'failed', error_msg)
+
+
+@reminder_activity.track
+def dispatch_reminder_slot(hour, minute):
+    """
+    Sends all the reminders of a time slot. This function is called by the scheduler, once per slot.
+
+    The due reminders and their users are loaded in a single query, and the eligibility of all the
+    users is evaluated at once (see `src.services.reminder_eligibility`). Reminders are then started at
+    most `REMINDER_DISPATCH_RATE` per second (with bursts of `REMINDER_DISPATCH_BURST`) and executed
+    by at most `REMINDER_DISPATCH_WORKERS` threads; the dispatcher waits for a free worker before
+    starting the next reminder, so pending reminders are never queued in memory.
+
+    Args:
+        hour (int): The hour of the slot.
+        minute (int): The minute of the slot.
+
+    Returns:
+        int: The number of reminders dispatched.
+    """
+    job_id = slot_job_id(hour, minute)
+    run = start_job_run(job_id)
+    start = time.perf_counter()
+
+    try:
+        due_reminders = get_slot_reminders(hour, minute, REMINDER_STUDY_GROUPS)
+        logger.info(f"Dispatching {len(due_reminders)} reminders for slot {hour:02d}:{minute:02d}")
+        decisions = evaluate_slot_decisions(due_reminders, get_current_slot_datetime(hour, minute))
+
+        rate_limiter = TokenBucket(REMINDER_DISPATCH_RATE, REMINDER_DISPATCH_BURST)
+        free_workers = threading.BoundedSemaphore(REMINDER_DISPATCH_WORKERS)
+
+        with DispatchPool(max_workers=REMINDER_DISPATCH_WORKERS, thread_name_prefix=job_id) as pool:
+            for reminder_id, meal_type, user in due_reminders:
+                free_workers.acquire()
+                rate_limiter.acquire()
+                future = pool.submit(execute_reminder, user.id, meal_type, reminder_id, user, decisions.get(user.id),
+                                     slot=f"{hour:02d}:{minute:02d}")
+                future.add_done_callback(lambda _: free_workers.release())
+
+        logger.info(f"Slot {hour:02d}:{minute:02d}: {len(due_reminders)} reminders dispatched "
+                    f"in {time.perf_counter() - start:.1f} s")
+        finish_job_run(run, 'completed')
+        return len(due_reminders)
+    except Exception as e:
+        logger.error(f"Error dispatching reminder slot {hour:02d}:{minute:02d}: {str(e)}")
+        finish_job_run(run, 'failed', str(e))
+        return 0
+
+
+@reminder_activity.track
+def pregenerate_reminder_slot(hour, minute):
+    """
+    Prepares the personalised reminders of the next occurrence of a time slot. This function is called
+    by the scheduler `REMINDER_PREGENERATION_LEAD_MINUTES` before the slot.
+
+    The users of the slot are evaluated at once, then the reminders are generated in parallel, so that
+    the dispatch job only has to send the prepared texts at slot time.
+
+    Returns:
+        int: The number of reminders prepared.
+    """
+    job_id = pregen_job_id(hour, minute)
+    run = start_job_run(job_id)
+    start = time.perf_counter()
+
+    try:
+        app = app_handle.app
+        if not app:
+            raise Exception("No application bound to the scheduler")
+
+        slot_datetime = get_next_slot_datetime(hour, minute)
+        valid_until = slot_datetime + timedelta(minutes=REMINDER_PREGENERATION_VALIDITY_MINUTES)
+        slot_reminders = get_slot_reminders(hour, minute, REMINDER_PREGENERATION_STUDY_GROUPS)
+        decisions = evaluate_slot_decisions(slot_reminders, slot_datetime)
+
+        with DispatchPool(max_workers=REMINDER_PREGENERATION_WORKERS, thread_name_prefix=job_id) as pool:
+            prepared = sum(pool.map(
+                lambda slot_reminder: pregenerate_reminder(slot_reminder[2], slot_reminder[1], app, slot_reminder[0],
+                                                           slot_datetime, valid_until,
+                                                           decisions.get(slot_reminder[2].id)),
+                slot_reminders
+            ))
+
+        logger.info(f"Slot {hour:02d}:{minute:02d}: {prepared}/{len(slot_reminders)} reminders prepared "
+                    f"in {time.perf_counter() - start:.1f} s")
+        finish_job_run(run, 'completed')
+        return prepared
+    except Exception as e:
+        logger.error(f"Error preparing reminder slot {hour:02d}:{minute:02d}: {str(e)}")
+        finish_job_run(run, 'failed', str(e))
+        return 0
+
+
+def schedule_reminder_slot(hour, minute):
+    """
+    Schedule the daily jobs preparing and dispatching the reminders of a time slot (if not already scheduled)
+
+    Returns:
+        int: The number of jobs added.
+    """
+    pregen_time = (datetime.combine(clock.today(timezone), time_of_day(hour, minute))
+                   - timedelta(minutes=REMINDER_PREGENERATION_LEAD_MINUTES))
+    added = add_or_keep_job(pregenerate_reminder_slot,
+                            CronTrigger(hour=pregen_time.hour, minute=pregen_time.minute, timezone=timezone),
+                            pregen_job_id(hour, minute), args=[hour, minute])
+    added += add_or_keep_job(dispatch_reminder_slot, CronTrigger(hour=hour, minute=minute, timezone=timezone),
+                             slot_job_id(hour, minute), args=[hour, minute])
+    if added:
+        logger.debug(f"Scheduled reminder slot {hour:02d}:{minute:02d}")
+    return added
+
+
+def unschedule_reminder_slot(hour, minute):
+    """Remove the jobs preparing and dispatching the reminders of a time slot"""
+    unschedule_job(pregen_job_id(hour, minute))
+    return unschedule_job(slot_job_id(hour, minute))
+
+
+def reconcile_reminder_slots():
+    """
+    Aligns the persisted reminder jobs with the reminders table: only the slots that appeared are
+    added and only the jobs of slots without reminders left (or of the former one-job-per-reminder
+    scheduling) are removed.
+
+    Returns:
+        tuple: The number of added and removed jobs.
+    """
+    slot_index.rebuild(get_scheduled_reminder_times(REMINDER_STUDY_GROUPS))
+    desired_jobs = {job_id: slot for slot in slot_index.slots()
+                    for job_id in (pregen_job_id(*slot), slot_job_id(*slot))}
+    existing_jobs = {job.id for job in scheduler.get_jobs() if job.id.startswith(REMINDER_JOB_PREFIX)}
+
+    outdated_jobs = existing_jobs - desired_jobs.keys()
+    for job_id in outdated_jobs:
+        scheduler.remove_job(job_id)
+
+    added = 0
+    for slot in sorted({desired_jobs[job_id] for job_id in desired_jobs.keys() - existing_jobs}):
+        added += schedule_reminder_slot(*slot)
+
+    logger.info(f"Reminder slots reconciled: {len(slot_index.slots())} slots, {added} jobs added, "
+                f"{len(outdated_jobs)} removed")
+    return added, len(outdated_jobs)
+
+
+def reconcile_reminder_slots_job():
+    """Periodically re-aligns the reminder slots, picking up the reminders edited by the other processes"""
+    try:
+        with app_handle.job_context():
+            reconcile_reminder_slots()
+    except Exception as e:
+        logger.error(f"Error in reconcile_reminder_slots_job: {str(e)}")
+
+
+def schedule_slot_reconciliation():
+    """Schedule the periodic reconciliation of the reminder slots"""
+    add_or_keep_job(reconcile_reminder_slots_job, IntervalTrigger(minutes=SCHEDULER_SLOT_RECONCILE_MINUTES),
+                    'slot_reconciliation')
 
 
 def schedule_reminders(app):
-    """Schedule all reminders for users in study groups 1 and 3"""
+    """Schedule one dispatch job per distinct reminder time of the users in study groups 1 and 3"""
     logger.info("Scheduling reminders for all users...")
     
     with app.app_context():
         try:
-            all_users = User.query.filter(User.study_group.in_([1, 3])).all()
-            thread_pool_size = 20
-            stagger_interval = 10
-            job_count = 0
-            
-            for user in all_users:
-                for reminder in user.reminders:
-                    logger.debug(f"Scheduling Reminder:{reminder.id} for User:{user.id}")
-                    batch_number = job_count // thread_pool_size
-                    stagger_seconds = batch_number * stagger_interval
-
-                    #we handle minute overflowing 
-                    stagger_minute_offset = stagger_seconds // 60
-                    stagger_seconds = stagger_seconds % 60
-                    
-                    # job schedulinggggg
-                    scheduler.add_job(
-                        func=execute_reminder,
-                        args=[user.id, reminder.meal_type, reminder.id],
-                        trigger='cron',
-                        hour=reminder.time.hour,
-                        minute=reminder.time.minute + stagger_minute_offset,
-                        second=stagger_seconds,
-                        replace_existing=True,
-                        timezone=timezone,
-                        id=f'reminder_{reminder.id}'
-                    )
-                    job_count +=1
+            reconcile_reminder_slots()
         except Exception as e:
             logger.error(f"Error scheduling reminders: {str(e)}")
 
@@ -233,69 +522,36 @@ def unschedule_job(job_id):
         return f"Failed to remove the job: {str(e)}", 400
 
 
-def get_reminder_stagger_offset(reminder_time, reminder_id):
-    """Calculate stagger offset for a reminder based on existing reminders at the same time"""
-    try:
-
-        all_users = User.query.filter(User.study_group.in_([1, 3])).all()
-        
-        same_time_reminders = []
-        for user in all_users:
-            for r in user.reminders:
-                if (r.time.hour == reminder_time.hour and 
-                    r.time.minute == reminder_time.minute):
-                    same_time_reminders.append(r.id)
-        
-        # find where the current reminder stands
-        same_time_reminders.sort()
-        if reminder_id in same_time_reminders:
-            job_position = same_time_reminders.index(reminder_id)
-        else:
-            job_position = len(same_time_reminders)  
-        
-        # we compute the staggering
-        thread_pool_size = 20
-        stagger_interval = 5
-        batch_number = job_position // thread_pool_size
-        stagger_seconds = batch_number * stagger_interval
-        
-        # minute overflow if needed
-        stagger_minute_offset = stagger_seconds // 60
-        stagger_seconds = stagger_seconds % 60
-        
-        return stagger_minute_offset, stagger_seconds
-        
-    except Exception as e:
-        logger.error(f"Error calculating stagger offset: {str(e)}")
-        return 0, 0 
-
-
-def schedule_reminder(user_id, reminder_id, _meal_type, app):
-    """Schedule or reschedule a specific reminder with dynamic staggering"""
+def schedule_reminder(user_id, reminder_id, meal_type, app):
+    """
+    Index a specific reminder (by ID, or by meal type when no ID is given) in its slot, and schedule
+    the slot if it was empty. Moving a reminder to another time also unschedules its previous slot
+    if no reminder is left in it. On a follower process, the reminder is left to the leader, which
+    picks it up at its next slot reconciliation.
+    """
     try:
         with app.app_context():
-            user = User.query.get(user_id)
-            reminder = next((r for r in user.reminders if r.id == reminder_id), None)
-
-            if user and reminder:
-                logger.debug(f"Scheduling Reminder:{reminder.id} for User:{user.id}")
-
-
-                stagger_minute_offset, stagger_seconds = get_reminder_stagger_offset(
-                    reminder.time, reminder.id
-                )
-
-                scheduler.add_job(
-                    func=execute_reminder,
-                    args=[user.id, reminder.meal_type, reminder.id],
-                    trigger='cron',
-                    hour=reminder.time.hour,
-                    minute=reminder.time.minute + stagger_minute_offset,
-                    second=stagger_seconds,
-                    replace_existing=True,
-                    timezone=timezone,
-                    id=f'reminder_{reminder.id}'
-                )
+            query = (
+                Reminder.query
+                .join(User, User.id == Reminder.user_id)
+                .filter(Reminder.user_id == user_id, User.study_group.in_(REMINDER_STUDY_GROUPS))
+            )
+            if reminder_id:
+                query = query.filter(Reminder.id == reminder_id)
+            else:
+                query = query.filter(Reminder.meal_type == meal_type)
+            reminder = query.first()
+
+            if reminder and not scheduler.running:
+                logger.debug(f"Reminder:{reminder.id} of User:{user_id} left to the scheduler leader")
+                return 200
+            if reminder:
+                logger.debug(f"Scheduling the slot of Reminder:{reminder.id} for User:{user_id}")
+                newly_occupied, emptied_slot = slot_index.add(reminder.id, reminder.time.hour, reminder.time.minute)
+                if newly_occupied:
+                    schedule_reminder_slot(reminder.time.hour, reminder.time.minute)
+                if emptied_slot:
+                    unschedule_reminder_slot(*emptied_slot)
                 return 200
             else:
                 logger.error(f"Failed to schedule reminder: User {user_id} or reminder {reminder_id} not found")
@@ -305,27 +561,111 @@ def schedule_reminder(user_id, reminder_id, _meal_type, app):
         return 400
 
 
+def unschedule_reminder(reminder_id):
+    """Remove a reminder from its slot, unscheduling the slot if no reminder is left in it"""
+    if not scheduler.running:
+        return "Reminder left to the scheduler leader", 200
+    emptied_slot = slot_index.remove(reminder_id)
+    if emptied_slot:
+        return unschedule_reminder_slot(*emptied_slot)
+    return "Reminder unscheduled", 200
+
+
+def get_job_store_url():
+    """Returns the URL of the SQLite file persisting the scheduled jobs (next to the app database)."""
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+    return 'sqlite:///' + os.path.join(project_root, DATA_FOLDER_NAME, SCHEDULER_JOBS_DATABASE_FILENAME)
+
+
+def get_scheduler_lock_path():
+    """Returns the path of the file whose lock designates the process running the scheduler."""
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+    return os.path.join(project_root, DATA_FOLDER_NAME, SCHEDULER_LOCK_FILENAME)
+
+
+def on_job_missed(event):
+    """Records the runs missed (e.g. during a downtime) beyond the misfire grace time"""
+    logger.warning(f"⚠️ Job {event.job_id} missed its run scheduled at {event.scheduled_run_time}")
+    log_job_event(event.job_id, 'missed', f"Run scheduled at {event.scheduled_run_time} was missed")
+
+
 def start_scheduler(app):
-    """Initialize and start the scheduler"""
+    """
+    Initialize and start the scheduler.
+
+    Raises:
+        Exception: Any error preventing the start, after the scheduler was shut down (so that the leader
+                   election releases the leadership).
+    """
     try:
+        app_handle.bind(app)
+        start = time.perf_counter()
+        job_history.load()
+        atexit.register(job_history.stop)
+        job_store_url = app.config.get('SCHEDULER_JOBSTORE_URL') or get_job_store_url()
+        scheduler.add_jobstore(SQLAlchemyJobStore(url=job_store_url), 'default')
+        scheduler.add_listener(on_job_missed, EVENT_JOB_MISSED)
+
+        # The persisted jobs are loaded paused, so that no job runs before being reconciled
+        scheduler.start(paused=True)
+        atexit.register(stop_scheduler)
+
         with app.app_context():
-            schedule_reminders(app)
+            reconcile_reminder_slots()
             schedule_fetch_meal_data()
             schedule_recent_sync_jobs()
-            
+            schedule_database_maintenance()
+            schedule_slot_reconciliation()
+
         jobs_scheduled = scheduler.get_jobs()
         for job in jobs_scheduled:
-            if hasattr(job.trigger, 'fields'):
-                hour_field = job.trigger.fields[2]
-                logger.info(f"Job ID: {job.id}, Hour: {hour_field}")
-            else:
-                logger.info(f"Job ID: {job.id}, Trigger: {job.trigger}")
-                
-        scheduler.start()
-        logger.info("Scheduler started successfully")
-        atexit.register(stop_scheduler)
+            logger.info(f"Job ID: {job.id}, Trigger: {job.trigger}, Next run: {job.next_run_time}")
+
+        scheduler.resume()
+        logger.info(f"Scheduler started successfully with {len(jobs_scheduled)} jobs "
+                    f"in {time.perf_counter() - start:.2f} s")
     except Exception as e:
         logger.error(f"Error starting scheduler: {str(e)}")
+        _abort_scheduler_start()
+        raise
+
+
+def _abort_scheduler_start():
+    """Shuts down a scheduler whose start failed (left paused otherwise), so that it can be started again"""
+    try:
+        if scheduler.running:
+            scheduler.shutdown(wait=False)
+        scheduler.remove_listener(on_job_missed)
+        scheduler.remove_jobstore('default')
+    except KeyError:
+        pass  # The job store was not added yet
+    except Exception as e:
+        logger.error(f"Error shutting down the scheduler after a failed start: {str(e)}")
+
+
+def start_scheduler_on_leader(app):
+    """
+    Starts the scheduler only if this process is elected as the leader (see `SchedulerLeaderElection`).
+    The other processes keep serving requests and take over if the leader dies.
+
+    Returns:
+        bool: Whether this process runs the scheduler.
+    """
+    global leader_election
+    if leader_election is None:
+        def start_in_context():
+            with app.app_context():
+                start_scheduler(app)
+
+        lock_path = app.config.get('SCHEDULER_LOCK_PATH') or get_scheduler_lock_path()
+        leader_election = SchedulerLeaderElection(lock_path, start_in_context,
+                                                  SCHEDULER_LEADER_RETRY_SECONDS)
+        atexit.register(leader_election.stop)
+
+    elected = leader_election.start()
+    if not elected:
+        logger.info(f"Process {os.getpid()} is a scheduler follower (leader: {leader_election.read_heartbeat()})")
+    return elected
 
 
 def get_all_running_jobs():
@@ -333,50 +673,54 @@ def get_all_running_jobs():
     return scheduler.get_jobs()
 
 def get_job_execution_report():
-    """Get a report of job execution status"""
+    """
+    Get a report of job execution status: the last status of each job, along with the statistics of
+    the most recent runs (durations and failure rates per job type and per reminder slot)
+    """
+    if not scheduler.running:
+        # The jobs run in the leader process: its runs are read from the persisted history, when it changed
+        job_history.refresh()
+    latest_statuses = job_history.latest_statuses()
+    status_counts = Counter(log_entry['status'] for log_entry in latest_statuses.values())
     report = {
-        'total_jobs': len(job_execution_log),
-        'completed': 0,
-        'failed': 0,
-        'started_but_not_completed': 0,
-        'details': []
+        'total_jobs': len(latest_statuses),
+        'completed': status_counts['completed'],
+        'failed': status_counts['failed'],
+        'started_but_not_completed': status_counts['started'],
+        'missed': status_counts['missed'],
+        'retrying': status_counts['retrying'],
+        'stale': status_counts['stale'],
+        'deferred': status_counts['deferred'],
+        'details': [
+            {
+                'job_id': job_id,
+                'timestamp': log_entry['timestamp'],
+                'status': log_entry['status'],
+                'error': log_entry.get('error')
+            }
+            for job_id, log_entry in latest_statuses.items()
+        ],
+        'statistics': job_history.summary(),
     }
-    
-    for job_id, log_entry in job_execution_log.items():
-        if log_entry['status'] == 'completed':
-            report['completed'] += 1
-        elif log_entry['status'] == 'failed':
-            report['failed'] += 1
-        elif log_entry['status'] == 'started':
-            report['started_but_not_completed'] += 1
-            
-        report['details'].append({
-            'job_id': job_id,
-            'timestamp': log_entry['timestamp'],
-            'status': log_entry['status'],
-            'error': log_entry.get('error')
-        })
-    
+
+    try:
+        report['database'] = get_database_stats()
+    except Exception as e:
+        logger.error(f"Could not retrieve the database statistics: {e}")
+        report['database'] = None
+
+    report['app_context'] = app_handle.overhead_stats()
+    report['sync_pauses'] = reminder_activity.stats()
+    report['leader'] = leader_election.status() if leader_election else None
+
     logger.info(f"Job execution report: {report['completed']} completed, {report['failed']} failed, {report['started_but_not_completed']} incomplete")
     return report
 
-def clear_old_job_logs(hours_old=24):
-    """Clear job execution logs older than specified hours"""
-    cutoff_time = datetime.now(timezone) - timedelta(hours=hours_old)
-    jobs_to_remove = []
-    
-    for job_id, log_entry in job_execution_log.items():
-        if log_entry['timestamp'] < cutoff_time:
-            jobs_to_remove.append(job_id)
-    
-    for job_id in jobs_to_remove:
-        del job_execution_log[job_id]
-    
-    logger.info(f"Cleared {len(jobs_to_remove)} old job logs")
-
 
 def stop_scheduler():
     """Stop the scheduler"""
+    if not scheduler.running:
+        return
     try:
         scheduler.shutdown()
         logger.info("Scheduler stopped")
@@ -0,0 +1,102 @@
+import threading
+from bisect import bisect_left, insort
+
+
+class SlotOccupancyIndex:
+    """
+    In-memory index of the reminders scheduled in each time slot.
+
+    Maps each slot (hour, minute) to the sorted list of the IDs of its reminders, and each reminder to
+    its slot, so that adding, moving or removing a reminder tells whether its slot just became occupied
+    (its dispatch job must be scheduled) or empty (its job can be removed), without querying the database.
+
+    Finding a reminder's slot is O(1) and its rank in the slot O(log k), k being the number of reminders
+    of the slot. Inserting into or deleting from the sorted list shifts its tail, which is O(k): a single
+    memory move, cheap for the few hundred reminders a slot holds at most.
+    """
+
+    def __init__(self):
+        self._slots = {}
+        self._reminder_slots = {}
+        self._lock = threading.RLock()
+
+    def rebuild(self, entries):
+        """
+        Replaces the content of the index.
+
+        Args:
+            entries: Iterable of (reminder ID, hour, minute) tuples.
+        """
+        slots = {}
+        reminder_slots = {}
+        for reminder_id, hour, minute in entries:
+            slots.setdefault((hour, minute), []).append(reminder_id)
+            reminder_slots[reminder_id] = (hour, minute)
+        for reminder_ids in slots.values():
+            reminder_ids.sort()
+        with self._lock:
+            self._slots = slots
+            self._reminder_slots = reminder_slots
+
+    def add(self, reminder_id, hour, minute):
+        """
+        Adds a reminder to a slot, moving it out of its previous slot if it had one.
+
+        Returns:
+            tuple: (whether the slot was empty before, the previous slot if it is now empty, or None)
+        """
+        slot = (hour, minute)
+        with self._lock:
+            emptied_slot = None
+            previous_slot = self._reminder_slots.get(reminder_id)
+            if previous_slot == slot:
+                return False, None
+            if previous_slot is not None:
+                emptied_slot = self.remove(reminder_id)
+
+            reminder_ids = self._slots.setdefault(slot, [])
+            newly_occupied = not reminder_ids
+            insort(reminder_ids, reminder_id)
+            self._reminder_slots[reminder_id] = slot
+            return newly_occupied, emptied_slot
+
+    def remove(self, reminder_id):
+        """
+        Removes a reminder from the index.
+
+        Returns:
+            tuple: The slot of the reminder if it is now empty, None otherwise.
+        """
+        with self._lock:
+            slot = self._reminder_slots.pop(reminder_id, None)
+            if slot is None:
+                return None
+            reminder_ids = self._slots[slot]
+            del reminder_ids[bisect_left(reminder_ids, reminder_id)]
+            if reminder_ids:
+                return None
+            del self._slots[slot]
+            return slot
+
+    def slot_of(self, reminder_id):
+        """Returns the slot (hour, minute) of a reminder, or None if it is not indexed."""
+        with self._lock:
+            return self._reminder_slots.get(reminder_id)
+
+    def position(self, reminder_id):
+        """Returns the rank of a reminder within its slot (i.e its dispatch order), or None if it is not indexed."""
+        with self._lock:
+            slot = self._reminder_slots.get(reminder_id)
+            if slot is None:
+                return None
+            return bisect_left(self._slots[slot], reminder_id)
+
+    def occupancy(self, hour, minute):
+        """Returns the number of reminders in a slot."""
+        with self._lock:
+            return len(self._slots.get((hour, minute), ()))
+
+    def slots(self):
+        """Returns the set of occupied slots."""
+        with self._lock:
+            return set(self._slots)
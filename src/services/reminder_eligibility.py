@@ -0,0 +1,148 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.config.logging_config import Logger
+from src.constants import REMINDER_COINFLIP_SEED
+from src.data_manager.engagement import count_missed_reminder_slots, get_engagement_states
+
+logger = Logger('myfoodrepo.services.reminder_eligibility').get_logger()
+
+DAY_SECONDS = 24 * 3600
+MAX_CONSECUTIVE_SKIPS = 5
+
+
+def _timestamps(values):
+    """Converts datetimes to POSIX timestamps (NaN when missing), naive datetimes being read as local time."""
+    return np.array([value.timestamp() if value is not None else np.nan for value in values], dtype=float)
+
+
+def _to_timedelta(seconds):
+    """Converts elapsed seconds back to a `timedelta` (`timedelta.max` when unknown)."""
+    return datetime.timedelta.max if np.isnan(seconds) else datetime.timedelta(seconds=float(seconds))
+
+
+def slot_key(slot_datetime):
+    """Returns the integer identifying a slot occurrence in the coinflip seeds (e.g 202504011900)."""
+    return int(slot_datetime.strftime('%Y%m%d%H%M'))
+
+
+def draw_coinflips(user_ids, slot_datetime, seed=REMINDER_COINFLIP_SEED):
+    """
+    Draws the reminder coinflip of each user for a slot occurrence.
+
+    Each draw comes from a generator seeded with (`seed`, slot, user ID), so a user's draw can be
+    reproduced on its own and does not depend on the other users evaluated with them.
+
+    Args:
+        user_ids (list): The IDs of the users.
+        slot_datetime (datetime): The datetime of the slot occurrence.
+        seed (int): The study's coinflip seed.
+
+    Returns:
+        np.ndarray: True for the users whose reminder is skipped by the coinflip (if eligible to it).
+    """
+    key = slot_key(slot_datetime)
+    return np.array([np.random.default_rng([seed, key, int(user_id)]).integers(0, 2) == 0
+                     for user_id in user_ids], dtype=bool)
+
+
+def evaluate_slot(users, slot_datetime, reminder_study_groups, states=None, seed=REMINDER_COINFLIP_SEED):
+    """
+    Decides, for all the users of a slot at once, who receives a reminder, with or without a warning,
+    and who is skipped.
+
+    Applies the same rules as `evaluate_reminder` (see `src.communication.reminder_manager`), on arrays:
+        - warning: the user never logged a meal, or last logged between 1 and 2 days ago;
+        - coinflip: a reminder was already sent, less than 5 reminder occurrences elapsed since (the
+          current one included), no warning is due and the coinflip says skip;
+        - inactivity: the user withdrew, never logged a meal 4 days after their welcome message, or
+          did not log a meal for more than 2 days;
+        - study group: the user's study group does not receive reminders.
+
+    Args:
+        users (list): The users of the slot (`UserDTO`).
+        slot_datetime (datetime): The (aware) datetime at which the reminders are sent.
+        reminder_study_groups (iterable): The study groups receiving reminders.
+        states (dict, optional): The `EngagementStateDTO` of each user, read in one query if not given.
+        seed (int): The study's coinflip seed.
+
+    Returns:
+        pd.DataFrame: One row per user (indexed by user ID) with the elapsed times (in seconds), the
+                      `warning`, `never_logged` and `coinflip` flags and the `skip_reason` (None if sent).
+    """
+    users = list({user.id: user for user in users}.values())
+    user_ids = [user.id for user in users]
+    if states is None:
+        states = get_engagement_states(user_ids)
+    user_states = [states[user_id] for user_id in user_ids]
+
+    now = slot_datetime.timestamp()
+    last_log = _timestamps([state.last_meal_log_at for state in user_states])
+    last_reminder = _timestamps([state.last_reminder_at for state in user_states])
+    welcome = _timestamps([state.welcome_at for state in user_states])
+    missed_slots = np.array([count_missed_reminder_slots(state.last_reminder_at, slot_datetime)
+                             if state.last_reminder_at is not None else 0 for state in user_states], dtype=int)
+    withdrawn = np.array([user.withdrawal is True for user in users], dtype=bool)
+    not_withdrawn = np.array([user.withdrawal is False for user in users], dtype=bool)
+    valid_group = np.isin(np.array([user.study_group if user.study_group is not None else -1 for user in users]),
+                          list(reminder_study_groups))
+
+    time_since_log = now - last_log
+    time_since_reminder = now - last_reminder
+    time_since_welcome = now - welcome
+
+    never_logged = np.isnan(last_log)
+    with np.errstate(invalid='ignore'):
+        warning = never_logged | ((time_since_log > DAY_SECONDS) & (time_since_log < 2 * DAY_SECONDS))
+        # NaN comparisons are False: a user without welcome message is never "recently welcomed"
+        recently_welcomed = time_since_welcome < 4 * DAY_SECONDS
+        inactive = (time_since_log > 2 * DAY_SECONDS) | withdrawn
+    should_send = np.where(never_logged, not_withdrawn & recently_welcomed, ~inactive)
+
+    coinflip = draw_coinflips(user_ids, slot_datetime, seed)
+    skipped_by_coinflip = ~np.isnan(last_reminder) & (missed_slots < MAX_CONSECUTIVE_SKIPS) & coinflip & ~warning
+
+    skip_reason = np.select(
+        [skipped_by_coinflip, ~should_send, ~valid_group],
+        ["coinflip", "inactivity", "study group"],
+        default="",
+    )
+
+    slot = pd.DataFrame({
+        'time_since_log': np.where(never_logged, np.nan, time_since_log),
+        'time_since_reminder': time_since_reminder,
+        'warning': warning,
+        'never_logged': never_logged,
+        'coinflip': coinflip,
+        'skip_reason': np.where(skip_reason == "", None, skip_reason),
+    }, index=pd.Index(user_ids, name='user_id'))
+
+    counts = slot['skip_reason'].value_counts().to_dict()
+    sent = slot['skip_reason'].isna()
+    logger.info(f"Slot {slot_datetime:%Y-%m-%d %H:%M} evaluated for {len(slot)} users (seed {seed}, key "
+                f"{slot_key(slot_datetime)}): {int(sent.sum())} to send ({int((sent & slot['warning']).sum())} "
+                f"with warning), skipped: {counts}")
+    return slot
+
+
+def get_slot_decisions(slot):
+    """
+    Converts the result of `evaluate_slot` to the per-user decisions expected by the reminder senders.
+
+    Args:
+        slot (pd.DataFrame): The result of `evaluate_slot`.
+
+    Returns:
+        dict: For each user ID, a (skip reason, (time since last log, warning, time since last reminder,
+              never logged)) tuple, as returned by `evaluate_reminder`.
+    """
+    return {
+        int(row.Index): (
+            row.skip_reason,
+            (_to_timedelta(row.time_since_log), bool(row.warning),
+             _to_timedelta(row.time_since_reminder), bool(row.never_logged)),
+        )
+        for row in slot.itertuples()
+    }
@@ -0,0 +1,73 @@
+import threading
+import time
+
+from sqlalchemy import func, select
+
+from src.config.logging_config import Logger
+from src.constants import HOME_STATISTICS_CACHE_TTL
+from src.data_manager.message import flush_messages, get_study_start_date
+from src.data_manager.models import Meal, Message, Reminder, User
+from src.db_session import session_scope
+
+logger = Logger('myfoodrepo.services.statistics').get_logger()
+
+_statistics_cache = {'value': None, 'expires_at': 0.0}
+_statistics_lock = threading.Lock()
+
+
+def compute_home_statistics():
+    """
+    Computes the dashboard overview counts with `COUNT` / `MIN` queries, without loading any row.
+
+    Returns:
+        dict: The number of users, sent/received messages, reminders and meals, and the study start date.
+    """
+    flush_messages()
+    with session_scope() as session:
+        users_count, messages_count, reminders_count, meals_count = session.execute(
+            select(
+                select(func.count(User.id)).scalar_subquery(),
+                select(func.count(Message.id)).where(Message.twilio_message_id.isnot(None)).scalar_subquery(),
+                select(func.count(Reminder.id)).scalar_subquery(),
+                select(func.count(Meal.id)).scalar_subquery(),
+            )
+        ).one()
+
+    return {
+        'users_count': users_count,
+        'messages_count': messages_count,
+        'reminders_count': reminders_count,
+        'meals_count': meals_count,
+        'study_start_date': get_study_start_date(),
+    }
+
+
+def get_home_statistics(max_age=HOME_STATISTICS_CACHE_TTL):
+    """
+    Retrieves the dashboard overview statistics, served from a short-lived cache.
+
+    Args:
+        max_age (int): Number of seconds a computed result can be reused. 0 disables the cache.
+
+    Returns:
+        dict: See `compute_home_statistics`.
+    """
+    now = time.monotonic()
+    with _statistics_lock:
+        if max_age and _statistics_cache['value'] is not None and now < _statistics_cache['expires_at']:
+            return _statistics_cache['value']
+
+    statistics = compute_home_statistics()
+    logger.debug(f"🟢 Home statistics computed: {statistics}")
+
+    with _statistics_lock:
+        _statistics_cache['value'] = statistics
+        _statistics_cache['expires_at'] = now + max_age
+    return statistics
+
+
+def invalidate_home_statistics():
+    """Drops the cached dashboard statistics, so they are recomputed on the next request."""
+    with _statistics_lock:
+        _statistics_cache['value'] = None
+        _statistics_cache['expires_at'] = 0.0
@@ -0,0 +1,134 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from src.config.logging_config import Logger
+from src.constants import USER_CONTEXT_CACHE_SIZE
+from src.data_manager.context_snapshot import (clear_snapshot_state_cache, get_snapshot_content, get_snapshot_state,
+                                               store_snapshot)
+from src.data_manager.meal import get_recent_meals_string_for_user
+from src.data_manager.nutritional_profiling import calculate_eating_consistency, retrieve_nutritional_information
+from src.utils import clock
+
+logger = Logger('myfoodrepo.services.user_context').get_logger()
+
+
+@dataclass(frozen=True)
+class UserContext:
+    """The meal-derived context of a user, injected in both the reminder and the chat prompts."""
+    recent_meals: str
+    diet_information: list
+    consistency_metrics: dict
+
+
+_context_cache = OrderedDict()
+_context_lock = threading.Lock()
+
+
+def _to_json_value(value):
+    """Converts numpy scalars (as returned by the pandas computations) to plain Python values."""
+    if isinstance(value, dict):
+        return {key: _to_json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json_value(item) for item in value]
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def compute_user_context(user):
+    """
+    Computes the context of a user from their meals.
+
+    Args:
+        user: The user (`User` or `UserDTO`).
+
+    Returns:
+        UserContext: The recent meals, diet information and consistency metrics of the user.
+    """
+    return UserContext(
+        recent_meals=get_recent_meals_string_for_user(user.myfoodrepo_key),
+        diet_information=_to_json_value(retrieve_nutritional_information(user)),
+        consistency_metrics=_to_json_value(calculate_eating_consistency(user)),
+    )
+
+
+def _cache_get(key):
+    with _context_lock:
+        context = _context_cache.get(key)
+        if context is not None:
+            _context_cache.move_to_end(key)
+        return context
+
+
+def _cache_put(key, context):
+    with _context_lock:
+        # Older versions of the user's context can never be requested again
+        for stale_key in [cached for cached in _context_cache if cached[0] == key[0] and cached != key]:
+            del _context_cache[stale_key]
+        _context_cache[key] = context
+        _context_cache.move_to_end(key)
+        while len(_context_cache) > USER_CONTEXT_CACHE_SIZE:
+            _context_cache.popitem(last=False)
+
+
+def refresh_user_context(user, meals_version=None, today=None):
+    """
+    Recomputes and stores the context snapshot of a user.
+
+    Args:
+        user: The user (`User` or `UserDTO`).
+        meals_version (int, optional): The current meals version of the user, read if not given.
+        today (date, optional): The date the snapshot is computed on (today by default).
+
+    Returns:
+        UserContext: The recomputed context.
+    """
+    if meals_version is None:
+        meals_version = get_snapshot_state(user.id)[0]
+    today = today or clock.today()
+
+    context = compute_user_context(user)
+    store_snapshot(user.id, meals_version, today, context.recent_meals,
+                   context.diet_information, context.consistency_metrics)
+    _cache_put((user.id, meals_version, today), context)
+    logger.debug(f"Context snapshot of user {user.id} refreshed (meals version {meals_version})")
+    return context
+
+
+def get_user_context(user):
+    """
+    Retrieves the context of a user, only recomputing it when their meals changed or the day changed.
+
+    Contexts are looked up in memory first, then in the `user_context_snapshots` table, keyed on the
+    user's meals version (bumped on every meal insertion, update or removal) and the current date.
+
+    Args:
+        user: The user (`User` or `UserDTO`).
+
+    Returns:
+        UserContext: The recent meals, diet information and consistency metrics of the user.
+    """
+    meals_version, snapshot_version, computed_on = get_snapshot_state(user.id)
+    today = clock.today()
+    key = (user.id, meals_version, today)
+
+    context = _cache_get(key)
+    if context is not None:
+        return context
+
+    if snapshot_version == meals_version and computed_on == today:
+        content = get_snapshot_content(user.id)
+        if content is not None:
+            context = UserContext(*content)
+            _cache_put(key, context)
+            return context
+
+    return refresh_user_context(user, meals_version, today)
+
+
+def clear_user_context_cache():
+    """Empties the in-memory context cache (the stored snapshots are kept)."""
+    with _context_lock:
+        _context_cache.clear()
+    clear_snapshot_state_cache()
@@ -0,0 +1,46 @@
+"""
+Replays a study of the reminder pipeline against a virtual clock, e.g:
+
+    python -m src.simulation --users 1000 --days 28
+"""
+import argparse
+import json
+from datetime import datetime
+
+from .harness import SimulationConfig, run_simulation
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-warp simulation of the reminder pipeline")
+    parser.add_argument('--users', type=int, default=SimulationConfig.users)
+    parser.add_argument('--days', type=int, default=SimulationConfig.days)
+    parser.add_argument('--start', type=datetime.fromisoformat, default=SimulationConfig.start,
+                        help="Start of the study (local time, ISO format)")
+    parser.add_argument('--study-groups', type=int, nargs='+', default=list(SimulationConfig.study_groups))
+    parser.add_argument('--seed', type=int, default=SimulationConfig.seed)
+    parser.add_argument('--slot-jitter', type=int, default=SimulationConfig.slot_jitter_minutes,
+                        help="Spread of the reminder times, in minutes")
+    parser.add_argument('--llm-latency', type=float, default=SimulationConfig.llm_latency,
+                        help="Duration of each OpenAI call, in seconds")
+    parser.add_argument('--sms-latency', type=float, default=SimulationConfig.sms_latency,
+                        help="Duration of each Twilio call, in seconds")
+    parser.add_argument('--production-pacing', action='store_true',
+                        help="Keep the production dispatch and outbound rate limits")
+    parser.add_argument('--database', default=None, help="SQLite file to keep the simulated study in")
+    parser.add_argument('--output', default=None, help="JSON file to write the report to (printed otherwise)")
+    args = parser.parse_args()
+
+    report = run_simulation(SimulationConfig(
+        users=args.users, days=args.days, start=args.start, study_groups=tuple(args.study_groups), seed=args.seed,
+        slot_jitter_minutes=args.slot_jitter, llm_latency=args.llm_latency, sms_latency=args.sms_latency,
+        production_pacing=args.production_pacing, database_path=args.database,
+    ))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+    else:
+        print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from src.config.logging_config import Logger
+from src.constants import ASSISTANT_ROLE
+from src.data_manager.context_snapshot import bump_meals_version
+from src.data_manager.engagement import record_meal_log
+from src.data_manager.message import db_add_message, flush_messages
+from src.data_manager.models import Meal, Reminder, User
+from src.db_session import session_scope
+
+logger = Logger('myfoodrepo.simulation.cohort').get_logger()
+
+# Meal type, reminder time, and the window (start hour, duration in minutes) in which the meal is logged
+MEAL_TYPES = [
+    ("Breakfast", time(7, 0), (7, 120)),
+    ("Lunch", time(12, 0), (12, 90)),
+    ("Dinner", time(19, 0), (19, 120)),
+]
+SAMPLE_MEALS = [
+    ("Muesli, Yogurt", {'energy_kcal': 420, 'fat': 12, 'carbohydrates': 62, 'protein': 15, 'fiber': 7,
+                        'sugar': 18, 'salt': 0.3, 'water': 150}),
+    ("Pasta, Tomato sauce", {'energy_kcal': 650, 'fat': 14, 'carbohydrates': 105, 'protein': 22, 'fiber': 8,
+                             'sugar': 12, 'salt': 2.1, 'water': 300}),
+    ("Salad, Chicken", {'energy_kcal': 480, 'fat': 20, 'carbohydrates': 25, 'protein': 45, 'fiber': 6,
+                        'sugar': 6, 'salt': 1.5, 'water': 350}),
+    ("Rösti, Fried egg", {'energy_kcal': 700, 'fat': 38, 'carbohydrates': 62, 'protein': 24, 'fiber': 5,
+                          'sugar': 3, 'salt': 2.4, 'water': 200}),
+]
+LANGUAGES = ["en", "fr", "de"]
+
+
+@dataclass(frozen=True)
+class SyntheticUser:
+    """
+    A participant of the synthetic cohort.
+
+    Attributes:
+        id (int): The ID of the user in the simulation database.
+        adherence (float): Probability that the user logs each of their meals on a given day.
+        dropout_day (int): The study day from which the user stops logging meals (None if never).
+    """
+    id: int
+    adherence: float
+    dropout_day: int = None
+
+
+def create_cohort(users_count, study_groups, start, rng, slot_jitter_minutes=0):
+    """
+    Creates the users of a synthetic cohort, with their three daily reminders and a welcome message
+    at the start of the study.
+
+    Args:
+        users_count (int): Number of users.
+        study_groups (list): Study groups the users are assigned to, in turn.
+        start (datetime): The (naive, local) start of the study.
+        rng (np.random.Generator): Random generator of the simulation.
+        slot_jitter_minutes (int): Reminders are spread over this many minutes after their usual time
+                                   (0 keeps the three default slots).
+
+    Returns:
+        list: The `SyntheticUser` of the cohort.
+    """
+    cohort = []
+    with session_scope() as session:
+        for i in range(users_count):
+            user = User(f"+4170{i:07d}", f"sim-{i:07d}", gender=str(rng.choice(["male", "female"])),
+                        age=int(rng.integers(18, 70)), language=LANGUAGES[i % len(LANGUAGES)],
+                        diet_preference="omnivore", diet_goal="balanced",
+                        study_group=study_groups[i % len(study_groups)], withdrawal=False, study_ended=False)
+            session.add(user)
+            session.flush()
+            for meal_type, reminder_time, _ in MEAL_TYPES:
+                offset = int(rng.integers(0, slot_jitter_minutes + 1)) if slot_jitter_minutes else 0
+                session.add(Reminder(user.id, (datetime.combine(start.date(), reminder_time)
+                                               + timedelta(minutes=offset)).time(), meal_type))
+
+            dropout_day = int(rng.integers(3, 60)) if rng.random() < 0.2 else None
+            cohort.append(SyntheticUser(user.id, float(rng.uniform(0.3, 0.95)), dropout_day))
+
+    for synthetic_user in cohort:
+        db_add_message(synthetic_user.id, ASSISTANT_ROLE, "Welcome to the study!", f"SMwelcome{synthetic_user.id}",
+                       None)
+    flush_messages()
+    logger.info(f"Created a synthetic cohort of {users_count} users (study groups {study_groups})")
+    return cohort
+
+
+def draw_meal_logs(cohort, day_start, study_day, rng):
+    """
+    Draws the meals logged by the cohort on a given day.
+
+    Args:
+        cohort (list): The `SyntheticUser` of the cohort.
+        day_start (datetime): The (naive, local) midnight of the day.
+        study_day (int): The index of the day in the study.
+        rng (np.random.Generator): Random generator of the simulation.
+
+    Returns:
+        list: (datetime, user ID) tuples, sorted by datetime.
+    """
+    logs = []
+    for synthetic_user in cohort:
+        if synthetic_user.dropout_day is not None and study_day >= synthetic_user.dropout_day:
+            continue
+        for _, _, (start_hour, window_minutes) in MEAL_TYPES:
+            if rng.random() < synthetic_user.adherence:
+                logged_at = day_start + timedelta(hours=start_hour, minutes=float(rng.uniform(0, window_minutes)))
+                logs.append((logged_at.replace(microsecond=0), synthetic_user.id))
+    logs.sort()
+    return logs
+
+
+def log_meal(user_id, logged_at, rng):
+    """Stores a meal logged by a user, as the MyFoodRepo sync does (last log, engagement, meals version)."""
+    description, nutrients = SAMPLE_MEALS[int(rng.integers(len(SAMPLE_MEALS)))]
+    with session_scope() as session:
+        session.add(Meal(user_id=user_id, description=description, nutrients=nutrients,
+                         food_ids=[int(rng.integers(1, 5000))], eaten_quantities=[1.0], datetime=logged_at))
+        session.query(User).filter(User.id == user_id).update({User.last_meal_log: logged_at})
+        record_meal_log(session, user_id, logged_at)
+        bump_meals_version(session, user_id)
@@ -0,0 +1,309 @@
+import os
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.date import DateTrigger
+from flask import Flask
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.communication import reminder_manager, twilio_tool
+from src.communication.chat_history import conversation_summarizer
+from src.communication.messaging_service import FakeSMSService
+from src.communication.outbound_queue import OutboundMessageQueue
+from src.communication.twilio_tool import NewTwilioConversationManager
+from src.config.config import load_localizations
+from src.config.logging_config import Logger
+from src.constants import REMINDER_STUDY_GROUPS
+from src.data_manager.llm_usage import get_llm_usage_summary
+from src.data_manager.message import flush_messages
+from src.data_manager.models import db
+from src.db_session import init_db, remove_session
+from src.openai_client import OpenAIChatClient
+from src.query_profiler import query_profiler
+from src.scheduler import scheduler as scheduler_module
+from src.scheduler.job_history import get_job_slot, get_job_type
+from src.utils import clock
+from src.utils.write_buffer import stop_write_buffers
+
+from .cohort import create_cohort, draw_meal_logs, log_meal
+
+logger = Logger('myfoodrepo.simulation.harness').get_logger()
+
+ZURICH = pytz.timezone('Europe/Zurich')
+FAKE_REMINDERS = [
+    "Time to log your meal in MyFoodRepo! 🍽️",
+    "Don't forget to take a picture of your meal 📸",
+    "How was your meal? Log it in MyFoodRepo so we can keep track 🙂",
+]
+
+
+@dataclass
+class SimulationConfig:
+    """
+    Parameters of a simulated study.
+
+    Attributes:
+        users (int): Number of users of the synthetic cohort.
+        days (int): Number of simulated days.
+        start (datetime): The (naive, local) start of the study.
+        study_groups (tuple): Study groups the users are assigned to, in turn.
+        seed (int): Seed of the cohort and meal logs generation.
+        slot_jitter_minutes (int): Spread of the reminder times after 7:00, 12:00 and 19:00 (in minutes).
+        llm_latency (float): Duration, in seconds, of each (fake) OpenAI call.
+        sms_latency (float): Duration, in seconds, of each (fake) Twilio call.
+        production_pacing (bool): Whether to keep the production dispatch and outbound rate limits, which
+                                  are applied in real time (the replay is then much longer).
+        database_path (str): SQLite file of the simulation (a temporary file, removed at the end, if None).
+    """
+    users: int = 100
+    days: int = 28
+    start: datetime = datetime(2025, 4, 7)
+    study_groups: tuple = (0, 1, 2, 3)
+    seed: int = 1
+    slot_jitter_minutes: int = 0
+    llm_latency: float = 0.0
+    sms_latency: float = 0.0
+    production_pacing: bool = False
+    database_path: str = None
+
+
+def create_simulation_app(database_path):
+    """Creates a Flask application bound to the simulation database (the production one is never touched)."""
+    db_uri = 'sqlite:///' + database_path
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = db_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.extensions['localizations'] = load_localizations()
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    init_db(db_uri)
+    app.teardown_appcontext(remove_session)
+    return app
+
+
+def _override(stack, target, name, value):
+    """Replaces an attribute for the duration of the simulation."""
+    previous = getattr(target, name)
+    setattr(target, name, value)
+    stack.callback(setattr, target, name, previous)
+
+
+def _percentiles(values):
+    if not values:
+        return {'p50': None, 'p95': None, 'max': None}
+    values = np.array(values)
+    return {'p50': round(float(np.percentile(values, 50)), 4), 'p95': round(float(np.percentile(values, 95)), 4),
+            'max': round(float(values.max()), 4)}
+
+
+class ReminderSimulation:
+    """
+    Replays a study against a virtual clock: the reminder jobs registered by `schedule_reminders` are run
+    (synchronously) at their virtual fire time, along with their retries, while a synthetic cohort logs
+    meals. OpenAI and Twilio are replaced by fakes; everything else (eligibility, pre-generation, dispatch,
+    message and engagement storage) is the production code, on a separate database.
+
+    Attributes:
+        config (SimulationConfig): The parameters of the simulation.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.rng = np.random.default_rng(config.seed)
+        self.clock = clock.VirtualClock(config.start, ZURICH)
+        self.sms_service = FakeSMSService(sender_id="simulation", latency=config.sms_latency)
+        self.llm = FakeListChatModel(responses=FAKE_REMINDERS, sleep=config.llm_latency or None)
+        self._last_fired = {}
+        self._job_durations = defaultdict(list)
+        self._jobs_by_type = Counter()
+        self._slot_reminders = Counter()
+        self._slot_durations = defaultdict(list)
+        self._meal_logs = 0
+
+    def run(self):
+        """
+        Runs the simulation.
+
+        Returns:
+            dict: The simulation report (see `build_report`).
+        """
+        database_path = self.config.database_path
+        if database_path is None:
+            db_fd, database_path = tempfile.mkstemp(suffix=".db", prefix="simulation-")
+            os.close(db_fd)
+
+        with ExitStack() as stack:
+            if self.config.database_path is None:
+                stack.callback(os.remove, database_path)
+            self._install(stack, database_path)
+
+            wall_start = time.perf_counter()
+            self.cohort = create_cohort(self.config.users, list(self.config.study_groups), self.config.start,
+                                        self.rng, self.config.slot_jitter_minutes)
+            scheduler_module.schedule_reminders(self.app)
+            self._replay()
+            flush_messages()
+            scheduler_module.job_history.flush()
+            wall_seconds = time.perf_counter() - wall_start
+            return self.build_report(wall_seconds)
+
+    def _install(self, stack, database_path):
+        """Installs the virtual clock, the fakes and the simulation database (all restored at the end)."""
+        self.app = create_simulation_app(database_path)
+        stack.callback(self._dispose_database)
+        # The buffered rows are written before the simulation database is released
+        stack.callback(stop_write_buffers)
+        scheduler_module.job_history.reset()
+        stack.callback(scheduler_module.job_history.reset)
+
+        previous_clock = clock.set_clock(self.clock)
+        stack.callback(clock.set_clock, previous_clock)
+
+        scheduler = BackgroundScheduler(timezone=ZURICH)
+        scheduler.start(paused=True)
+        stack.callback(scheduler.shutdown, wait=False)
+        _override(stack, scheduler_module, 'scheduler', scheduler)
+        _override(stack, scheduler_module.app_handle, '_app', self.app)
+
+        _override(stack, reminder_manager, 'twilio_manager', NewTwilioConversationManager(self.sms_service))
+        _override(stack, reminder_manager, 'chat_client', OpenAIChatClient("simulation", llm=self.llm))
+        _override(stack, conversation_summarizer, 'llm', self.llm)
+        if not self.config.production_pacing:
+            unpaced_queue = OutboundMessageQueue(rate=1e9, burst=1e9, capacity=1e9)
+            stack.callback(unpaced_queue.stop)
+            _override(stack, twilio_tool, 'outbound_queue', unpaced_queue)
+            _override(stack, scheduler_module, 'REMINDER_DISPATCH_RATE', 1e9)
+            _override(stack, scheduler_module, 'REMINDER_DISPATCH_BURST', 1e9)
+
+        query_profiler.install()
+        query_profiler.reset()
+
+    def _dispose_database(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+    def _next_job(self, now):
+        """Returns the job firing next (at or after `now`), with its fire time."""
+        next_job, next_time = None, None
+        for job in scheduler_module.scheduler.get_jobs():
+            last_fired = self._last_fired.get(job.id)
+            fire_time = job.trigger.get_next_fire_time(
+                last_fired, max(now, last_fired + timedelta(seconds=1)) if last_fired else now)
+            if fire_time is not None and (next_time is None or fire_time < next_time):
+                next_job, next_time = job, fire_time
+        return next_job, next_time
+
+    def _run_job(self, job, fire_time):
+        self.clock.set(fire_time)
+        if isinstance(job.trigger, DateTrigger):
+            # One-shot jobs (retries) may be scheduled again with the same ID
+            scheduler_module.scheduler.remove_job(job.id)
+            self._last_fired.pop(job.id, None)
+        else:
+            self._last_fired[job.id] = fire_time
+
+        job_type = get_job_type(job.id)
+        start = time.perf_counter()
+        result = job.func(*job.args, **job.kwargs)
+        duration = time.perf_counter() - start
+        self._job_durations[job_type].append(duration)
+        self._jobs_by_type[job_type] += 1
+        if job_type == 'reminder_slot':
+            slot = get_job_slot(job.id)
+            self._slot_durations[slot].append(duration)
+            self._slot_reminders[slot] += result if isinstance(result, int) else 0
+
+    def _replay(self):
+        start = ZURICH.localize(self.config.start)
+        end = start + timedelta(days=self.config.days)
+        for study_day in range(self.config.days):
+            day_start = self.config.start + timedelta(days=study_day)
+            meal_logs = [(ZURICH.localize(logged_at), user_id)
+                         for logged_at, user_id in draw_meal_logs(self.cohort, day_start, study_day, self.rng)]
+            day_end = min(ZURICH.localize(day_start + timedelta(days=1)), end)
+            now = ZURICH.localize(day_start)
+
+            while True:
+                job, fire_time = self._next_job(now)
+                next_log = meal_logs[0][0] if meal_logs else None
+                if next_log is not None and (fire_time is None or next_log < fire_time) and next_log < day_end:
+                    logged_at, user_id = meal_logs.pop(0)
+                    self.clock.set(logged_at)
+                    log_meal(user_id, logged_at.replace(tzinfo=None), self.rng)
+                    self._meal_logs += 1
+                    now = logged_at
+                elif fire_time is not None and fire_time < day_end:
+                    self._run_job(job, fire_time)
+                    now = fire_time
+                else:
+                    break
+            logger.info(f"Simulated day {study_day + 1}/{self.config.days}")
+
+    def build_report(self, wall_seconds):
+        """
+        Builds the report of the simulation.
+
+        Returns:
+            dict: The configuration, the wall time and speed-up, the jobs run (total, per second and per
+                  type, with their durations), the reminder outcomes and throughput, the dispatch latency
+                  of each slot, the OpenAI calls, and the time spent in the database.
+        """
+        jobs_run = sum(self._jobs_by_type.values())
+        dispatch_seconds = sum(self._job_durations.get('reminder_slot', []))
+        sent = len(self.sms_service.sent_messages)
+        history = scheduler_module.job_history.summary()['job_types']
+        database = query_profiler.top(limit=5)
+
+        return {
+            'config': {key: (value.isoformat() if isinstance(value, datetime) else value)
+                       for key, value in asdict(self.config).items()},
+            'wall_seconds': round(wall_seconds, 2),
+            'speedup': round(self.config.days * 86400 / wall_seconds, 1) if wall_seconds else None,
+            'meal_logs': self._meal_logs,
+            'jobs': {
+                'run': jobs_run,
+                'per_second': round(jobs_run / wall_seconds, 2) if wall_seconds else None,
+                'by_type': {job_type: {'runs': count, 'duration_s': _percentiles(self._job_durations[job_type])}
+                            for job_type, count in self._jobs_by_type.items()},
+            },
+            'reminders': {
+                'sent': sent,
+                'outcomes': history.get('reminder', {}).get('outcomes', {}),
+                'reminder_study_groups': list(REMINDER_STUDY_GROUPS),
+                'throughput_per_second': round(sent / dispatch_seconds, 2) if dispatch_seconds else None,
+            },
+            'llm': get_llm_usage_summary(),
+            'slots': {
+                slot: {'reminders': count,
+                       'dispatch_s': _percentiles(self._slot_durations[slot])}
+                for slot, count in sorted(self._slot_reminders.items())
+            },
+            'database': {
+                'total_ms': database['total_ms'],
+                'share_of_wall_time': round(database['total_ms'] / 1000 / wall_seconds, 4) if wall_seconds else None,
+                'top_statements': [{key: statement[key] for key in ('fingerprint', 'calls', 'total_ms', 'avg_ms')}
+                                   for statement in database['statements']],
+            },
+        }
+
+
+def run_simulation(config=None, **kwargs):
+    """
+    Runs a simulated study (see `ReminderSimulation`).
+
+    Args:
+        config (SimulationConfig): The parameters of the simulation (built from `kwargs` if None).
+
+    Returns:
+        dict: The simulation report.
+    """
+    return ReminderSimulation(config or SimulationConfig(**kwargs)).run()
@@ -0,0 +1,80 @@
+"""
+Current time of the reminder pipeline. It is read from the system clock, unless a virtual clock is
+installed (see `src.simulation`), so that days of scheduling can be replayed in minutes.
+"""
+import threading
+from datetime import datetime, timedelta
+
+
+class SystemClock:
+    """The wall clock."""
+
+    def now(self, tz=None):
+        return datetime.now(tz)
+
+
+class VirtualClock:
+    """
+    A clock whose time only changes when it is set or advanced.
+
+    Attributes:
+        tz: The timezone of the clock (the naive datetimes returned are in this timezone).
+    """
+
+    def __init__(self, start, tz):
+        self.tz = tz
+        self._lock = threading.Lock()
+        self._now = start if start.tzinfo is not None else tz.localize(start)
+
+    def now(self, tz=None):
+        with self._lock:
+            current = self._now
+        if tz is None:
+            return current.astimezone(self.tz).replace(tzinfo=None)
+        return current.astimezone(tz)
+
+    def set(self, moment):
+        """Moves the clock to `moment` (an aware datetime, or a naive one in the clock's timezone)."""
+        moment = moment if moment.tzinfo is not None else self.tz.localize(moment)
+        with self._lock:
+            self._now = moment
+
+    def advance(self, delta):
+        """Moves the clock forward by `delta` (a `timedelta` or a number of seconds)."""
+        if not isinstance(delta, timedelta):
+            delta = timedelta(seconds=delta)
+        with self._lock:
+            self._now = self._now + delta
+
+
+_clock = SystemClock()
+_clock_lock = threading.Lock()
+
+
+def now(tz=None):
+    """Returns the current datetime (aware if `tz` is given, naive local time otherwise)."""
+    return _clock.now(tz)
+
+
+def today(tz=None):
+    """Returns the current date."""
+    return _clock.now(tz).date()
+
+
+def get_clock():
+    """Returns the clock in use."""
+    return _clock
+
+
+def set_clock(clock):
+    """
+    Installs a clock (None to restore the system clock).
+
+    Returns:
+        The clock previously in use.
+    """
+    global _clock
+    with _clock_lock:
+        previous = _clock
+        _clock = clock if clock is not None else SystemClock()
+    return previous
@@ -0,0 +1,120 @@
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(row_id, row_datetime=None):
+    """
+    Encodes the position of a row into an opaque, URL-safe cursor.
+
+    Args:
+        row_id (int): The ID of the row.
+        row_datetime (datetime, optional): The datetime of the row, when the listing is sorted by datetime.
+
+    Returns:
+        str: The encoded cursor.
+    """
+    raw = f"{row_datetime.isoformat() if row_datetime else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): The encoded cursor.
+
+    Returns:
+        tuple: (datetime or None, int) for a valid cursor, None otherwise.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        raw_datetime, raw_id = raw.rsplit('|', 1)
+        return (datetime.fromisoformat(raw_datetime) if raw_datetime else None), int(raw_id)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def _seek_condition(id_column, datetime_column, position, older):
+    """Builds the WHERE clause selecting the rows strictly after (older) or before (newer) a position."""
+    row_datetime, row_id = position
+    if datetime_column is None or row_datetime is None:
+        return id_column < row_id if older else id_column > row_id
+    if older:
+        return or_(datetime_column < row_datetime, and_(datetime_column == row_datetime, id_column < row_id))
+    return or_(datetime_column > row_datetime, and_(datetime_column == row_datetime, id_column > row_id))
+
+
+def keyset_paginate(query, id_column, datetime_column=None, after=None, before=None, per_page=50):
+    """
+    Retrieves one page of a query using keyset (seek) pagination, newest rows first.
+
+    Rows are ordered on (`datetime_column`, `id_column`) descending, or on `id_column` alone when
+    no datetime column is given, so each page costs the same whatever its position in the listing.
+
+    Args:
+        query: The SQLAlchemy query to paginate.
+        id_column: The primary key column, used as a tie-breaker.
+        datetime_column (optional): The datetime column the listing is sorted on.
+        after (str, optional): Cursor of the last row of the previous page (to move forward).
+        before (str, optional): Cursor of the first row of the next page (to move backward).
+        per_page (int): Number of rows per page.
+
+    Returns:
+        tuple: (list of rows, cursor to the next page or None, cursor to the previous page or None)
+    """
+    def cursor_of(row):
+        return encode_cursor(getattr(row, id_column.key),
+                             getattr(row, datetime_column.key) if datetime_column is not None else None)
+
+    sort_columns = [datetime_column, id_column] if datetime_column is not None else [id_column]
+    after_position = decode_cursor(after)
+    before_position = decode_cursor(before) if after_position is None else None
+
+    if before_position is not None:
+        rows = (
+            query.filter(_seek_condition(id_column, datetime_column, before_position, older=False))
+            .order_by(*[column.asc() for column in sort_columns])
+            .limit(per_page + 1)
+            .all()
+        )
+        has_previous = len(rows) > per_page
+        rows = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        if after_position is not None:
+            query = query.filter(_seek_condition(id_column, datetime_column, after_position, older=True))
+        rows = query.order_by(*[column.desc() for column in sort_columns]).limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_previous = after_position is not None
+
+    next_cursor = cursor_of(rows[-1]) if rows and has_next else None
+    previous_cursor = cursor_of(rows[0]) if rows and has_previous else None
+    return rows, next_cursor, previous_cursor
+
+
+def get_pagination_args(args, default_per_page, max_per_page):
+    """
+    Extracts the keyset pagination arguments from a request's query string.
+
+    Args:
+        args: The request arguments (e.g `request.args`).
+        default_per_page (int): Page size used when none (or an invalid one) is given.
+        max_per_page (int): Upper bound on the page size.
+
+    Returns:
+        dict: The `after`, `before` and `per_page` arguments.
+    """
+    per_page = args.get('per_page', default_per_page, type=int)
+    if not per_page or per_page < 1:
+        per_page = default_per_page
+    return {
+        'after': args.get('after'),
+        'before': args.get('before'),
+        'per_page': min(per_page, max_per_page),
+    }
@@ -0,0 +1,54 @@
+"""
+Token counting for the prompts, with the tokenizer of the OpenAI models (tiktoken). When tiktoken or its
+encoding is not available (e.g offline), the number of tokens is estimated from the length of the text.
+"""
+import threading
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+from src.config.logging_config import Logger
+from src.constants import CHARS_PER_TOKEN_ESTIMATE, GPT_4_O
+
+logger = Logger('myfoodrepo.utils.token_utils').get_logger()
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Loads the encoding of the reminder model once (None if it cannot be loaded)."""
+    global _encoding, _encoding_loaded
+    with _encoding_lock:
+        if not _encoding_loaded:
+            _encoding_loaded = True
+            if tiktoken is None:
+                logger.warning("⚠️ tiktoken is not installed: prompt tokens are estimated from their length")
+            else:
+                try:
+                    _encoding = tiktoken.encoding_for_model(GPT_4_O)
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not load the {GPT_4_O} tokenizer, prompt tokens are estimated "
+                                   f"from their length: {e}")
+        return _encoding
+
+
+def count_tokens(text):
+    """
+    Counts the tokens of a text.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The number of tokens (estimated if no tokenizer is available).
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN_ESTIMATE)
+    return len(encoding.encode(text, disallowed_special=()))
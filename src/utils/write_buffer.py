@@ -0,0 +1,106 @@
+import threading
+import weakref
+
+from src.config.logging_config import Logger
+
+logger = Logger('myfoodrepo.write_buffer').get_logger()
+
+# Every buffer created, so that they can all be flushed and stopped before their database goes away
+_buffers = weakref.WeakSet()
+
+
+class WriteBehindBuffer:
+    """
+    Buffers rows in memory and hands them over, in batches, to a writer running in a background thread.
+
+    Rows are written at the latest `flush_interval` seconds after being added, or as soon as `max_batch`
+    rows are pending. Each row is associated with a key (e.g. a user ID) so that readers can force the
+    pending rows of that key to be written before reading (flush-on-read). Rows are always written in
+    the order they were added, and a single flush runs at a time.
+
+    Attributes:
+        writer (callable): Function writing a list of rows (in a single transaction, ideally).
+        flush_interval (float): Maximum time, in seconds, a row stays in the buffer.
+        max_batch (int): Number of pending rows triggering an immediate flush.
+    """
+
+    def __init__(self, writer, flush_interval, max_batch, name="write-behind-buffer"):
+        self.writer = writer
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.name = name
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        _buffers.add(self)
+
+    def add(self, key, row):
+        """Adds a row to the buffer, starting the background flushing thread if needed."""
+        with self._pending_lock:
+            self._pending.append((key, row))
+            pending_count = len(self._pending)
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        if pending_count >= self.max_batch:
+            self._wakeup.set()
+
+    def has_pending(self, key=None):
+        """Whether rows (of `key`, if given) are waiting to be written."""
+        with self._pending_lock:
+            if key is None:
+                return bool(self._pending)
+            return any(pending_key == key for pending_key, _ in self._pending)
+
+    def flush(self, key=None):
+        """
+        Writes the pending rows.
+
+        Args:
+            key (optional): If given, nothing is done unless rows of this key are pending. All pending
+                            rows are written otherwise, to preserve the insertion order.
+
+        Returns:
+            int: The number of rows handed over to the writer.
+        """
+        if key is not None and not self.has_pending(key):
+            return 0
+
+        with self._flush_lock:
+            with self._pending_lock:
+                rows = [row for _, row in self._pending]
+                self._pending = []
+            if not rows:
+                return 0
+            try:
+                self.writer(rows)
+            except Exception as e:
+                logger.error(f"🛑 {self.name}: failed to write {len(rows)} buffered rows: {e}")
+            return len(rows)
+
+    def stop(self):
+        """Stops the background thread, after writing the remaining rows."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=max(self.flush_interval * 4, 5))
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+def stop_write_buffers():
+    """
+    Flushes and stops every write-behind buffer, e.g. when the application (or a test) releases its
+    database. A buffer used again afterwards restarts its background thread.
+    """
+    for buffer in list(_buffers):
+        buffer.stop()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src import db_session
+from src.data_manager.models import db
+from src.utils.write_buffer import stop_write_buffers
+
+
+@contextmanager
+def count_queries():
+    """
+    Records every SQL statement issued, on any engine, while the context is active.
+
+    Yields:
+        list: The list of executed SQL statements, filled as the statements are issued.
+    """
+    statements = []
+
+    def _record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", _record_statement)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", _record_statement)
+
+
+def assert_max_queries(testcase, max_queries, func, *args, **kwargs):
+    """
+    Calls `func` and fails `testcase` if it issued more than `max_queries` SQL statements.
+
+    Returns:
+        The value returned by `func`.
+    """
+    with count_queries() as statements:
+        result = func(*args, **kwargs)
+    testcase.assertLessEqual(
+        len(statements), max_queries,
+        f"{func.__name__} issued {len(statements)} queries (max {max_queries}):\n" + "\n".join(statements)
+    )
+    return result
+
+
+def create_test_app():
+    """
+    Creates a minimal Flask app bound to a fresh, file-based SQLite database.
+
+    Returns:
+        tuple: The Flask app and the path of the temporary database file.
+    """
+    db_fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(db_fd)
+    db_uri = 'sqlite:///' + db_path
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = db_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    db_session.init_db(db_uri)
+    return app, db_path
+
+
+def destroy_test_app(app, db_path):
+    """Writes the buffered rows, then drops the test database and removes its file."""
+    stop_write_buffers()
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+    if db_session.engine is not None:
+        db_session.engine.dispose()
+    os.remove(db_path)
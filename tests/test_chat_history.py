@@ -0,0 +1,71 @@
+import unittest
+from datetime import datetime, timedelta
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from src.communication.chat_history import ConversationSummarizer, DBChatMessageHistory
+from src.data_manager.conversation_summary import get_conversation_summary
+from src.data_manager.message import get_chat_history, store_system_prompt
+from src.data_manager.models import Message, User, db
+from tests.helpers import assert_max_queries, create_test_app, destroy_test_app
+
+
+class TestChatHistoryWindow(unittest.TestCase):
+
+    def setUp(self):
+        self.app, self.db_path = create_test_app()
+        with self.app.app_context():
+            user = User(phone_number="+41000000001", myfoodrepo_key="key-1", study_group=1)
+            db.session.add(user)
+            db.session.flush()
+            self.user_id = user.id
+            start = datetime(2025, 4, 1, 8)
+            for i in range(60):
+                db.session.add(Message(user.id, "user" if i % 2 else "assistant", f"Message number {i}", None))
+                db.session.flush()
+            prompt_hash = store_system_prompt(db.session, "You are a food diary assistant.")
+            db.session.add(Message(user.id, "system", None, None, system_prompt_hash=prompt_hash))
+            for i, message in enumerate(db.session.query(Message).order_by(Message.id)):
+                message.datetime = start + timedelta(minutes=i)
+            db.session.commit()
+
+    def tearDown(self):
+        destroy_test_app(self.app, self.db_path)
+
+    def test_history_is_loaded_once_and_windowed(self):
+        system_prompt, recent_messages, last_message = assert_max_queries(self, 4, get_chat_history, self.user_id, 20)
+        self.assertEqual(system_prompt, "You are a food diary assistant.")
+        self.assertEqual(last_message.role, "system")
+        self.assertEqual([message.text for message in recent_messages],
+                         [f"Message number {i}" for i in range(40, 60)])
+
+        history = DBChatMessageHistory(system_prompt, recent_messages, "The user wants more fiber.", token_budget=50)
+        messages = history.messages
+        self.assertIsInstance(messages[0], SystemMessage)
+        self.assertIn("The user wants more fiber.", messages[1].content)
+        # Only the most recent messages fitting in the budget are kept, in order
+        self.assertLess(len(history.window), 20)
+        self.assertEqual(history.window[-1].text, "Message number 59")
+        self.assertIsInstance(messages[-1], HumanMessage)
+        self.assertIsInstance(messages[-2], AIMessage)
+
+    def test_older_messages_are_folded_into_the_summary(self):
+        summarizer = ConversationSummarizer(llm=FakeListChatModel(responses=["Summary 1", "Summary 2"]),
+                                            min_new_messages=10, max_messages=30)
+        self.addCleanup(summarizer.stop)
+        _, recent_messages, _ = get_chat_history(self.user_id, 20)
+        window_start = recent_messages[0].id
+
+        self.assertTrue(summarizer.refresh(self.user_id, window_start))
+        summary, summarized_until_id, messages_count = get_conversation_summary(self.user_id)
+        self.assertEqual((summary, messages_count), ("Summary 1", 30))
+
+        # The 10 remaining older messages are folded in the next refresh, and only once
+        self.assertTrue(summarizer.refresh(self.user_id, window_start))
+        self.assertEqual(get_conversation_summary(self.user_id)[::2], ("Summary 2", 40))
+        self.assertFalse(summarizer.refresh(self.user_id, window_start))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from src.db_maintenance import backup_database, get_database_stats, optimize_database
+
+
+class TestDatabaseMaintenance(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database_path = os.path.join(self.directory.name, "test.db")
+        connection = sqlite3.connect(self.database_path)
+        connection.execute("CREATE TABLE messages (id INTEGER PRIMARY KEY, content TEXT)")
+        connection.executemany("INSERT INTO messages (content) VALUES (?)", [("x" * 500,) for _ in range(2000)])
+        connection.execute("DELETE FROM messages WHERE id > 1000")
+        connection.commit()
+        connection.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_backup_is_consistent_and_old_backups_are_pruned(self):
+        backup_directory = os.path.join(self.directory.name, "backups")
+        os.makedirs(backup_directory)
+        for day in ("01", "02"):
+            open(os.path.join(backup_directory, f"backup-202001{day}-000000.db"), "w").close()
+
+        result = backup_database(self.database_path, backup_directory, keep=2)
+
+        self.assertEqual(sorted(os.listdir(backup_directory)),
+                         ["backup-20200102-000000.db", os.path.basename(result['path'])])
+        connection = sqlite3.connect(result['path'])
+        self.assertEqual(connection.execute("SELECT COUNT(*) FROM messages").fetchone()[0], 1000)
+        connection.close()
+
+    def test_optimize_releases_free_pages(self):
+        self.assertGreater(get_database_stats(self.database_path)['freelist_count'], 0)
+        result = optimize_database(self.database_path)
+        stats = get_database_stats(self.database_path)
+
+        self.assertTrue(result['full_vacuum'])
+        self.assertEqual(stats['freelist_count'], 0)
+        self.assertEqual(stats['auto_vacuum'], 'incremental')
+        self.assertFalse(optimize_database(self.database_path)['full_vacuum'])
+
+
+if __name__ == "__main__":
+    unittest.main()
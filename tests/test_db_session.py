@@ -0,0 +1,73 @@
+import gc
+import tracemalloc
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src import db_session
+from src.data_manager.dto import UserDTO
+from src.data_manager.models import User, db
+from src.data_manager.user import get_user
+from src.db_session import session_scope
+from tests.helpers import create_test_app, destroy_test_app
+
+
+class TestSessionLifecycle(unittest.TestCase):
+
+    JOBS_COUNT = 10_000
+    WORKERS_COUNT = 50
+
+    def setUp(self):
+        self.app, self.db_path = create_test_app()
+        with self.app.app_context():
+            for i in range(self.WORKERS_COUNT):
+                db.session.add(User(phone_number=f"+4100000{i:04d}", myfoodrepo_key=f"key-{i}", study_group=i % 4))
+            db.session.commit()
+
+    def tearDown(self):
+        destroy_test_app(self.app, self.db_path)
+
+    def test_get_user_returns_a_detached_snapshot(self):
+        user = get_user("+41000000001")
+        self.assertIsInstance(user, UserDTO)
+        self.assertEqual(user.myfoodrepo_key, "key-1")
+        self.assertIsNone(get_user("+41999999999"))
+
+    def test_only_the_outermost_scope_commits(self):
+        with session_scope() as outer:
+            outer.add(User(phone_number="+41999999990", myfoodrepo_key="nested-outer"))
+            with session_scope() as inner:
+                self.assertIs(inner, outer)
+                inner.add(User(phone_number="+41999999991", myfoodrepo_key="nested-inner"))
+            self.assertTrue(outer.new)
+        self.assertIsNotNone(get_user("+41999999991"))
+
+    def test_a_failing_inner_scope_keeps_the_outer_changes(self):
+        with session_scope() as outer:
+            outer.add(User(phone_number="+41999999992", myfoodrepo_key="kept-outer"))
+            with self.assertRaises(ValueError):
+                with session_scope():
+                    raise ValueError("handled by the caller")
+        self.assertIsNotNone(get_user("+41999999992"))
+
+    def test_scheduler_jobs_do_not_leak_sessions(self):
+        def job(i):
+            with session_scope() as session:
+                return session.query(User.id).filter_by(phone_number=f"+4100000{i % self.WORKERS_COUNT:04d}").scalar()
+
+        with ThreadPoolExecutor(max_workers=self.WORKERS_COUNT) as executor:
+            list(executor.map(job, range(self.JOBS_COUNT // 10)))
+            gc.collect()
+            tracemalloc.start()
+            baseline, _ = tracemalloc.get_traced_memory()
+            results = list(executor.map(job, range(self.JOBS_COUNT)))
+            gc.collect()
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        self.assertTrue(all(result is not None for result in results))
+        self.assertEqual(db_session.engine.pool.checkedout(), 0)
+        self.assertLess(current - baseline, 2 * 1024 * 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
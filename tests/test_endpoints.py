@@ -3,9 +3,8 @@ from unittest.mock import patch, MagicMock
 from src.config.config import create_app
 
 @pytest.fixture()
-def client():
-    app = create_app()
-    app.config['TESTING'] = True
+def client(tmp_path):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / "test.db")})
     with app.test_client() as client:
         yield client
 
@@ -0,0 +1,72 @@
+import unittest
+from datetime import datetime, time
+
+from src.constants import ASSISTANT_ROLE, SYSTEM_ROLE
+from src.data_manager.engagement import (backfill_engagement_states, get_engagement_state,
+                                         record_skipped_reminder)
+from src.data_manager.message import write_message_rows
+from src.data_manager.models import Message, Reminder, User, UserEngagementState, db
+from tests.helpers import create_test_app, destroy_test_app
+
+
+def message_row(user_id, role, message_datetime, reminder_id=None):
+    return {'user_id': user_id, 'role': role, 'content': "Hello", 'twilio_message_id': None,
+            'reminder_id': reminder_id, 'datetime': message_datetime}
+
+
+class TestUserEngagementState(unittest.TestCase):
+
+    def setUp(self):
+        self.app, self.db_path = create_test_app()
+        with self.app.app_context():
+            user = User(phone_number="+41000000001", myfoodrepo_key="key-1", study_group=3)
+            db.session.add(user)
+            db.session.flush()
+            reminder = Reminder(user.id, time(19, 0), "Dinner")
+            db.session.add(reminder)
+            db.session.commit()
+            self.user_id, self.reminder_id = user.id, reminder.id
+
+    def tearDown(self):
+        destroy_test_app(self.app, self.db_path)
+
+    def test_state_follows_written_messages(self):
+        write_message_rows([
+            message_row(self.user_id, SYSTEM_ROLE, datetime(2025, 4, 1, 8, 0)),
+            message_row(self.user_id, ASSISTANT_ROLE, datetime(2025, 4, 1, 9, 0)),
+            message_row(self.user_id, ASSISTANT_ROLE, datetime(2025, 4, 1, 19, 0), self.reminder_id),
+        ])
+        record_skipped_reminder(self.user_id)
+        record_skipped_reminder(self.user_id)
+
+        state = get_engagement_state(self.user_id)
+        self.assertEqual(state.welcome_at, datetime(2025, 4, 1, 9, 0))
+        self.assertEqual(state.last_reminder_at, datetime(2025, 4, 1, 19, 0))
+        self.assertEqual(state.consecutive_skips, 2)
+
+        write_message_rows([message_row(self.user_id, ASSISTANT_ROLE, datetime(2025, 4, 2, 19, 0), self.reminder_id)])
+        state = get_engagement_state(self.user_id)
+        self.assertEqual(state.welcome_at, datetime(2025, 4, 1, 9, 0))
+        self.assertEqual(state.last_reminder_at, datetime(2025, 4, 2, 19, 0))
+        self.assertEqual(state.consecutive_skips, 0)
+
+    def test_backfill_uses_existing_history(self):
+        with self.app.app_context():
+            for hour, reminder_id in [(9, None), (19, self.reminder_id)]:
+                message = Message(user_id=self.user_id, role=ASSISTANT_ROLE, content="Hello",
+                                  twilio_message_id=None, reminder_id=reminder_id)
+                message.datetime = datetime(2025, 4, 1, hour, 0)
+                db.session.add(message)
+            db.session.commit()
+
+        self.assertEqual(backfill_engagement_states(), 1)
+        self.assertEqual(backfill_engagement_states(), 0)
+        state = get_engagement_state(self.user_id)
+        self.assertEqual(state.welcome_at, datetime(2025, 4, 1, 9, 0))
+        self.assertEqual(state.last_reminder_at, datetime(2025, 4, 1, 19, 0))
+        with self.app.app_context():
+            self.assertEqual(UserEngagementState.query.count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from src.data_manager.models import JobExecution
+from src.scheduler.job_history import JobHistory, get_job_slot, get_job_type
+from tests.helpers import create_test_app, destroy_test_app
+
+
+class TestJobHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.app, self.db_path = create_test_app()
+        self.history = JobHistory(max_runs=10, flush_interval=60, max_batch=1000)
+
+    def tearDown(self):
+        self.history.stop()
+        destroy_test_app(self.app, self.db_path)
+
+    def record_run(self, job_id, status, duration_ms, slot=None):
+        run = self.history.start(job_id, slot=slot)
+        run.start_counter -= duration_ms / 1000
+        self.history.finish(run, status)
+
+    def test_job_ids_are_grouped_by_type_and_slot(self):
+        self.assertEqual(get_job_type('reminder_slot_1900'), 'reminder_slot')
+        self.assertEqual(get_job_type('reminder_12'), 'reminder')
+        self.assertEqual(get_job_slot('reminder_pregen_0650'), '06:50')
+        self.assertIsNone(get_job_slot('reminder_12'))
+
+    def test_statistics_are_computed_on_the_most_recent_runs(self):
+        for duration_ms in (100, 200, 300, 400):
+            self.record_run('reminder_slot_1900', 'completed', duration_ms)
+        for i in range(8):
+            self.record_run(f'reminder_{i}', 'failed' if i < 2 else 'completed', 10, slot='19:00')
+
+        summary = self.history.summary()
+        self.assertEqual(summary['runs'], 10)
+        # The two oldest slot runs were dropped from the ring buffer
+        self.assertEqual(summary['job_types']['reminder_slot']['runs'], 2)
+        self.assertAlmostEqual(summary['job_types']['reminder_slot']['p50_ms'], 350, delta=5)
+        self.assertEqual(summary['job_types']['reminder']['failure_rate'], 0.25)
+        self.assertEqual(summary['slots']['19:00']['outcomes'], {'completed': 8, 'failed': 2})
+
+    def test_history_is_persisted_and_reloaded(self):
+        for i in range(15):
+            self.record_run(f'reminder_{i}', 'completed', 10)
+        self.history.record('fetch_meal_data', 'deferred')
+        self.history.flush()
+
+        with self.app.app_context():
+            self.assertEqual(JobExecution.query.count(), 10)
+
+        reloaded = JobHistory(max_runs=10, flush_interval=60, max_batch=1000)
+        self.assertEqual(reloaded.load(), 10)
+        self.assertEqual(reloaded.latest('fetch_meal_data')['status'], 'deferred')
+        self.assertIsNone(reloaded.latest('reminder_0'))
+        self.assertEqual(reloaded.summary()['job_types']['reminder']['runs'], 9)
+
+    def test_follower_refresh_picks_up_the_new_runs_only(self):
+        self.record_run('fetch_meal_data', 'failed', 10)
+        self.history.flush()
+        follower = JobHistory(max_runs=10, flush_interval=60, max_batch=1000)
+        self.assertTrue(follower.refresh())
+        self.assertEqual(follower.latest('fetch_meal_data')['status'], 'failed')
+        summary = follower.summary()
+        self.assertFalse(follower.refresh())
+        self.assertIs(follower.summary(), summary)
+
+        self.record_run('fetch_meal_data', 'completed', 10)
+        self.history.flush()
+        self.assertTrue(follower.refresh())
+        self.assertEqual(follower.latest('fetch_meal_data')['status'], 'completed')
+
+
+if __name__ == "__main__":
+    unittest.main()
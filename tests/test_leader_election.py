@@ -0,0 +1,57 @@
+import os
+import tempfile
+import time
+import unittest
+
+from src.scheduler.leader_election import SchedulerLeaderElection
+
+
+@unittest.skipIf(os.name != 'posix', "File locks are only used on POSIX systems")
+class TestSchedulerLeaderElection(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.lock_path = os.path.join(self.directory.name, "scheduler.lock")
+        self.elected = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def create_process(self, name):
+        election = SchedulerLeaderElection(self.lock_path, lambda: self.elected.append(name), retry_interval=0.05)
+        self.addCleanup(election.stop)
+        return election
+
+    def test_a_single_process_runs_the_scheduler_until_it_stops(self):
+        leader, follower = self.create_process("leader"), self.create_process("follower")
+
+        self.assertTrue(leader.start())
+        self.assertFalse(follower.start())
+        time.sleep(0.2)
+        self.assertEqual(self.elected, ["leader"])
+        self.assertEqual(follower.status()['leader']['pid'], os.getpid())
+
+        # The follower takes over once the leader is gone
+        leader.stop()
+        deadline = time.monotonic() + 2
+        while not follower.is_leader and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertTrue(follower.is_leader)
+        self.assertEqual(self.elected, ["leader", "follower"])
+
+    def test_a_failed_start_gives_up_the_leadership(self):
+        def failing_start():
+            raise RuntimeError("job store unavailable")
+
+        failing = SchedulerLeaderElection(self.lock_path, failing_start, retry_interval=60)
+        self.addCleanup(failing.stop)
+        follower = self.create_process("follower")
+
+        self.assertFalse(failing.start())
+        self.assertFalse(failing.is_leader)
+        self.assertTrue(follower.start())
+        self.assertEqual(self.elected, ["follower"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import patch
+
+from src.constants import SYSTEM_ROLE
+from src.db_session import session_scope
+from src.data_manager import message as message_module
+from src.data_manager.message import (db_add_message, get_all_messages, get_conversation_messages, get_user_messages,
+                                      write_message_rows)
+from src.data_manager.models import Message, User, db
+from src.utils.write_buffer import WriteBehindBuffer
+from tests.helpers import count_queries, create_test_app, destroy_test_app
+
+
+class TestMessageWriteBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.app, self.db_path = create_test_app()
+        with self.app.app_context():
+            user = User(phone_number="+41000000001", myfoodrepo_key="key-1", study_group=3)
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+
+        self.buffer = WriteBehindBuffer(write_message_rows, flush_interval=60, max_batch=100)
+        patchers = [patch.object(message_module, 'message_buffer', self.buffer),
+                    patch.object(message_module, 'MESSAGE_DURABILITY_MODE', "batched")]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.buffer.stop()
+        destroy_test_app(self.app, self.db_path)
+
+    def stored_messages_count(self):
+        with self.app.app_context():
+            return Message.query.count()
+
+    def test_pending_messages_are_written_before_history_is_read(self):
+        db_add_message(self.user_id, SYSTEM_ROLE, "You are a helpful assistant.", None, None)
+        db_add_message(self.user_id, "user", "What should I eat?", "SM1", None)
+        db_add_message(self.user_id, "assistant", "Some vegetables.", None, None)
+        self.assertEqual(self.stored_messages_count(), 0)
+
+        with count_queries() as statements:
+            messages = get_user_messages(self.user_id)
+        self.assertEqual(sum(1 for statement in statements if statement.startswith("INSERT INTO messages")), 3)
+        self.assertEqual([message.role for message in messages], [SYSTEM_ROLE, "user", "assistant"])
+        self.assertEqual(messages[0].text, "You are a helpful assistant.")
+
+    def test_invalid_message_does_not_discard_the_batch(self):
+        db_add_message(self.user_id, "user", "First", "SM1", None)
+        db_add_message(self.user_id, "user", "Duplicate", "SM1", None)
+        db_add_message(self.user_id, "assistant", "Answer", None, None)
+        self.buffer.flush()
+        self.assertEqual(self.stored_messages_count(), 2)
+
+    def test_every_reader_sees_the_pending_messages(self):
+        db_add_message(self.user_id, "user", "First", "SM1", None)
+        self.assertEqual([message.content for message in get_conversation_messages(self.user_id, 0, None, 10)],
+                         ["First"])
+        db_add_message(self.user_id, "user", "Second", "SM2", None)
+        self.assertEqual(len(get_all_messages()), 2)
+
+    def test_flush_within_a_writing_transaction_uses_its_connection(self):
+        db_add_message(self.user_id, "user", "What should I eat?", "SM1", None)
+        with session_scope() as session:
+            session.add(User(phone_number="+41000000002", myfoodrepo_key="key-2", study_group=1))
+            session.flush()
+            # A second connection would wait for the lock this transaction holds on the database
+            self.assertEqual([message.content for message in get_user_messages(self.user_id)],
+                             ["What should I eat?"])
+        self.assertEqual(self.stored_messages_count(), 1)
+
+    def test_durability_mode_of_the_application_prevails(self):
+        self.app.config['MESSAGE_DURABILITY_MODE'] = "immediate"
+        with self.app.app_context():
+            db_add_message(self.user_id, "user", "What should I eat?", "SM1", None)
+        self.assertFalse(self.buffer.has_pending())
+        self.assertEqual(self.stored_messages_count(), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from src.constants import SYSTEM_ROLE
+from src.data_manager.llm_usage import get_llm_usage_summary
+from src.data_manager.message import flush_messages
+from src.data_manager.models import LlmUsage, User, db
+from src.openai_client import OpenAIChatClient
+from tests.helpers import create_test_app, destroy_test_app
+
+
+class TestOpenAIUsage(unittest.TestCase):
+
+    def setUp(self):
+        self.app, self.db_path = create_test_app()
+        with self.app.app_context():
+            db.session.add(User(phone_number="+41000000001", myfoodrepo_key="key-1", study_group=1))
+            db.session.commit()
+
+    def tearDown(self):
+        destroy_test_app(self.app, self.db_path)
+
+    def test_prompt_and_cached_tokens_are_recorded_per_call(self):
+        responses = iter([
+            AIMessage(content="Time to log your lunch!",
+                      usage_metadata={'input_tokens': 1500, 'output_tokens': 40, 'total_tokens': 1540,
+                                      'input_token_details': {'cache_read': 1280}}),
+            AIMessage(content="Well done!"),
+        ])
+        client = OpenAIChatClient("test", llm=GenericFakeChatModel(messages=responses))
+
+        for purpose in ("reminder", "chat"):
+            client.add_message_from_phone_number("+41000000001", SYSTEM_ROLE, "Static instructions", None, None)
+            flush_messages()
+            client.create_chat_completion("gpt-4o", "+41000000001", 1, purpose=purpose)
+
+        with self.app.app_context():
+            self.assertEqual(LlmUsage.query.count(), 2)
+        summary = get_llm_usage_summary()
+        self.assertEqual(summary['reminder']['prompt_tokens'], 1500)
+        self.assertEqual(summary['reminder']['cached_tokens'], 1280)
+        self.assertEqual(summary['reminder']['cache_hit_rate'], round(1280 / 1500, 4))
+        # A response without usage (e.g from a fake model) is still counted, without tokens
+        self.assertEqual(summary['chat']['calls'], 1)
+        self.assertIsNone(summary['chat']['cache_hit_rate'])
+
+
+if __name__ == '__main__':
+    unittest.main()
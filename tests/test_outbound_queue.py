@@ -0,0 +1,99 @@
+import queue
+import unittest
+
+from src.communication.messaging_service import FakeSMSService
+from src.communication.outbound_queue import MessagePriority, OutboundMessageQueue
+
+
+class ThrottledError(Exception):
+    status = 429
+
+
+class FlakySMSService(FakeSMSService):
+    """Fake service rejecting its first message with a 429."""
+
+    def __init__(self):
+        super().__init__(sender_id="flaky", latency=0)
+        self.throttled = False
+
+    def send_message(self, to, body):
+        if not self.throttled:
+            self.throttled = True
+            raise ThrottledError("Too Many Requests")
+        return super().send_message(to, body)
+
+
+class TestOutboundMessageQueue(unittest.TestCase):
+
+    def make_queue(self, **kwargs):
+        outbound = OutboundMessageQueue(**kwargs)
+        self.addCleanup(outbound.stop, wait=False)
+        return outbound
+
+    def test_messages_are_sent_by_priority(self):
+        outbound = self.make_queue(rate=5, burst=1, workers=1)
+        service = FakeSMSService(latency=0)
+        outbound.send(service, "+41000000001", "first broadcast", MessagePriority.BROADCAST)
+        # Submitted while the first message holds the only token
+        futures = []
+        for body, priority in [("broadcast", MessagePriority.BROADCAST), ("reminder", MessagePriority.REMINDER),
+                               ("chat", MessagePriority.CHAT)]:
+            futures.append(outbound.submit(service, "+41000000001", body, priority))
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual([body for _, _, body in service.sent_messages],
+                         ["first broadcast", "chat", "reminder", "broadcast"])
+
+    def test_sending_rate_is_limited_per_sender(self):
+        outbound = self.make_queue(rate=20, burst=1)
+        first, second = FakeSMSService(sender_id="first", latency=0), FakeSMSService(sender_id="second", latency=0)
+        futures = [outbound.submit(service, "+41000000001", str(i), MessagePriority.REMINDER)
+                   for i in range(6) for service in (first, second)]
+        for future in futures:
+            future.result(timeout=5)
+        for service in (first, second):
+            timestamps = [timestamp for timestamp, _, _ in service.sent_messages]
+            self.assertGreaterEqual(timestamps[-1] - timestamps[0], 5 / 20 * 0.9)
+
+    def test_producers_wait_when_the_queue_is_full(self):
+        outbound = self.make_queue(rate=0.5, burst=1, capacity=2)
+        service = FakeSMSService(latency=0)
+        outbound.submit(service, "+41000000001", "sent", MessagePriority.BROADCAST).result(timeout=5)
+        outbound.submit(service, "+41000000001", "queued 1", MessagePriority.BROADCAST)
+        outbound.submit(service, "+41000000001", "queued 2", MessagePriority.REMINDER)
+        with self.assertRaises(queue.Full):
+            outbound.submit(service, "+41000000001", "rejected", MessagePriority.BROADCAST, timeout=0.1)
+        # Chat replies are never held back
+        outbound.submit(service, "+41000000001", "chat", MessagePriority.CHAT, timeout=0.1)
+
+    def test_throttled_messages_are_retried(self):
+        outbound = self.make_queue(throttle_pause=0.01)
+        service = FlakySMSService()
+        message = outbound.send(service, "+41000000001", "Hello", MessagePriority.REMINDER)
+        self.assertEqual(message.body, "Hello")
+        self.assertEqual(len(service.sent_messages), 1)
+
+    def test_stop_fails_the_queued_messages(self):
+        outbound = self.make_queue(rate=0.5, burst=1)
+        service = FakeSMSService(latency=0)
+        outbound.send(service, "+41000000001", "sent", MessagePriority.REMINDER)
+        queued = outbound.submit(service, "+41000000001", "queued", MessagePriority.REMINDER)
+        outbound.stop(wait=False)
+        with self.assertRaises(RuntimeError):
+            queued.result(timeout=5)
+        self.assertEqual([body for _, _, body in service.sent_messages], ["sent"])
+
+    def test_send_gives_up_after_the_timeout(self):
+        outbound = self.make_queue(rate=0.5, burst=1)
+        service = FakeSMSService(latency=0)
+        outbound.send(service, "+41000000001", "sent", MessagePriority.REMINDER)
+        with self.assertRaises(TimeoutError):
+            outbound.send(service, "+41000000001", "delayed", MessagePriority.REMINDER, timeout=0.1)
+        # The message given up on is withdrawn instead of being sent later
+        outbound.send(service, "+41000000001", "next", MessagePriority.REMINDER, timeout=5)
+        self.assertEqual([body for _, _, body in service.sent_messages], ["sent", "next"])
+        self.assertEqual(outbound.pending(), {service.sender_id: 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
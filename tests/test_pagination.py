@@ -0,0 +1,46 @@
+import unittest
+from datetime import datetime, timedelta
+
+from src.data_manager.meal import get_meals_page
+from src.data_manager.models import Meal, User, db
+from tests.helpers import create_test_app, destroy_test_app
+
+
+class TestKeysetPagination(unittest.TestCase):
+
+    def setUp(self):
+        self.app, self.db_path = create_test_app()
+        with self.app.app_context():
+            user = User(phone_number="+41000000000", myfoodrepo_key="key-0", study_group=3)
+            db.session.add(user)
+            db.session.flush()
+            start = datetime(2025, 4, 1, 12, 0)
+            # Pairs of meals share the same datetime, so the ID tie-breaker is exercised.
+            for i in range(25):
+                db.session.add(Meal(user.id, f"Meal {i}", {}, {}, {}, start + timedelta(hours=i // 2)))
+            db.session.commit()
+
+    def tearDown(self):
+        destroy_test_app(self.app, self.db_path)
+
+    def test_pages_cover_all_meals_once_in_order(self):
+        seen, cursor = [], None
+        while True:
+            meals, cursor, _ = get_meals_page(after=cursor, per_page=10)
+            seen.extend((meal.datetime, meal.id) for meal in meals)
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_previous_cursor_returns_the_previous_page(self):
+        first_page, next_cursor, previous_cursor = get_meals_page(per_page=10)
+        self.assertIsNone(previous_cursor)
+        second_page, _, previous_cursor = get_meals_page(after=next_cursor, per_page=10)
+        back_page, _, _ = get_meals_page(before=previous_cursor, per_page=10)
+        self.assertEqual([meal.id for meal in back_page], [meal.id for meal in first_page])
+        self.assertFalse({meal.id for meal in first_page} & {meal.id for meal in second_page})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from src.query_profiler import QueryProfiler, fingerprint_statement
+
+
+class TestQueryProfiler(unittest.TestCase):
+
+    def test_fingerprint_groups_statements_differing_by_literals(self):
+        first = fingerprint_statement("SELECT * FROM users WHERE id = 12 AND phone_number = '+41'")
+        second = fingerprint_statement("SELECT *  FROM users\nWHERE id = 7 AND phone_number = 'abc'")
+        self.assertEqual(first, second)
+        self.assertEqual(fingerprint_statement("SELECT id FROM meals WHERE id IN (?, ?, ?)"),
+                         fingerprint_statement("SELECT id FROM meals WHERE id IN (?)"))
+
+    def test_aggregates_are_bounded(self):
+        profiler = QueryProfiler(slow_threshold_ms=1000, max_fingerprints=3, max_callers=2)
+        for i in range(5):
+            profiler.record(f"SELECT * FROM table_{'abcde'[i]}", duration_ms=i + 1, rowcount=1, caller=f"caller_{i}")
+        profiler.record("SELECT * FROM table_e", duration_ms=1, rowcount=2, caller="other_caller")
+        profiler.record("SELECT * FROM table_e", duration_ms=1, rowcount=2, caller="third_caller")
+
+        stats = profiler.top(limit=10)
+        self.assertEqual(stats['fingerprints'], 3)
+        top_statement = stats['statements'][0]
+        self.assertEqual(top_statement['fingerprint'], "SELECT * FROM table_e")
+        self.assertEqual(top_statement['calls'], 3)
+        self.assertEqual(top_statement['rows'], 5)
+        self.assertEqual(len(top_statement['callers']), 2)
+
+    def test_failed_statement_does_not_leave_its_start_time(self):
+        engine = create_engine('sqlite://')
+        profiler = QueryProfiler(slow_threshold_ms=1000, caller_sampling=1)
+        profiler.install(engine)
+        self.addCleanup(profiler.uninstall)
+        with engine.connect() as connection:
+            with self.assertRaises(OperationalError):
+                connection.execute(text("SELECT * FROM missing_table"))
+            connection.execute(text("SELECT 1"))
+            self.assertEqual(connection.info['query_start_times'], [])
+        statement = profiler.top()['statements'][0]
+        self.assertEqual(statement['fingerprint'], "SELECT ?")
+        self.assertEqual(len(statement['callers']), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
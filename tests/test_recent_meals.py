@@ -0,0 +1,65 @@
+import unittest
+from datetime import datetime, timedelta
+
+from src.data_manager.meal import clear_recent_meals_cache, get_recent_meals_string_for_user
+from src.data_manager.models import Meal, User, db
+from src.db_session import session_scope
+from src.data_manager.context_snapshot import bump_meals_version
+from src.utils.token_utils import count_tokens
+from tests.helpers import assert_max_queries, create_test_app, destroy_test_app
+
+NUTRIENTS = {'energy_kcal': 600, 'fat': 20, 'carbohydrates': 70, 'protein': 30, 'fiber': 6, 'sugar': 10,
+             'salt': 1.5, 'water': 250, 'sodium': 600, 'calcium': 200, 'iron': 3}
+
+
+class TestRecentMealsContext(unittest.TestCase):
+
+    def setUp(self):
+        self.app, self.db_path = create_test_app()
+        clear_recent_meals_cache()
+        with self.app.app_context():
+            user = User(phone_number="+41000000001", myfoodrepo_key="key-1", study_group=3)
+            db.session.add(user)
+            db.session.flush()
+            self.user_id = user.id
+            # Three meals a day over two months
+            start = datetime(2025, 3, 1)
+            for day in range(60):
+                for hour in (8, 12, 19):
+                    db.session.add(Meal(user.id, f"Meal of day {day} at {hour}", NUTRIENTS, [], [],
+                                        start + timedelta(days=day, hours=hour)))
+            db.session.commit()
+
+    def tearDown(self):
+        clear_recent_meals_cache()
+        destroy_test_app(self.app, self.db_path)
+
+    def test_recent_meals_fit_in_the_token_budget(self):
+        for budget in (400, 1500, 4000):
+            text = get_recent_meals_string_for_user("key-1", token_budget=budget)
+            self.assertLessEqual(count_tokens(text), budget)
+            # The most recent meal is always detailed
+            self.assertIn("Time: 2025-04-29 19:00", text)
+
+        text = get_recent_meals_string_for_user("key-1", meals_nb=20, token_budget=4000)
+        # The oldest day cut by the limit (20 meals) is only summarized, with the older days
+        self.assertNotIn("Date: 2025-04-23", text)
+        self.assertIn("2025-04-23: 3 meal(s)", text)
+        # ... over the 14 days before the detailed meals
+        self.assertIn("2025-04-10: 3 meal(s)", text)
+        self.assertNotIn("2025-04-09", text)
+
+    def test_text_is_cached_until_the_meals_change(self):
+        first = get_recent_meals_string_for_user("key-1")
+        # User ID only: the meals version is kept in memory
+        cached = assert_max_queries(self, 1, get_recent_meals_string_for_user, "key-1")
+        self.assertEqual(first, cached)
+
+        with session_scope() as session:
+            session.add(Meal(self.user_id, "Late snack", {'energy_kcal': 150}, [], [], datetime(2025, 4, 29, 22)))
+            bump_meals_version(session, self.user_id)
+        self.assertIn("Late snack", get_recent_meals_string_for_user("key-1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
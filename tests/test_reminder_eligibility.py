@@ -0,0 +1,88 @@
+import os
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytz
+
+os.environ.setdefault('OPENAI_API_KEY', 'test-key')
+
+from src.communication import reminder_manager
+from src.data_manager.dto import EngagementStateDTO, UserDTO
+from src.services.reminder_eligibility import draw_coinflips, evaluate_slot, get_slot_decisions
+
+SLOT = pytz.timezone('Europe/Zurich').localize(datetime(2025, 4, 10, 19, 0))
+NOW = SLOT.replace(tzinfo=None)
+
+
+def make_user(user_id, study_group=3, withdrawal=False):
+    return UserDTO(id=user_id, phone_number=f"+4100000{user_id:04d}", myfoodrepo_key=f"key-{user_id}",
+                   gender="female", age=30, language="en", diet_preference=None, diet_goal=None,
+                   study_group=study_group, last_meal_log=None, withdrawal=withdrawal, study_ended=False)
+
+
+class TestSlotEligibility(unittest.TestCase):
+
+    def setUp(self):
+        ago = lambda **delta: NOW - timedelta(**delta)
+        scenarios = [
+            # (user kwargs, welcome, last reminder, consecutive skips, last meal log)
+            ({}, ago(days=1), None, 0, None),
+            ({}, ago(days=5), ago(days=1), 0, None),
+            ({'withdrawal': None}, ago(days=1), None, 0, None),
+            ({}, ago(days=9), ago(hours=7), 1, ago(hours=36)),
+            ({}, ago(days=9), ago(hours=7), 1, ago(days=3)),
+            ({}, ago(days=9), ago(hours=7), 1, ago(hours=2)),
+            ({}, ago(days=9), ago(days=2), 6, ago(hours=2)),
+            ({}, ago(days=9), None, 0, ago(hours=2)),
+            ({'withdrawal': True}, ago(days=9), ago(hours=7), 0, ago(hours=2)),
+            ({'study_group': 2}, ago(days=9), None, 0, ago(hours=2)),
+        ]
+        # Repeating the scenarios so that both coinflip outcomes are covered
+        self.users, self.states = [], {}
+        for user_id, (user_kwargs, welcome, last_reminder, skips, last_log) in enumerate(scenarios * 4, start=1):
+            self.users.append(make_user(user_id, **user_kwargs))
+            self.states[user_id] = EngagementStateDTO(user_id, welcome, last_reminder, skips, last_log)
+
+    def test_slot_evaluation_matches_the_per_user_evaluation(self):
+        slot = evaluate_slot(self.users, SLOT, reminder_manager.get_reminder_generators().keys(), self.states)
+        decisions = get_slot_decisions(slot)
+        coinflips = dict(zip(slot.index, slot['coinflip']))
+
+        for user in self.users:
+            with patch.object(reminder_manager, 'get_engagement_state', lambda user_id: self.states[user_id]):
+                expected = reminder_manager.evaluate_reminder(user, SLOT)
+            self.assertEqual(decisions[user.id], expected, f"user {user.id}")
+            # Both evaluations draw the same seeded coinflip
+            self.assertEqual(bool(draw_coinflips([user.id], SLOT)[0]), coinflips[user.id])
+
+        self.assertEqual(set(slot['skip_reason'].dropna()), {"coinflip", "inactivity", "study group"})
+
+    def test_reminder_is_forced_on_the_fifth_elapsed_occurrence(self):
+        zurich = pytz.timezone('Europe/Zurich')
+        last_reminder = datetime(2025, 4, 8, 19, 0)
+        users = [make_user(user_id) for user_id in range(1, 41)]
+        states = {user.id: EngagementStateDTO(user.id, datetime(2025, 4, 1, 8, 0), last_reminder, 0,
+                                              datetime(2025, 4, 10, 6, 0)) for user in users}
+
+        # 4 occurrences elapsed (Apr 9 at 7:00, 12:00 and 19:00, then Apr 10 at 7:00): the coinflip applies
+        morning = evaluate_slot(users, zurich.localize(datetime(2025, 4, 10, 7, 0)), [3], states)
+        self.assertIn("coinflip", set(morning['skip_reason'].dropna()))
+        # The current occurrence is the 5th one: the reminder is sent whatever the coinflip
+        noon_slot = zurich.localize(datetime(2025, 4, 10, 12, 0))
+        noon = evaluate_slot(users, noon_slot, [3], states)
+        self.assertTrue(noon['skip_reason'].isna().all())
+
+        with patch.object(reminder_manager, 'draw_coinflips', return_value=[True]):
+            self.assertFalse(reminder_manager.should_skip_reminder(1, noon_slot, states[1]))
+
+    def test_coinflips_only_depend_on_seed_slot_and_user(self):
+        user_ids = [u.id for u in self.users]
+        all_draws = draw_coinflips(user_ids, SLOT, seed=7)
+        self.assertEqual(list(draw_coinflips(user_ids[::-1], SLOT, seed=7)), list(all_draws[::-1]))
+        self.assertEqual(list(draw_coinflips(user_ids[:3], SLOT, seed=7)), list(all_draws[:3]))
+        self.assertNotEqual(list(draw_coinflips(user_ids, SLOT + timedelta(days=1), seed=7)), list(all_draws))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+from datetime import datetime, time, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.communication import reminder_manager
+from src.constants import ASSISTANT_ROLE, SYSTEM_ROLE
+from src.data_manager.message import get_user_messages
+from src.data_manager.models import Reminder, User, db
+from src.data_manager.reminder import pop_pregenerated_reminder, store_pregenerated_reminder
+from tests.helpers import create_test_app, destroy_test_app
+
+
+class TestPregeneratedReminders(unittest.TestCase):
+
+    def setUp(self):
+        self.app, self.db_path = create_test_app()
+        self.last_meal_log = datetime(2025, 4, 1, 12, 30)
+        self.slot = datetime(2025, 4, 2, 19, 0)
+        with self.app.app_context():
+            user = User(phone_number="+41000000001", myfoodrepo_key="key-1", study_group=3)
+            user.last_meal_log = self.last_meal_log
+            db.session.add(user)
+            db.session.flush()
+            reminder = Reminder(user.id, time(19, 0), "Dinner")
+            db.session.add(reminder)
+            db.session.commit()
+            self.user_id, self.reminder_id = user.id, reminder.id
+
+    def tearDown(self):
+        destroy_test_app(self.app, self.db_path)
+
+    def store(self, text="Time for dinner!", system_prompt=None):
+        store_pregenerated_reminder(self.reminder_id, self.user_id, text is None, text,
+                                    self.last_meal_log, self.slot + timedelta(minutes=30), system_prompt)
+
+    def test_prepared_reminder_is_consumed_once(self):
+        self.store()
+        self.store("Dinner time!", "You are a dietitian")
+        self.assertEqual(pop_pregenerated_reminder(self.reminder_id, self.last_meal_log, self.slot),
+                         (False, "Dinner time!", "You are a dietitian"))
+        self.assertIsNone(pop_pregenerated_reminder(self.reminder_id, self.last_meal_log, self.slot))
+
+    def test_prepared_reminder_is_discarded_when_outdated(self):
+        self.store(None)
+        self.assertIsNone(pop_pregenerated_reminder(self.reminder_id, self.last_meal_log, self.slot + timedelta(hours=1)))
+        self.store(None)
+        self.assertIsNone(pop_pregenerated_reminder(self.reminder_id, datetime(2025, 4, 2, 18, 55), self.slot))
+
+    def get_user(self):
+        with self.app.app_context():
+            user = db.session.get(User, self.user_id)
+            db.session.expunge(user)
+            return user
+
+    def pregenerate(self):
+        generator = lambda *args: ("Dinner time!", "You are a dietitian")
+        decision = (None, (timedelta(hours=6), False, timedelta(hours=24), False))
+        with patch.object(reminder_manager, 'get_reminder_generators', return_value={3: generator}):
+            self.assertTrue(reminder_manager.pregenerate_reminder(
+                self.get_user(), "Dinner", self.app, self.reminder_id, self.slot,
+                self.slot + timedelta(minutes=30), decision))
+
+    def test_discarded_reminder_leaves_no_system_prompt(self):
+        self.pregenerate()
+        self.assertIsNone(pop_pregenerated_reminder(self.reminder_id, datetime(2025, 4, 2, 18, 55), self.slot))
+        self.assertEqual(get_user_messages(self.user_id), [])
+
+    @patch.object(reminder_manager.twilio_manager, 'send_message',
+                  return_value=SimpleNamespace(body="Dinner time!", sid="SM1"))
+    @patch.object(reminder_manager.clock, 'now', return_value=datetime(2025, 4, 2, 19, 0))
+    def test_system_prompt_is_stored_when_the_reminder_is_sent(self, _mock_now, _mock_send_message):
+        self.pregenerate()
+        self.assertEqual(reminder_manager.send_reminder(self.get_user(), "Dinner", self.app, self.reminder_id),
+                         reminder_manager.REMINDER_SENT)
+        self.assertEqual([(message.role, message.text) for message in get_user_messages(self.user_id)],
+                         [(SYSTEM_ROLE, "You are a dietitian"), (ASSISTANT_ROLE, "Dinner time!")])
+
+
+if __name__ == "__main__":
+    unittest.main()
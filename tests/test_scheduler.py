@@ -0,0 +1,150 @@
+import os
+import threading
+import time as time_module
+import unittest
+from datetime import datetime, time, timedelta
+from unittest.mock import patch
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from flask import has_app_context
+
+os.environ.setdefault('OPENAI_API_KEY', 'test-key')
+
+from src.data_manager.models import Reminder, User, db
+from src.scheduler import scheduler as scheduler_module
+from tests.helpers import assert_max_queries, create_test_app, destroy_test_app
+
+
+class TestSchedulerQueries(unittest.TestCase):
+
+    USERS_COUNT = 30
+
+    def setUp(self):
+        self.app, self.db_path = create_test_app()
+        with self.app.app_context():
+            for i in range(self.USERS_COUNT):
+                user = User(phone_number=f"+4100000{i:04d}", myfoodrepo_key=f"key-{i}", study_group=1 if i % 2 else 3)
+                db.session.add(user)
+                db.session.flush()
+                db.session.add(Reminder(user.id, time(7, 0), "Breakfast"))
+                db.session.add(Reminder(user.id, time(12, 0), "Lunch"))
+                db.session.add(Reminder(user.id, time(19, 0), "Dinner"))
+            db.session.add(User(phone_number="+41999999999", myfoodrepo_key="control", study_group=0))
+            db.session.commit()
+
+    def tearDown(self):
+        destroy_test_app(self.app, self.db_path)
+        scheduler_module.job_history.reset()
+
+    @patch.object(scheduler_module.scheduler, 'get_jobs', return_value=[])
+    @patch.object(scheduler_module.scheduler, 'get_job', return_value=None)
+    @patch.object(scheduler_module.scheduler, 'add_job')
+    def test_schedule_reminders_adds_one_job_per_slot(self, mock_add_job, _mock_get_job, _mock_get_jobs):
+        assert_max_queries(self, 1, scheduler_module.schedule_reminders, self.app)
+        self.assertEqual(sorted(call.kwargs['id'] for call in mock_add_job.call_args_list),
+                         ['reminder_pregen_0700', 'reminder_pregen_1200', 'reminder_pregen_1900',
+                          'reminder_slot_0700', 'reminder_slot_1200', 'reminder_slot_1900'])
+
+    @patch.object(scheduler_module, 'REMINDER_DISPATCH_RATE', 1000)
+    @patch.object(scheduler_module, 'execute_reminder')
+    def test_slot_dispatch_loads_due_reminders_and_engagement_states_in_two_queries(self, mock_execute_reminder):
+        dispatched = assert_max_queries(self, 2, scheduler_module.dispatch_reminder_slot, 19, 0)
+        self.assertEqual(dispatched, self.USERS_COUNT)
+        self.assertEqual({call.args[1] for call in mock_execute_reminder.call_args_list}, {"Dinner"})
+
+    def test_reconciliation_only_applies_the_delta(self):
+        paused_scheduler = BackgroundScheduler()
+        paused_scheduler.start(paused=True)
+        self.addCleanup(paused_scheduler.shutdown, wait=False)
+        with patch.object(scheduler_module, 'scheduler', paused_scheduler):
+            scheduler_module.schedule_reminder_slot(7, 0)
+            paused_scheduler.add_job(scheduler_module.execute_reminder, 'cron', hour=8, id='reminder_12',
+                                     args=[1, "Breakfast", 12])
+            next_run_time = paused_scheduler.get_job('reminder_slot_0700').next_run_time
+
+            with self.app.app_context():
+                added, removed = scheduler_module.reconcile_reminder_slots()
+
+            self.assertEqual((added, removed), (4, 1))
+            self.assertEqual(sorted(job.id for job in paused_scheduler.get_jobs()),
+                             ['reminder_pregen_0700', 'reminder_pregen_1200', 'reminder_pregen_1900',
+                              'reminder_slot_0700', 'reminder_slot_1200', 'reminder_slot_1900'])
+            self.assertEqual(paused_scheduler.get_job('reminder_slot_0700').next_run_time, next_run_time)
+
+    @patch.object(scheduler_module, 'slot_index')
+    @patch.object(scheduler_module.scheduler, 'add_job')
+    def test_follower_leaves_new_reminders_to_the_leader(self, mock_add_job, mock_slot_index):
+        self.assertFalse(scheduler_module.scheduler.running)
+        status = scheduler_module.schedule_reminder(2, None, "Dinner", self.app)
+        self.assertEqual(status, 200)
+        mock_slot_index.add.assert_not_called()
+        mock_add_job.assert_not_called()
+
+
+    @patch.object(scheduler_module, 'send_reminder', return_value=scheduler_module.REMINDER_FAILED)
+    @patch.object(scheduler_module.scheduler, 'add_job')
+    def test_failed_reminder_is_rescheduled_until_its_deadline(self, mock_add_job, mock_send_reminder):
+        scheduler_module.app_handle.bind(self.app)
+        scheduler_module.execute_reminder(1, "Dinner", 3)
+        self.assertEqual(mock_add_job.call_count, 1)
+        self.assertEqual(mock_add_job.call_args.kwargs['id'], 'retry_reminder_3')
+        retry_args = mock_add_job.call_args.kwargs['args']
+        self.assertEqual(retry_args[:3], [1, "Dinner", 3])
+        self.assertEqual(retry_args[5], 2)
+
+        # Last attempt: not rescheduled
+        scheduler_module.execute_reminder(*retry_args[:5], scheduler_module.REMINDER_RETRY_ATTEMPTS, retry_args[6])
+        self.assertEqual(mock_add_job.call_count, 1)
+
+        # Past its deadline, the reminder is dropped without being sent
+        stale_deadline = datetime.now(scheduler_module.timezone) - timedelta(minutes=1)
+        scheduler_module.execute_reminder(1, "Dinner", 3, None, None, 2, stale_deadline)
+        self.assertEqual(mock_send_reminder.call_count, 2)
+        self.assertEqual(scheduler_module.job_history.latest('reminder_3')['status'], 'stale')
+
+        # Each run popped its application context
+        self.assertFalse(has_app_context())
+
+    @patch.object(scheduler_module, 'reconcile_reminder_slots', side_effect=RuntimeError("no such table"))
+    def test_failed_start_shuts_the_scheduler_down(self, _mock_reconcile):
+        fresh_scheduler = BackgroundScheduler()
+        self.app.config['SCHEDULER_JOBSTORE_URL'] = 'sqlite:///' + self.db_path + '.jobs'
+        self.addCleanup(os.remove, self.db_path + '.jobs')
+        with patch.object(scheduler_module, 'scheduler', fresh_scheduler):
+            with self.assertRaises(RuntimeError):
+                scheduler_module.start_scheduler(self.app)
+        self.assertFalse(fresh_scheduler.running)
+
+    @patch.object(scheduler_module.scheduler, 'add_job')
+    def test_full_sync_is_deferred_after_an_upcoming_slot(self, mock_add_job):
+        self.addCleanup(scheduler_module.slot_index.rebuild, [])
+        scheduler_module.slot_index.rebuild([(1, 19, 0)])
+        now = scheduler_module.timezone.localize(datetime(2025, 4, 1, 18, 50))
+
+        self.assertFalse(scheduler_module.defer_full_sync(now - timedelta(hours=1)))
+        self.assertTrue(scheduler_module.defer_full_sync(now))
+        self.assertEqual(mock_add_job.call_args.kwargs['run_date'],
+                         now + timedelta(minutes=10 + scheduler_module.SYNC_DEFER_AFTER_SLOT_MINUTES))
+        self.assertEqual(mock_add_job.call_args.kwargs['executor'], 'sync')
+
+    def test_sync_pauses_while_reminders_are_sent(self):
+        activity = scheduler_module.ReminderActivity()
+        started = threading.Event()
+
+        @activity.track
+        def send_reminders():
+            started.set()
+            time_module.sleep(0.2)
+
+        sender = threading.Thread(target=send_reminders)
+        sender.start()
+        started.wait()
+        self.assertTrue(activity.is_active)
+        self.assertFalse(activity.wait_until_idle(0.01))
+        self.assertTrue(activity.wait_until_idle(5))
+        sender.join()
+        self.assertEqual(activity.stats()['pauses'], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, inspect
+
+from src import db_session
+from src.constants import SYSTEM_ROLE
+from src.data_manager.message import migrate_inline_system_prompts
+from src.data_manager.models import Message
+from src.data_manager.schema import has_column, upgrade_schema
+
+
+class TestSchemaUpgrade(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        database_path = os.path.join(self.directory.name, "old.db")
+        # The messages table as created by the versions storing system prompts inline
+        connection = sqlite3.connect(database_path)
+        connection.execute("CREATE TABLE users (id INTEGER PRIMARY KEY)")
+        connection.execute("CREATE TABLE messages (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+                           "role VARCHAR(255), content VARCHAR(255), datetime DATETIME, "
+                           "twilio_message_id VARCHAR(255) UNIQUE, reminder_id INTEGER)")
+        connection.execute("INSERT INTO users (id) VALUES (1)")
+        connection.execute("INSERT INTO messages (user_id, role, content) VALUES (1, ?, 'You are a dietitian')",
+                           (SYSTEM_ROLE,))
+        connection.commit()
+        connection.close()
+
+        self.db_uri = 'sqlite:///' + database_path
+        db_session.init_db(self.db_uri)
+        self.engine = create_engine(self.db_uri)
+
+    def tearDown(self):
+        db_session.engine.dispose()
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def test_backfill_is_skipped_on_the_old_schema(self):
+        self.assertEqual(migrate_inline_system_prompts(), 0)
+
+    def test_upgrade_adds_the_column_and_is_idempotent(self):
+        self.assertEqual(upgrade_schema(self.engine), ['messages.system_prompt_hash'])
+        self.assertEqual(upgrade_schema(self.engine), [])
+        self.assertTrue(has_column(self.engine, 'messages', 'system_prompt_hash'))
+        self.assertIn('ix_messages_user_id_datetime',
+                      [index['name'] for index in inspect(self.engine).get_indexes('messages')])
+
+        self.assertEqual(migrate_inline_system_prompts(), 1)
+        with db_session.session_scope() as session:
+            message = session.query(Message).one()
+            self.assertIsNone(message.content)
+            self.assertEqual(message.text, 'You are a dietitian')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+from datetime import datetime
+
+from src.simulation.harness import SimulationConfig, run_simulation
+from src.utils import clock
+
+
+class TestSimulation(unittest.TestCase):
+
+    def test_a_short_study_is_replayed_on_the_virtual_clock(self):
+        report = run_simulation(SimulationConfig(users=8, days=2, start=datetime(2025, 4, 7), seed=3))
+
+        # Three slots a day, each pre-generated and dispatched, for two days
+        self.assertEqual(report['jobs']['by_type']['reminder_slot']['runs'], 6)
+        self.assertEqual(report['jobs']['by_type']['reminder_pregen']['runs'], 6)
+        self.assertEqual(sorted(report['slots']), ['07:00', '12:00', '19:00'])
+        self.assertTrue(all(slot['reminders'] == 8 for slot in report['slots'].values()))
+        self.assertGreater(report['reminders']['sent'], 0)
+        self.assertGreater(report['meal_logs'], 0)
+        self.assertGreater(report['speedup'], 1)
+        # The system clock is restored at the end of the simulation
+        self.assertIsInstance(clock.get_clock(), clock.SystemClock)
+
+
+if __name__ == '__main__':
+    unittest.main()
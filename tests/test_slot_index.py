@@ -0,0 +1,29 @@
+import unittest
+
+from src.scheduler.slot_index import SlotOccupancyIndex
+
+
+class TestSlotOccupancyIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SlotOccupancyIndex()
+        self.index.rebuild([(5, 7, 0), (2, 7, 0), (9, 12, 0)])
+
+    def test_reminders_are_ordered_within_their_slot(self):
+        self.assertEqual(self.index.position(2), 0)
+        self.assertEqual(self.index.position(5), 1)
+        self.assertEqual(self.index.add(3, 7, 0), (False, None))
+        self.assertEqual(self.index.position(5), 2)
+        self.assertEqual(self.index.occupancy(7, 0), 3)
+
+    def test_slot_transitions_are_reported(self):
+        self.assertEqual(self.index.add(9, 19, 0), (True, (12, 0)))
+        self.assertEqual(self.index.slots(), {(7, 0), (19, 0)})
+        self.assertIsNone(self.index.remove(5))
+        self.assertEqual(self.index.remove(2), (7, 0))
+        self.assertIsNone(self.index.remove(2))
+        self.assertEqual(self.index.slots(), {(19, 0)})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+from datetime import datetime
+
+from src.data_manager.models import User, db
+from src.data_manager.user import get_started_users_per_group
+from tests.helpers import assert_max_queries, create_test_app, destroy_test_app
+
+
+class TestStartedUsersPerGroup(unittest.TestCase):
+
+    def setUp(self):
+        self.app, self.db_path = create_test_app()
+        with self.app.app_context():
+            for i in range(12):
+                user = User(phone_number=f"+4100000{i:04d}", myfoodrepo_key=f"key-{i}", study_group=i % 4)
+                user.last_meal_log = datetime(2025, 4, 1, 12, 0) if i < 8 else None
+                db.session.add(user)
+            db.session.commit()
+
+    def tearDown(self):
+        destroy_test_app(self.app, self.db_path)
+
+    def test_counts_are_computed_in_a_single_query(self):
+        result = assert_max_queries(self, 1, get_started_users_per_group)
+        self.assertEqual(result, {0: (2, 1), 1: (2, 1), 2: (2, 1), 3: (2, 1)})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from src.data_manager.dto import UserDTO
+from src.data_manager.meal import remove_user_meal
+from src.data_manager.models import Meal, User, db
+from src.services import user_context
+from src.services.user_context import UserContext, clear_user_context_cache, get_user_context
+from tests.helpers import assert_max_queries, create_test_app, destroy_test_app
+
+
+class TestUserContextSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.app, self.db_path = create_test_app()
+        with self.app.app_context():
+            user = User(phone_number="+41000000001", myfoodrepo_key="key-1", study_group=3)
+            db.session.add(user)
+            db.session.flush()
+            meal = Meal(user.id, "Pasta", {"energy_kcal": 600}, {}, {}, datetime(2025, 4, 1, 12, 30))
+            db.session.add(meal)
+            db.session.commit()
+            self.user = UserDTO.from_model(user)
+            self.meal_id = meal.id
+        clear_user_context_cache()
+
+        self.computations = 0
+
+        def fake_compute(user):
+            self.computations += 1
+            return UserContext(f"meals #{self.computations}", ["Fiber is low"], {"current_streak": 2})
+
+        patcher = patch.object(user_context, 'compute_user_context', side_effect=fake_compute)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        clear_user_context_cache()
+        destroy_test_app(self.app, self.db_path)
+
+    def test_context_is_computed_once_per_meals_version(self):
+        first = get_user_context(self.user)
+        self.assertEqual(get_user_context(self.user), first)
+
+        # The stored snapshot is reused once the in-memory cache is gone (e.g after a restart)
+        clear_user_context_cache()
+        self.assertEqual(get_user_context(self.user), first)
+        self.assertEqual(self.computations, 1)
+
+    def test_cached_context_is_served_without_queries(self):
+        first = get_user_context(self.user)
+        self.assertEqual(assert_max_queries(self, 0, get_user_context, self.user), first)
+
+    def test_meal_removal_invalidates_the_context(self):
+        self.assertEqual(get_user_context(self.user).recent_meals, "meals #1")
+        remove_user_meal(self.meal_id)
+        self.assertEqual(get_user_context(self.user).recent_meals, "meals #2")
+
+
+if __name__ == "__main__":
+    unittest.main()